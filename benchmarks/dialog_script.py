@@ -0,0 +1,91 @@
+"""
+Measure the memory that loaded scripts hold on to and the time it takes to
+load them and use their views, as the pipeline does.
+
+Run from the root of the repository:
+
+    python -m benchmarks.dialog_script [total lines] [lines per script]
+"""
+
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from dialog_script import DialogScript
+
+
+def write_corpus(
+    directory: Path,
+    total_lines: int,
+    lines_per_script: int,
+) -> list[Path]:
+    paths = []
+    for start in range(0, total_lines, lines_per_script):
+        script = {
+            "locale": {"languageCode": "en", "countryCode": "US"},
+            "lines": [
+                {
+                    "text": f"This is line number {index} of the corpus.",
+                    "taggedText": f"[calm] This is line number {index} of the corpus.",
+                    "speaker": f"Speaker {index % 2}",
+                    "voiceId": f"voice{index % 2:020d}",
+                }
+                for index in range(start, min(start + lines_per_script, total_lines))
+            ],
+        }
+        path = directory / f"script_{start}.json"
+        path.write_text(json.dumps(script))
+        paths.append(path)
+    return paths
+
+
+def use(script: DialogScript) -> None:
+    """
+    Access the views of a script the way that the pipeline does: the voices
+    are checked after parsing, the dialog inputs are rendered, and the lines
+    are written.
+    """
+    script.voices
+    script.dialog_inputs
+    script.lines
+
+
+def main() -> None:
+    total_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lines_per_script = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_corpus(Path(directory), total_lines, lines_per_script)
+
+        started = time.perf_counter()
+        scripts = [DialogScript(path) for path in paths]
+        loaded = time.perf_counter()
+        for script in scripts:
+            use(script)
+        used = time.perf_counter()
+        del scripts
+
+        gc.collect()
+        tracemalloc.start()
+        scripts = [DialogScript(path) for path in paths]
+        held, _ = tracemalloc.get_traced_memory()
+        for script in scripts:
+            use(script)
+        held_after_use, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(
+        f"{len(paths)} scripts of {lines_per_script} lines, "
+        f"{total_lines} lines in all"
+    )
+    print(f"load:          {loaded - started:8.2f} s")
+    print(f"use views:     {used - loaded:8.2f} s")
+    print(f"held (loaded): {held / len(paths) / 1024:8.1f} KiB per script")
+    print(f"held (used):   {held_after_use / len(paths) / 1024:8.1f} KiB per script")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+A local stand-in for the ElevenLabs endpoints that daisies uses: listing
+voices and text-to-dialog with timestamps. Responses carry silent MP3 audio
+and voice segments whose length follows the text, after a latency drawn from
+a log-normal distribution, and a share of them fail with a 429, 500 or 422.
+
+Run from the root of the repository, then point daisies at it with
+`--base-url http://127.0.0.1:8765` and any `API_KEY`:
+
+    python -m benchmarks.mock_api [--port 8765] [--latency 0.5] [--rate-429 0.05]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs, urlsplit
+
+# One silent MPEG-1 Layer III frame at 128 kbit/s and 44.1 kHz, which lasts
+# 1152 samples.
+FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+FRAME_SECONDS = 1152 / 44100
+
+REASONS = {
+    200: "OK",
+    404: "Not Found",
+    422: "Unprocessable Entity",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+def voice_id(index: int) -> str:
+    """
+    The ID of the voice at `index` in the catalog of the mock.
+    """
+    return f"mockvoice{index:011d}"
+
+
+@dataclass
+class MockSettings:
+    # The median time that a request takes, and the spread of the log-normal
+    # distribution around it.
+    latency: float = 0.5
+    latency_sigma: float = 0.3
+    # The time that the API spends on every character of a request.
+    seconds_per_character: float = 0.0005
+    # The time that every character of a line lasts in the audio.
+    spoken_seconds_per_character: float = 0.06
+    # The share of requests that fail with each status.
+    rate_429: float = 0.0
+    rate_500: float = 0.0
+    rate_422: float = 0.0
+    voices: int = 150
+    seed: int | None = None
+
+
+@dataclass
+class RequestRecord:
+    """
+    A text-to-dialog request as the mock saw it.
+    """
+
+    arrived: float
+    finished: float
+    status: int
+    characters: int
+    first_text: str
+
+
+@dataclass
+class MockElevenLabs:
+    settings: MockSettings = field(default_factory=MockSettings)
+    requests: list[RequestRecord] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.random = random.Random(self.settings.seed)
+
+    async def serve(self, host: str, port: int, started: asyncio.Event) -> None:
+        """
+        Serve until cancelled. The port that is listened on, which may have
+        been picked by the system if `port` is 0, is found in `self.port`
+        once `started` is set.
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        async with server:
+            started.set()
+            await server.serve_forever()
+
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        # Connections are kept alive, as the SDK's connection pool expects.
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if line:
+                        name, _, value = line.partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+                status, extra, data = await self.route(method, target, body)
+                response_head = "\r\n".join(
+                    [
+                        f"HTTP/1.1 {status} {REASONS[status]}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(data)}",
+                        *(f"{name}: {value}" for name, value in extra.items()),
+                        "",
+                        "",
+                    ]
+                )
+                writer.write(response_head.encode("latin-1") + data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def route(
+        self,
+        method: str,
+        target: str,
+        body: bytes,
+    ) -> tuple[int, dict[str, str], bytes]:
+        url = urlsplit(target)
+        if method == "GET" and url.path == "/v2/voices":
+            return 200, {}, self._voices(parse_qs(url.query))
+        if method == "POST" and url.path == "/v1/text-to-dialogue/with-timestamps":
+            return await self._dialog(json.loads(body))
+        return 404, {}, json.dumps({"detail": {"message": "Not found"}}).encode()
+
+    def _voices(self, query: dict[str, list[str]]) -> bytes:
+        start = int(query.get("next_page_token", ["0"])[0])
+        size = int(query.get("page_size", ["10"])[0])
+        end = min(start + size, self.settings.voices)
+        page = {
+            "voices": [
+                {"voice_id": voice_id(index), "name": f"Voice {index}"}
+                for index in range(start, end)
+            ],
+            "has_more": end < self.settings.voices,
+            "total_count": self.settings.voices,
+            "next_page_token": str(end) if end < self.settings.voices else None,
+        }
+        return json.dumps(page).encode()
+
+    def _failure(self) -> int | None:
+        draw = self.random.random()
+        for status, rate in [
+            (429, self.settings.rate_429),
+            (500, self.settings.rate_500),
+            (422, self.settings.rate_422),
+        ]:
+            if draw < rate:
+                return status
+            draw -= rate
+        return None
+
+    async def _dialog(self, request: dict) -> tuple[int, dict[str, str], bytes]:
+        arrived = time.time()
+        inputs = request["inputs"]
+        characters = sum(len(line["text"]) for line in inputs)
+        settings = self.settings
+        latency = settings.latency * math.exp(
+            self.random.gauss(0, settings.latency_sigma)
+        )
+        await asyncio.sleep(latency + settings.seconds_per_character * characters)
+
+        status = self._failure()
+        extra = {}
+        if status == 429:
+            extra["Retry-After"] = "0.1"
+            data = {"detail": {"message": "Too many concurrent requests"}}
+        elif status == 500:
+            data = {"detail": {"message": "Internal error"}}
+        elif status == 422:
+            error = {"loc": ["body", "inputs"], "msg": "Invalid", "type": "value_error"}
+            data = {"detail": [error]}
+        else:
+            status = 200
+            data = self._dialog_response(inputs)
+        self.requests.append(
+            RequestRecord(arrived, time.time(), status, characters, inputs[0]["text"])
+        )
+        return status, extra, json.dumps(data).encode()
+
+    def _dialog_response(self, inputs: list[dict]) -> dict:
+        segments = []
+        frames = 0
+        characters = 0
+        for index, line in enumerate(inputs):
+            start = frames * FRAME_SECONDS
+            spoken = len(line["text"]) * self.settings.spoken_seconds_per_character
+            frames += max(1, round(spoken / FRAME_SECONDS))
+            segments.append(
+                {
+                    "voice_id": line["voice_id"],
+                    "start_time_seconds": start,
+                    "end_time_seconds": frames * FRAME_SECONDS,
+                    "character_start_index": characters,
+                    "character_end_index": characters + len(line["text"]),
+                    "dialogue_input_index": index,
+                }
+            )
+            characters += len(line["text"])
+        return {
+            "audio_base64": base64.b64encode(FRAME * frames).decode("ascii"),
+            "voice_segments": segments,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.mock_api")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=MockSettings.latency)
+    parser.add_argument(
+        "--latency-sigma", type=float, default=MockSettings.latency_sigma
+    )
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--rate-422", type=float, default=0.0)
+    parser.add_argument("--voices", type=int, default=MockSettings.voices)
+    args = parser.parse_args()
+    mock = MockElevenLabs(
+        MockSettings(
+            latency=args.latency,
+            latency_sigma=args.latency_sigma,
+            rate_429=args.rate_429,
+            rate_500=args.rate_500,
+            rate_422=args.rate_422,
+            voices=args.voices,
+        )
+    )
+
+    async def serve() -> None:
+        started = asyncio.Event()
+        serving = asyncio.create_task(mock.serve(args.host, args.port, started))
+        await started.wait()
+        print(f"Mock API on http://{args.host}:{mock.port}, press Ctrl-C to stop")
+        await serving
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Measure how daisies scales with the number of simultaneous requests, the
+size of scripts and the size of batches, end to end against the local mock
+of the API in `benchmarks.mock_api`, without spending any credits.
+
+Every combination of the settings is run as a separate `daisies` process on
+a fresh corpus, and reported with its throughput, the latency of its jobs,
+from the first request of a script until its outputs were written, and the
+peak resident memory of the process.
+
+Run from the root of the repository:
+
+    python -m benchmarks.throughput [--requests 1 4 16] [--lines 10 100]
+        [--scripts 50] [--latency 0.5] [--rate-429 0.05] [--rate-500 0.01]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from benchmarks.mock_api import MockElevenLabs, MockSettings, voice_id
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+SCRIPT_ID = re.compile(r"^Script (\d+) ")
+
+
+@dataclass
+class Result:
+    requests: int
+    lines: int
+    scripts: int
+    seconds: float
+    latencies: list[float]
+    peak_rss: int
+    api_calls: int
+    failed_calls: int
+    returncode: int
+
+    @property
+    def files_per_second(self) -> float:
+        return self.scripts / self.seconds
+
+    def percentile(self, percent: int) -> float:
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else float("nan")
+        return statistics.quantiles(self.latencies, n=100)[percent - 1]
+
+
+def write_corpus(directory: Path, scripts: int, lines: int) -> list[Path]:
+    """
+    Write `scripts` scripts of `lines` lines each between two voices. The
+    text of every line starts with the number of its script, so that the
+    mock's records can be traced back to scripts.
+    """
+    paths = []
+    for number in range(scripts):
+        script = {
+            "locale": {"languageCode": "en", "countryCode": "US"},
+            "lines": [
+                {
+                    "text": (
+                        f"Script {number} line {index}: the quick brown fox "
+                        "jumps over the lazy dog."
+                    ),
+                    "speaker": f"Speaker {index % 2}",
+                    "voiceId": voice_id(index % 2),
+                }
+                for index in range(lines)
+            ],
+        }
+        path = directory / f"script_{number}.json"
+        path.write_text(json.dumps(script))
+        paths.append(path)
+    return paths
+
+
+class MockThread:
+    """
+    The mock API, served from an event loop on a thread of its own while the
+    benchmark waits for `daisies` processes.
+    """
+
+    def __init__(self, settings: MockSettings):
+        self.mock = MockElevenLabs(settings)
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(self.loop)
+            ready = asyncio.Event()
+            self.task = self.loop.create_task(self.mock.serve("127.0.0.1", 0, ready))
+            self.loop.run_until_complete(ready.wait())
+            started.set()
+            try:
+                self.loop.run_until_complete(self.task)
+            except asyncio.CancelledError:
+                pass
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait()
+        self.url = f"http://127.0.0.1:{self.mock.port}"
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join()
+        self.loop.close()
+
+
+def run_daisies(
+    url: str,
+    corpus: Path,
+    requests: int,
+    home: Path,
+) -> tuple[float, int, int]:
+    """
+    Run `daisies` on a corpus.
+
+    Returns:
+        tuple[float, int, int]: The wall time, the peak resident memory in
+        bytes and the exit status of the process.
+    """
+    env = {
+        **os.environ,
+        "API_KEY": "benchmark",
+        "XDG_CACHE_HOME": str(home),
+    }
+    command = [
+        sys.executable,
+        str(MAIN),
+        str(corpus),
+        "--overwrite",
+        "--no-cache",
+        "--requests",
+        str(requests),
+        "--base-url",
+        url,
+    ]
+    # The progress bar goes to stderr, which is kept in a file rather than a
+    # pipe that it could fill up.
+    with tempfile.TemporaryFile() as stderr:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            command, env=env, stdout=subprocess.DEVNULL, stderr=stderr
+        )
+        # Wait with `wait4` for the resource usage of this process alone.
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode:
+            stderr.seek(0)
+            sys.stderr.write(stderr.read().decode(errors="replace")[-2000:])
+    # `ru_maxrss` is in kilobytes on Linux, and in bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return seconds, usage.ru_maxrss * scale, process.returncode
+
+
+def job_latencies(mock: MockElevenLabs, paths: list[Path]) -> list[float]:
+    """
+    The time from the first request of each script until its output script
+    was written.
+    """
+    first_request: dict[str, float] = {}
+    for record in mock.requests:
+        match = SCRIPT_ID.match(record.first_text)
+        if match:
+            stem = f"script_{match[1]}"
+            first_request[stem] = min(
+                first_request.get(stem, record.arrived), record.arrived
+            )
+    latencies = []
+    for path in paths:
+        output = path.parent / "output" / f"{path.stem}.json"
+        if path.stem in first_request and output.exists():
+            latencies.append(output.stat().st_mtime - first_request[path.stem])
+    return latencies
+
+
+def measure(
+    settings: MockSettings,
+    requests: int,
+    lines: int,
+    scripts: int,
+) -> Result:
+    mock_thread = MockThread(settings)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = Path(directory) / "corpus"
+            corpus.mkdir()
+            paths = write_corpus(corpus, scripts, lines)
+            seconds, peak_rss, returncode = run_daisies(
+                mock_thread.url, corpus, requests, Path(directory) / "home"
+            )
+            latencies = job_latencies(mock_thread.mock, paths)
+    finally:
+        mock_thread.stop()
+    records = mock_thread.mock.requests
+    return Result(
+        requests=requests,
+        lines=lines,
+        scripts=scripts,
+        seconds=seconds,
+        latencies=latencies,
+        peak_rss=peak_rss,
+        api_calls=len(records),
+        failed_calls=sum(record.status != 200 for record in records),
+        returncode=returncode,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.throughput")
+    parser.add_argument("--requests", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--scripts", type=int, nargs="+", default=[50])
+    parser.add_argument("--latency", type=float, default=MockSettings.latency)
+    parser.add_argument(
+        "--latency-sigma", type=float, default=MockSettings.latency_sigma
+    )
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--rate-422", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    settings = MockSettings(
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        rate_422=args.rate_422,
+        seed=args.seed,
+    )
+
+    print(
+        f"{'requests':>8} {'lines':>6} {'scripts':>7} {'files/s':>8} "
+        f"{'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'RSS MiB':>8} "
+        f"{'calls':>6} {'failed':>6}"
+    )
+    for requests, lines, scripts in itertools.product(
+        args.requests, args.lines, args.scripts
+    ):
+        result = measure(settings, requests, lines, scripts)
+        status = "" if result.returncode == 0 else f"  exit {result.returncode}"
+        print(
+            f"{requests:>8} {lines:>6} {scripts:>7} "
+            f"{result.files_per_second:>8.2f} "
+            f"{result.percentile(50):>7.2f} {result.percentile(95):>7.2f} "
+            f"{result.percentile(99):>7.2f} "
+            f"{result.peak_rss / 1024 / 1024:>8.1f} "
+            f"{result.api_calls:>6} {result.failed_calls:>6}{status}"
+        )
+
+
+if __name__ == "__main__":
+    main()
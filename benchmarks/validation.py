@@ -0,0 +1,80 @@
+"""
+Compare the cost of validating one script with `jsonschema.validate`, as was
+done before, and with the validators of `validation`.
+
+Run from the root of the repository:
+
+    python -m benchmarks.validation [lines per script]
+"""
+
+import sys
+import timeit
+
+from jsonschema import validate
+
+from json_schema import INPUT, OUTPUT
+from validation import validate_input, validate_output
+
+
+def make_scripts(lines: int) -> tuple[dict, dict]:
+    locale = {"languageCode": "en", "countryCode": "US"}
+    input_script = {
+        "locale": locale,
+        "lines": [
+            {
+                "text": f"Line number {index}.",
+                "taggedText": f"[calm] Line number {index}.",
+                "speaker": f"Speaker {index % 2}",
+                "voiceId": f"voice{index % 2}",
+            }
+            for index in range(lines)
+        ],
+    }
+    output_script = {
+        "locale": locale,
+        "lines": [
+            {
+                "startTime": index * 1000,
+                "endTime": index * 1000 + 900,
+                "speaker": f"Speaker {index % 2}",
+                "text": f"Line number {index}.",
+            }
+            for index in range(lines)
+        ],
+    }
+    return input_script, output_script
+
+
+def per_call(statement, number: int = 200, repeat: int = 5) -> float:
+    """
+    The best time of one call of `statement` in microseconds.
+    """
+    return min(timeit.repeat(statement, number=number, repeat=repeat)) / number * 1e6
+
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    input_script, output_script = make_scripts(lines)
+    cases = [
+        (
+            "INPUT",
+            lambda: validate(input_script, schema=INPUT),
+            lambda: validate_input(input_script),
+        ),
+        (
+            "OUTPUT",
+            lambda: validate(output_script, schema=OUTPUT),
+            lambda: validate_output(output_script),
+        ),
+    ]
+    print(f"Validating a script of {lines} lines, in microseconds per script:")
+    print(f"{'schema':<8}{'before':>12}{'after':>12}{'speedup':>10}")
+    for name, before, after in cases:
+        before_time = per_call(before)
+        after_time = per_call(after)
+        speedup = before_time / after_time
+        print(f"{name:<8}{before_time:>12.1f}{after_time:>12.1f}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from elevenlabs_client import DialogResponse
+from mp3_frames import duration, parse_mp3
+from write_batch import temp_file
+
+if TYPE_CHECKING:
+    from elevenlabs import DialogueInput
+
+# The limits of a single text-to-dialog request: the total number of
+# characters of its inputs, and the number of distinct voices among them.
+MAX_CHUNK_CHARACTERS = 2000
+MAX_CHUNK_VOICES = 10
+
+
+def chunk_ranges(
+    inputs: list[DialogueInput],
+    max_characters: int = MAX_CHUNK_CHARACTERS,
+    max_voices: int = MAX_CHUNK_VOICES,
+) -> list[tuple[int, int]]:
+    """
+    Split `inputs` at line boundaries into ranges that each fit into one
+    request, filling every range before starting the next. A single line that
+    is longer than `max_characters` gets a range of its own, since lines are
+    never split.
+    """
+    return line_ranges(
+        [(len(line.text), line.voice_id) for line in inputs],
+        max_characters,
+        max_voices,
+    )
+
+
+def line_ranges(
+    lines: list[tuple[int, str]],
+    max_characters: int = MAX_CHUNK_CHARACTERS,
+    max_voices: int = MAX_CHUNK_VOICES,
+) -> list[tuple[int, int]]:
+    """
+    Split lines like `chunk_ranges`, given as pairs of the length of their
+    text and their voice ID, which is all that the split depends on.
+    """
+    ranges = []
+    start = 0
+    characters = 0
+    voices: set[str] = set()
+    for index, (length, voice_id) in enumerate(lines):
+        too_long = characters + length > max_characters
+        too_many_voices = voice_id not in voices and len(voices) >= max_voices
+        if index > start and (too_long or too_many_voices):
+            ranges.append((start, index))
+            start = index
+            characters = 0
+            voices = set()
+        characters += length
+        voices.add(voice_id)
+    if lines:
+        ranges.append((start, len(lines)))
+    return ranges
+
+
+def join_chunks(
+    ranges: list[tuple[int, int]],
+    responses: list[DialogResponse],
+    spool_dir: Path | None = None,
+) -> DialogResponse:
+    """
+    Join the dialogs of consecutive chunks of a script into one.
+
+    The audio frames of the chunks are concatenated after the ID3 tag of the
+    first chunk, and the voice segments of each chunk are moved by the
+    duration of the chunks before it and renumbered to the lines of the whole
+    script. Each chunk is synthesized on its own, so the prosody does not
+    carry over from one chunk to the next.
+
+    With a `spool_dir`, the joined audio is written to a temporary file in it
+    one chunk at a time, and spooled chunks are deleted as they are used, so
+    that only one chunk is held in memory at once.
+    """
+    if spool_dir is None:
+        out: io.BufferedIOBase = io.BytesIO()
+        path = None
+    else:
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = temp_file(spool_dir, suffix=".mp3")
+        out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    segments = []
+    elapsed = 0.0
+    with out:
+        for index, ((start, _), response) in enumerate(zip(ranges, responses)):
+            mp3 = parse_mp3(response.read_audio())
+            response.discard_audio()
+            if index == 0:
+                out.write(mp3.tag)
+                digest.update(mp3.tag)
+            # Xing/Info frames are dropped, because their frame counts would
+            # no longer match the joined audio.
+            frames = mp3.audio_frames
+            for segment in response.segments:
+                segments.append(
+                    segment.model_copy(
+                        update={
+                            "start_time_seconds": segment.start_time_seconds + elapsed,
+                            "end_time_seconds": segment.end_time_seconds + elapsed,
+                            "dialogue_input_index": (
+                                segment.dialogue_input_index + start
+                            ),
+                        }
+                    )
+                )
+            frame_bytes = mp3.frame_bytes(frames)
+            out.write(frame_bytes)
+            digest.update(frame_bytes)
+            elapsed += duration(frames)
+        audio_data = out.getvalue() if isinstance(out, io.BytesIO) else b""
+    return DialogResponse(
+        audio_data=audio_data,
+        segments=segments,
+        audio_path=path,
+        audio_sha256=None if path is None else digest.hexdigest(),
+    )
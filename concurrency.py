@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from errors import ElevenLabsClientError
+
+
+class AdaptiveLimiter:
+    """
+    A limit on the number of requests in flight that adapts to how the API
+    responds, using additive increase and multiplicative decrease (AIMD).
+
+    Every healthy response raises the limit by `1 / limit`, which adds about
+    one request per round of `limit` responses, up to `ceiling`. A response is
+    healthy if its latency per character is within `latency_tolerance` times
+    the running average. A 429 or 5xx error multiplies the limit by
+    `decrease`, down to `floor`. Errors from requests that started before the
+    last decrease are ignored, so one burst of throttling only counts once.
+
+    With `floor`, `initial` and `ceiling` all equal, the limit never changes
+    and this is a plain semaphore.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        ceiling: int,
+        floor: int = 1,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.1,
+    ):
+        if not floor <= initial <= ceiling:
+            raise ValueError(
+                f"Expected {floor} <= initial <= {ceiling}, but got {initial}"
+            )
+        self.limit = float(initial)
+        self.ceiling = ceiling
+        self.floor = floor
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self._latency: float | None = None
+        self._last_decrease = float("-inf")
+        self._condition = asyncio.Condition()
+
+    @property
+    def adaptive(self) -> bool:
+        return self.floor < self.ceiling
+
+    def _healthy(self, latency: float) -> bool:
+        if self._latency is None:
+            self._latency = latency
+            return True
+        healthy = latency <= self._latency * self.latency_tolerance
+        self._latency += self.smoothing * (latency - self._latency)
+        return healthy
+
+    def on_success(self, latency: float) -> None:
+        """
+        Record a response that took `latency` seconds per character.
+        """
+        if self._healthy(latency):
+            self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+
+    def on_throttled(self, started: float) -> None:
+        """
+        Record a 429 or 5xx error for a request that started at `started`.
+        """
+        if started < self._last_decrease:
+            return
+        self.limit = max(self.floor, self.limit * self.decrease)
+        self._last_decrease = time.monotonic()
+
+    @asynccontextmanager
+    async def slot(self, characters: int = 1) -> AsyncIterator[None]:
+        """
+        Wait for room under the limit and hold it for the duration of one
+        request of `characters` characters.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        except ElevenLabsClientError as error:
+            if error.throttled:
+                self.on_throttled(started)
+            raise
+        else:
+            self.on_success((time.monotonic() - started) / max(characters, 1))
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
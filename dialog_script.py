@@ -1,12 +1,39 @@
+from __future__ import annotations
+
+import hashlib
 import json
+import os
+import sys
 from pathlib import Path
-from elevenlabs import DialogueInput
-from jsonschema import validate
+from typing import TYPE_CHECKING
+
 from input_script_line import InputScriptLine
-from json_schema import INPUT
+
+if TYPE_CHECKING:
+    from elevenlabs import DialogueInput
 
 
 class DialogScript:
+    """
+    A dialog script, parsed once into compact line records. The raw JSON is
+    not kept.
+
+    The set of voices is built on first use and then shared. The dialog
+    inputs are built afresh on every use instead, since they take up twice as
+    much memory as the lines that they are made from and the pipeline only
+    needs them once.
+    """
+
+    __slots__ = (
+        "file",
+        "stat",
+        "sha256",
+        "language_code",
+        "country_code",
+        "lines",
+        "_voices",
+    )
+
     def __init__(self, file: Path):
         """
         Load and validate a JSON-formatted dialog script.
@@ -16,12 +43,40 @@ class DialogScript:
             UnicodeDecodeError: Data is not encoded using UTF-8, UTF-16, UTF-32.
             ValidationError: The JSON doesn't follow the defined schema.
         """
+        # Validation brings in `jsonschema`, which commands that load no
+        # script never need.
+        from validation import validate_input
+
         self.file = file
-        with open(file) as f:
-            self.data = json.load(f)
-        validate(self.data, schema=INPUT)
-        self.language_code: str = self.data["locale"]["languageCode"]
-        self.country_code: str | None = self.data["locale"].get("countryCode")
+        # The file is stated before it is read, and its content is hashed as
+        # read, so that an edit made while the script is being built is never
+        # taken to be built already.
+        with open(file, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            content = f.read()
+        self.sha256 = hashlib.sha256(content).hexdigest()
+        data = json.loads(content.decode("utf-8"))
+        validate_input(data)
+        self.language_code: str = data["locale"]["languageCode"]
+        self.country_code: str | None = data["locale"].get("countryCode")
+        # Speakers and voices repeat from line to line, so one copy of each
+        # is shared by all of them. Arguments are positional because this is
+        # the hot loop of loading a script: speaker, voice ID, text and tagged
+        # text.
+        intern = sys.intern
+        lines = []
+        for line in data["lines"]:
+            speaker = line.get("speaker")
+            lines.append(
+                InputScriptLine(
+                    None if speaker is None else intern(speaker),
+                    intern(line["voiceId"]),
+                    line["text"],
+                    line.get("taggedText"),
+                )
+            )
+        self.lines: tuple[InputScriptLine, ...] = tuple(lines)
+        self._voices: frozenset[str] | None = None
 
     @property
     def path(self) -> Path:
@@ -35,8 +90,10 @@ class DialogScript:
         return self.file.stem
 
     @property
-    def voices(self) -> set[str]:
-        return {line["voiceId"] for line in self.data["lines"]}
+    def voices(self) -> frozenset[str]:
+        if self._voices is None:
+            self._voices = frozenset(line.voice_id for line in self.lines)
+        return self._voices
 
     @property
     def dialog_inputs(self) -> list[DialogueInput]:
@@ -46,21 +103,9 @@ class DialogScript:
         for the `text` field. Otherwise, the obligatory untagged text will be
         used.
         """
-        return [
-            DialogueInput(
-                text=line.get("taggedText") or line["text"],
-                voice_id=line["voiceId"],
-            )
-            for line in self.data["lines"]
-        ]
+        from elevenlabs import DialogueInput
 
-    @property
-    def lines(self) -> list[InputScriptLine]:
         return [
-            InputScriptLine(
-                speaker=line.get("speaker"),
-                voice_id=line["voiceId"],
-                text=line["text"],
-            )
-            for line in self.data["lines"]
+            DialogueInput(text=line.synthesis_text, voice_id=line.voice_id)
+            for line in self.lines
         ]
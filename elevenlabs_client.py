@@ -1,33 +1,253 @@
+from __future__ import annotations
+
+import asyncio
 import base64
 import binascii
+import hashlib
+import os
+import shutil
 
 from dataclasses import dataclass
-from elevenlabs import DialogueInput, UnprocessableEntityError
-from elevenlabs.client import ElevenLabs
-from elevenlabs.core import ApiError
-from elevenlabs.types import ModelSettingsResponseModel, VoiceSegment
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from errors import AudioDecodeError, ElevenLabsClientError
+from metrics import Metrics
+from write_batch import temp_file
+
+# The SDK takes long to import, so it is only imported once a request is made,
+# and commands that make none never pay for it.
+if TYPE_CHECKING:
+    from elevenlabs import DialogueInput
+    from elevenlabs.client import AsyncElevenLabs, ElevenLabs
+    from elevenlabs.types import (
+        AudioWithTimestampsAndVoiceSegmentsResponseModel,
+        VoiceSegment,
+    )
+
 
-from errors import AudioDecodeError, ElevenLabsClientError, VoiceNotAvailableError
+# The number of base-64 characters that are decoded at a time when audio is
+# spooled to disk. It must be a multiple of 4.
+DECODE_CHUNK_SIZE = 4 * 64 * 1024
+
+# The most voices that the API lists at a time.
+VOICES_PAGE_SIZE = 100
 
 
 @dataclass
 class DialogResponse:
     """
     A structured response from ElevenLabs' text-to-dialog API.
+
+    The audio is either held in `audio_data` or, if `audio_path` is set,
+    spooled to that temporary file, in which case `audio_data` is empty.
+    Spooled audio comes with its SHA-256 hash if it was taken while the file
+    was written, so that the file need not be read again to hash it.
     """
 
     audio_data: bytes
     segments: list[VoiceSegment]
+    audio_path: Path | None = None
+    audio_sha256: str | None = None
+
+    @property
+    def audio_size(self) -> int:
+        if self.audio_path is not None:
+            return self.audio_path.stat().st_size
+        return len(self.audio_data)
+
+    def read_audio(self) -> bytes:
+        if self.audio_path is not None:
+            return self.audio_path.read_bytes()
+        return self.audio_data
+
+    def save_audio(self, path: Path, keep: bool = False) -> None:
+        """
+        Write the audio to `path`. Spooled audio is moved there, which makes
+        it appear all at once, or copied if `keep` is set.
+        """
+        if self.audio_path is None:
+            path.write_bytes(self.audio_data)
+        elif keep:
+            shutil.copyfile(self.audio_path, path)
+        else:
+            os.replace(self.audio_path, path)
+            self.audio_path = path
+
+    def copy(self) -> DialogResponse:
+        """
+        A response with the same dialog whose spooled audio, if any, is a copy
+        of this one's, so that each can be moved or discarded on its own.
+        """
+        if self.audio_path is None:
+            return DialogResponse(self.audio_data, list(self.segments))
+        fd, path = temp_file(self.audio_path.parent, suffix=".mp3")
+        os.close(fd)
+        shutil.copyfile(self.audio_path, path)
+        return DialogResponse(
+            b"", list(self.segments), path, audio_sha256=self.audio_sha256
+        )
+
+    def discard_audio(self) -> None:
+        """
+        Delete the spooled audio, if any, once it is no longer needed.
+        """
+        if self.audio_path is not None:
+            self.audio_path.unlink(missing_ok=True)
+            self.audio_path = None
+            self.audio_sha256 = None
+
+
+@dataclass(frozen=True)
+class RequestSettings:
+    """
+    The parameters, other than the dialog inputs themselves, that are sent with
+    every text-to-dialog request. Anything that affects the generated audio
+    belongs here so that it can be taken into account when caching responses.
+    """
+
+    model_id: str = "eleven_v3"
+    output_format: str = "mp3_44100_128"
+    language_code: str = "en"
+    stability: float = 0.5
+    apply_text_normalization: str = "auto"
+
+
+def _retry_after(headers: dict[str, str] | None) -> float | None:
+    """
+    The number of seconds to wait before retrying, as given by the
+    `Retry-After` header in either of its forms: seconds or an HTTP date.
+    """
+    value = {k.lower(): v for k, v in (headers or {}).items()}.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    # A date in the "-0000" zone has no time zone, but is still in UTC.
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+def _client_error(error: Exception) -> ElevenLabsClientError:
+    """
+    Translate an exception raised by the ElevenLabs SDK into an
+    `ElevenLabsClientError` with a readable message.
+    """
+    import httpx
+    from elevenlabs import UnprocessableEntityError
+    from elevenlabs.core import ApiError
+
+    if isinstance(error, UnprocessableEntityError):
+        if hasattr(error.body, "detail") and error.body.detail:
+            error_message = error.body.detail[0].msg
+            error_location = error.body.detail[0].loc
+            msg = f"API error at {error_location}: {error_message}"
+            return ElevenLabsClientError(msg=msg, status_code=422)
+        return ElevenLabsClientError(
+            msg="Unspecified API client error",
+            status_code=422,
+        )
+    if isinstance(error, ApiError):
+        code = error.status_code
+        # Gateways in front of the API may answer with a plain-text body.
+        if isinstance(error.body, dict):
+            detail = error.body.get("detail") or {}
+        else:
+            detail = {"message": error.body}
+        if not isinstance(detail, dict):
+            detail = {"message": str(detail)}
+        message = detail.get("message") or "Unknown API error"
+        return ElevenLabsClientError(
+            msg=f"API error {code}: {message}",
+            status_code=code,
+            retry_after=_retry_after(error.headers),
+        )
+    if isinstance(error, httpx.TransportError):
+        return ElevenLabsClientError(
+            msg=f"Connection error: {error!r}",
+            transient=True,
+        )
+    return ElevenLabsClientError(msg="Unhandled API client error")
 
 
 class ElevenLabsClient:
     """
-    A wrapper for ElevenLabs text-to-dialog API.
+    A wrapper for ElevenLabs' voices API, which lists the voices that scripts
+    may use. Dialog is requested with `AsyncElevenLabsClient`.
     """
 
     def __init__(self, api: ElevenLabs):
         self.api = api
 
+    def available_voices(self) -> set[str]:
+        """
+        The IDs of the voices available to the user of the API key, listed
+        page by page for as long as there are more.
+
+        Raises:
+            ElevenLabsClientError: The voices could not be listed.
+        """
+        voice_ids = set()
+        page_token = None
+        while True:
+            try:
+                page = self.api.voices.search(
+                    page_size=VOICES_PAGE_SIZE, next_page_token=page_token
+                )
+            except Exception as error:
+                raise _client_error(error)
+            voice_ids.update(voice.voice_id for voice in page.voices)
+            page_token = page.next_page_token
+            if not page.has_more or not page_token:
+                return voice_ids
+
+
+class AsyncElevenLabsClient:
+    """
+    A wrapper for ElevenLabs text-to-dialog API that makes its requests with
+    the asynchronous SDK client, so that many of them can be awaited at once
+    from a single thread. With a `spool_dir`, the audio of every response is
+    decoded into a temporary file in that directory rather than into memory.
+    The time spent decoding is observed in `metrics`.
+    """
+
+    def __init__(
+        self,
+        api: AsyncElevenLabs,
+        settings: RequestSettings = RequestSettings(),
+        spool_dir: Path | None = None,
+        metrics: Metrics | None = None,
+    ):
+        self.api = api
+        self.settings = settings
+        self.spool_dir = spool_dir
+        self.metrics = metrics or Metrics()
+
+    def _request(self, inputs: list[DialogueInput]) -> dict[str, object]:
+        """
+        The keyword arguments of a text-to-dialog request for `inputs`.
+        """
+        from elevenlabs.types import ModelSettingsResponseModel
+
+        return dict(
+            model_id=self.settings.model_id,
+            settings=ModelSettingsResponseModel(stability=self.settings.stability),
+            output_format=self.settings.output_format,
+            language_code=self.settings.language_code,
+            pronunciation_dictionary_locators=[],
+            apply_text_normalization=self.settings.apply_text_normalization,
+            inputs=inputs,
+        )
+
     def _str_to_bytes(self, data: str) -> bytes:
         """
         Convert the audio portion of a `DialogueResponse` from a base-64 string
@@ -44,60 +264,61 @@ class ElevenLabsClient:
         except binascii.Error:
             raise AudioDecodeError()
 
-    def verify_voices(self, voice_ids: list[str]) -> None:
+    def _spool(self, data: str, directory: Path) -> tuple[Path, str]:
         """
-        Verify that the user associated with the API key has access to all of
-        the voices used in the script.
+        Decode the audio portion of a `DialogueResponse` into a temporary file
+        in `directory` a piece at a time, so that no decoded copy of the
+        whole audio is ever held in memory.
 
-        Note that this application is made on a shoe string budget and assumes
-        that the user's account is not of a level that can keep a large library
-        of voices. As such, the page size, which is set the maximum value of
-        100, should be more than large enough to get the full voice library of
-        the user.
+        Returns:
+            tuple[Path, str]: The temporary file and the SHA-256 hash of the
+                audio.
 
         Raises:
-            VoiceNotAvailableError: One or more unavailable voices are used.
+            AudioDecodeError: The base-64 string cannot be converted to bytes.
         """
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, path = temp_file(directory, suffix=".mp3")
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for start in range(0, len(data), DECODE_CHUNK_SIZE):
+                    piece = self._str_to_bytes(data[start : start + DECODE_CHUNK_SIZE])
+                    digest.update(piece)
+                    file.write(piece)
+        except BaseException:
+            path.unlink()
+            raise
+        return path, digest.hexdigest()
 
-        voices_query = self.api.voices.get_all()
-        user_voices: list[str] = [voice.voice_id for voice in voices_query.voices]
-        unavailable_voices = [v for v in voice_ids if v not in user_voices]
-
-        if unavailable_voices:
-            raise VoiceNotAvailableError(unavailable_voices)
-
-    def get_dialog(self, inputs: list[DialogueInput]) -> DialogResponse:
-        settings = ModelSettingsResponseModel(stability=0.5)
+    def _response(
+        self,
+        result: AudioWithTimestampsAndVoiceSegmentsResponseModel,
+    ) -> DialogResponse:
+        with self.metrics.timed("decode_seconds"):
+            if self.spool_dir is not None:
+                path, sha256 = self._spool(result.audio_base_64, self.spool_dir)
+                response = DialogResponse(
+                    audio_data=b"",
+                    segments=result.voice_segments,
+                    audio_path=path,
+                    audio_sha256=sha256,
+                )
+            else:
+                response = DialogResponse(
+                    audio_data=self._str_to_bytes(result.audio_base_64),
+                    segments=result.voice_segments,
+                )
+        self.metrics.count("audio_bytes_received", response.audio_size)
+        return response
 
+    async def get_dialog(self, inputs: list[DialogueInput]) -> DialogResponse:
         try:
-            result = self.api.text_to_dialogue.convert_with_timestamps(
-                model_id="eleven_v3",
-                settings=settings,
-                output_format="mp3_44100_128",
-                language_code="en",
-                pronunciation_dictionary_locators=[],
-                apply_text_normalization="auto",
-                inputs=inputs,
+            result = await self.api.text_to_dialogue.convert_with_timestamps(
+                **self._request(inputs)
             )
-        except UnprocessableEntityError as error:
-            if hasattr(error.body, "detail") and error.body.detail:
-                error_message = error.body.detail[0].msg
-                error_location = error.body.detail[0].loc
-                msg = f"API error at {error_location}: {error_message}"
-                raise ElevenLabsClientError(msg=msg)
-            else:
-                raise ElevenLabsClientError(msg="Unspecified API client error")
-        except ApiError as error:
-            code = error.status_code
-            detail = (error.body or {}).get("detail") or {}
-            message = detail.get("message") or "Unknown API error"
-            raise ElevenLabsClientError(msg=f"API error {code}: {message}")
-        except Exception:
-            raise ElevenLabsClientError(msg="Unhandled API client error")
-
-        audio_data = self._str_to_bytes(result.audio_base_64)
-
-        return DialogResponse(
-            audio_data=audio_data,
-            segments=result.voice_segments,
-        )
+        except Exception as error:
+            raise _client_error(error)
+        # Decoding the audio of a long dialog takes long enough to hold up
+        # other requests, so it is done off the event loop.
+        return await asyncio.to_thread(self._response, result)
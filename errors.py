@@ -1,3 +1,6 @@
+from pathlib import Path
+
+
 class AudioDecodeError(Exception):
     def __init__(self):
         self.msg = "Error decoding audio."
@@ -5,10 +8,36 @@ class AudioDecodeError(Exception):
 
 
 class ElevenLabsClientError(Exception):
-    def __init__(self, msg: str):
+    def __init__(
+        self,
+        msg: str,
+        status_code: int | None = None,
+        retry_after: float | None = None,
+        transient: bool = False,
+    ):
         self.msg = msg
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.transient = transient
         super().__init__(msg)
 
+    @property
+    def throttled(self) -> bool:
+        """
+        Whether the API signalled that it is overloaded or rate limiting us.
+        """
+        code = self.status_code
+        return code is not None and (code == 429 or code >= 500)
+
+    @property
+    def retryable(self) -> bool:
+        """
+        Whether the same request may succeed if it is sent again later. This is
+        the case when the API was throttling us, the request timed out or the
+        connection failed, but not for other client errors such as a 422.
+        """
+        return self.transient or self.throttled or self.status_code == 408
+
 
 class VoiceNotAvailableError(ValueError):
     """
@@ -25,3 +54,19 @@ class VoiceNotAvailableError(ValueError):
             f"{ids}"
         )
         super().__init__(self.msg)
+
+
+class InvalidScriptsError(ValueError):
+    """
+    Raised once every script of a run has been parsed, if any of them could
+    not be read, were not valid or used voices that are not available.
+    """
+
+    def __init__(self, reasons: dict[Path, str]):
+        self.reasons = reasons
+        lines = [f"  {path}: {reason}" for path, reason in sorted(reasons.items())]
+        count = len(reasons)
+        self.msg = "\n".join(
+            [f"{count} invalid script{'s' if count > 1 else ''}:", *lines]
+        )
+        super().__init__(self.msg)
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+from dataclasses import asdict, dataclass
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from elevenlabs_client import DialogResponse, RequestSettings
+from mp3_frames import Frame, duration, nearest_frame_index, parse_mp3
+from synthesis_cache import synthesis_key
+from write_batch import WriteBatch, batch_or_single, temp_file
+
+if TYPE_CHECKING:
+    from elevenlabs import DialogueInput
+    from elevenlabs.types import VoiceSegment
+
+# The directory, within the output directory, that holds the state kept
+# between runs.
+STATE_DIR = ".daisies"
+
+
+@dataclass
+class LineSpan:
+    """
+    The content key of one line and where it was heard in the rendered audio.
+    """
+
+    key: str
+    start: float
+    end: float
+
+
+@dataclass
+class RenderRecord:
+    """
+    What was rendered for a script the last time it was written, kept next to
+    the output so that the next render can reuse the audio of unchanged lines.
+    """
+
+    audio_size: int
+    lines: list[LineSpan]
+
+    @classmethod
+    def load(cls, path: Path) -> "RenderRecord | None":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return cls(
+                audio_size=data["audio_size"],
+                lines=[LineSpan(**line) for line in data["lines"]],
+            )
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            return None
+
+    def save(self, path: Path, batch: WriteBatch | None = None) -> None:
+        with batch_or_single(batch) as batch:
+            batch.write_text(path, json.dumps(asdict(self)))
+
+    def segments(self, inputs: list[DialogueInput]) -> list[VoiceSegment]:
+        """
+        One voice segment per line of the recorded render.
+        """
+        return [
+            line_segment(inputs, index, line.start, line.end)
+            for index, line in enumerate(self.lines)
+        ]
+
+    @classmethod
+    def from_response(
+        cls,
+        keys: list[str],
+        response: DialogResponse,
+    ) -> "RenderRecord":
+        spans = line_spans(response.segments, len(keys))
+        return cls(
+            audio_size=response.audio_size,
+            lines=[
+                LineSpan(key=key, start=start, end=end)
+                for key, (start, end) in zip(keys, spans)
+            ],
+        )
+
+
+def record_path(write_dir: Path, stem: str) -> Path:
+    return write_dir / STATE_DIR / "renders" / f"{stem}.json"
+
+
+def line_keys(inputs: list[DialogueInput], settings: RequestSettings) -> list[str]:
+    """
+    A content key for every line. Because the keys include the request
+    settings, changing a setting marks every line as changed.
+    """
+    return [synthesis_key([line], settings) for line in inputs]
+
+
+def line_spans(
+    segments: list[VoiceSegment],
+    line_count: int,
+) -> list[tuple[float, float]]:
+    """
+    The start and end time of each line, merging the voice segments that
+    belong to the same dialog input.
+    """
+    spans: list[tuple[float, float] | None] = [None] * line_count
+    for segment in segments:
+        index = segment.dialogue_input_index
+        span = spans[index]
+        start, end = segment.start_time_seconds, segment.end_time_seconds
+        if span is not None:
+            start, end = min(span[0], start), max(span[1], end)
+        spans[index] = (start, end)
+    if any(span is None for span in spans):
+        raise ValueError("Every line must have at least one voice segment")
+    return spans  # type: ignore[return-value]
+
+
+def line_segment(
+    inputs: list[DialogueInput],
+    index: int,
+    start: float,
+    end: float,
+) -> VoiceSegment:
+    """
+    A voice segment that covers the whole of line `index`.
+    """
+    from elevenlabs.types import VoiceSegment
+
+    return VoiceSegment(
+        voice_id=inputs[index].voice_id,
+        start_time_seconds=start,
+        end_time_seconds=end,
+        character_start_index=0,
+        character_end_index=len(inputs[index].text),
+        dialogue_input_index=index,
+    )
+
+
+Opcode = tuple[str, int, int, int, int]
+
+
+def diff_lines(keys: list[str], previous: RenderRecord) -> list[Opcode] | None:
+    """
+    Compare the line keys of a script with those of its previous render.
+
+    Returns:
+        list[Opcode] | None: The `difflib` opcodes that turn the previous lines
+            into the current ones, or `None` if no line changed.
+    """
+    old_keys = [line.key for line in previous.lines]
+    opcodes = SequenceMatcher(a=old_keys, b=keys, autojunk=False).get_opcodes()
+    if all(tag == "equal" for tag, *_ in opcodes):
+        return None
+    return opcodes
+
+
+def changed_runs(opcodes: list[Opcode]) -> list[tuple[int, int]]:
+    """
+    The ranges of current lines that were added or changed, each of which is
+    synthesized with a request of its own.
+    """
+    return [(j1, j2) for tag, _, _, j1, j2 in opcodes if tag != "equal" and j2 > j1]
+
+
+def splice(
+    inputs: list[DialogueInput],
+    opcodes: list[Opcode],
+    previous: RenderRecord,
+    previous_audio: bytes,
+    responses: list[DialogResponse],
+    spool_dir: Path | None = None,
+) -> DialogResponse:
+    """
+    Build the dialog for `inputs` out of the previous render and the responses
+    for the `changed_runs` of `opcodes`, given in the same order.
+
+    The previous audio is cut into one slot per line, running from the start
+    of the line to the start of the next one, so each slot carries the pause
+    that follows its line. Unchanged slots are copied frame by frame, and new
+    runs are spliced in between them at the nearest frame boundary. Each
+    changed run is synthesized on its own, so it will not share prosody with
+    the surrounding lines.
+
+    With a `spool_dir`, the spliced audio is written to a temporary file in it
+    one piece at a time, rather than joined in memory.
+
+    Returns:
+        DialogResponse: The spliced dialog with one voice segment per line.
+    """
+    old_mp3 = parse_mp3(previous_audio)
+    old_frames = old_mp3.audio_frames
+    boundaries = [0.0]
+    boundaries += [line.start for line in previous.lines[1:]]
+    boundaries.append(duration(old_frames))
+    frame_boundaries = [nearest_frame_index(old_frames, t) for t in boundaries]
+
+    if spool_dir is None:
+        out: io.BufferedIOBase = io.BytesIO()
+        path = None
+    else:
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = temp_file(spool_dir, suffix=".mp3")
+        out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+
+    def write(data: bytes) -> None:
+        out.write(data)
+        digest.update(data)
+
+    segments: list[VoiceSegment | None] = [None] * len(inputs)
+    new_responses = iter(responses)
+    elapsed = 0.0
+
+    def add_segment(index: int, start: float, end: float) -> None:
+        segments[index] = line_segment(inputs, index, start, end)
+
+    with out:
+        # The Xing/Info frame of the old audio is dropped rather than copied,
+        # because its frame count no longer matches.
+        write(old_mp3.tag)
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                first, last = frame_boundaries[i1], frame_boundaries[i2]
+                piece: list[Frame] = old_frames[first:last]
+                shift = elapsed - duration(old_frames[:first])
+                for offset, line in enumerate(previous.lines[i1:i2]):
+                    add_segment(j1 + offset, line.start + shift, line.end + shift)
+                write(old_mp3.frame_bytes(piece))
+                elapsed += duration(piece)
+            elif j2 > j1:
+                response = next(new_responses)
+                new_mp3 = parse_mp3(response.read_audio())
+                response.discard_audio()
+                piece = new_mp3.audio_frames
+                spans = line_spans(response.segments, j2 - j1)
+                for offset, (start, end) in enumerate(spans):
+                    add_segment(j1 + offset, start + elapsed, end + elapsed)
+                write(new_mp3.frame_bytes(piece))
+                elapsed += duration(piece)
+        audio_data = out.getvalue() if isinstance(out, io.BytesIO) else b""
+
+    return DialogResponse(
+        audio_data=audio_data,
+        segments=segments,  # type: ignore[arg-type]
+        audio_path=path,
+        audio_sha256=None if path is None else digest.hexdigest(),
+    )
@@ -1,8 +1,16 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class InputScriptLine:
     speaker: str | None
     voice_id: str
-    text: str
\ No newline at end of file
+    text: str
+    tagged_text: str | None = None
+
+    @property
+    def synthesis_text(self) -> str:
+        """
+        The text to synthesize, which is the tagged text if there is any.
+        """
+        return self.tagged_text or self.text
@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from enum import StrEnum
+from pathlib import Path
+
+from elevenlabs_client import DialogResponse
+from incremental import STATE_DIR
+
+# The version of the schema of the journal. A journal of another version is
+# started afresh.
+JOURNAL_VERSION = 2
+
+
+class JobState(StrEnum):
+    PENDING = "pending"
+    IN_FLIGHT = "in_flight"
+    SYNTHESIZED = "synthesized"
+    WRITTEN = "written"
+    FAILED = "failed"
+
+
+def journal_path(write_dir: Path) -> Path:
+    return write_dir / STATE_DIR / "journal.sqlite3"
+
+
+class Journal:
+    """
+    A crash-safe record of the state of every script in the current batch,
+    and in any earlier one that was not finished, kept in SQLite so that an
+    interrupted run can be resumed exactly where it stopped.
+
+    Audio is kept by the journal as soon as it is received and is only
+    dropped once the outputs of its script have been written, so a script
+    that was synthesized but not written is never paid for twice. The audio
+    is kept as files beside the database rather than in it, and spooled
+    audio is linked there rather than copied. Every change is committed right
+    away, in write-ahead-log mode so that a commit does not wait for the
+    whole database to be synced.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit, since every statement is its own transaction.
+        self._connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version != JOURNAL_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS jobs")
+            self._connection.execute(f"PRAGMA user_version = {JOURNAL_VERSION}")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                stem TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                state TEXT NOT NULL,
+                error TEXT,
+                key TEXT,
+                audio_path TEXT,
+                segments TEXT
+            )
+            """
+        )
+        self.audio_dir = path.with_name(f"{path.stem}-audio")
+        self.audio_dir.mkdir(exist_ok=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def begin(self, paths: list[Path]) -> None:
+        """
+        Start a new batch of `paths`, all pending. Audio that was received
+        for one of them but never written is kept, and so are the scripts of
+        earlier batches that were not finished, so that they can still be
+        resumed. Only finished scripts outside the batch are forgotten.
+        """
+        stems = [(path.stem,) for path in paths]
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.execute(
+                "CREATE TEMP TABLE batch (stem TEXT PRIMARY KEY)"
+            )
+            self._connection.executemany("INSERT INTO batch VALUES (?)", stems)
+            self._connection.execute(
+                """
+                DELETE FROM jobs
+                WHERE state = ? AND stem NOT IN (SELECT stem FROM batch)
+                """,
+                (JobState.WRITTEN,),
+            )
+            self._connection.execute("DROP TABLE batch")
+            self._connection.executemany(
+                """
+                INSERT INTO jobs (stem, path, state) VALUES (?, ?, ?)
+                ON CONFLICT (stem) DO UPDATE
+                SET path = excluded.path, state = excluded.state, error = NULL
+                """,
+                [
+                    (path.stem, str(path.absolute()), JobState.PENDING)
+                    for path in paths
+                ],
+            )
+
+    def unfinished(self) -> list[Path]:
+        """
+        The scripts whose outputs were not written, from the current batch or
+        an earlier one.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path FROM jobs WHERE state != ? ORDER BY stem",
+                (JobState.WRITTEN,),
+            ).fetchall()
+        return [Path(path) for (path,) in rows]
+
+    def state(self, stem: str) -> JobState | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM jobs WHERE stem = ?", (stem,)
+            ).fetchone()
+        return None if row is None else JobState(row[0])
+
+    def _set_state(self, stem: str, state: JobState, error: str | None = None) -> None:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET state = ?, error = ? WHERE stem = ?",
+                (state, error, stem),
+            )
+
+    def in_flight(self, stem: str) -> None:
+        self._set_state(stem, JobState.IN_FLIGHT)
+
+    def failed(self, stem: str, error: str) -> None:
+        self._set_state(stem, JobState.FAILED, error)
+
+    def _keep_audio(self, stem: str, response: DialogResponse) -> Path:
+        """
+        Keep the audio of a response as a file of the journal. Spooled audio
+        is linked rather than copied where the file system allows it.
+        """
+        path = self.audio_dir / f"{stem}.mp3"
+        temp_path = path.with_name(f".{path.name}.tmp")
+        temp_path.unlink(missing_ok=True)
+        if response.audio_path is None:
+            temp_path.write_bytes(response.audio_data)
+        else:
+            try:
+                os.link(response.audio_path, temp_path)
+            except OSError:
+                shutil.copyfile(response.audio_path, temp_path)
+        os.replace(temp_path, path)
+        return path
+
+    def synthesized(self, stem: str, key: str, response: DialogResponse) -> None:
+        """
+        Keep the dialog that was received for a script with the key of the
+        request that produced it.
+        """
+        audio_path = self._keep_audio(stem, response)
+        segments = [segment.model_dump() for segment in response.segments]
+        with self._lock:
+            self._connection.execute(
+                """
+                UPDATE jobs SET state = ?, error = NULL, key = ?, audio_path = ?,
+                segments = ? WHERE stem = ?
+                """,
+                (
+                    JobState.SYNTHESIZED,
+                    key,
+                    str(audio_path),
+                    json.dumps(segments),
+                    stem,
+                ),
+            )
+
+    def received(self, stem: str, key: str) -> DialogResponse | None:
+        """
+        The dialog kept for a script, provided that it was produced by a
+        request with the same key. Its audio is spooled to the journal's own
+        file, which writing the outputs moves into place.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT audio_path, segments FROM jobs WHERE stem = ? AND key = ?",
+                (stem, key),
+            ).fetchone()
+        if row is None or row[0] is None or not os.path.exists(row[0]):
+            return None
+        audio_path, segments = row
+        from elevenlabs.types import VoiceSegment
+
+        return DialogResponse(
+            audio_data=b"",
+            segments=[VoiceSegment(**segment) for segment in json.loads(segments)],
+            audio_path=Path(audio_path),
+        )
+
+    def written(self, stem: str) -> None:
+        """
+        Record that the outputs of a script were written, dropping its audio.
+        """
+        with self._lock:
+            self._connection.execute(
+                """
+                UPDATE jobs SET state = ?, error = NULL, key = NULL,
+                audio_path = NULL, segments = NULL WHERE stem = ?
+                """,
+                (JobState.WRITTEN, stem),
+            )
+        (self.audio_dir / f"{stem}.mp3").unlink(missing_ok=True)
@@ -1,23 +1,226 @@
-from functools import partial
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 import os
+import sys
 import argparse
 from pathlib import Path
+import shutil
+import tempfile
+from typing import TYPE_CHECKING
+
+from elevenlabs_client import ElevenLabsClient, RequestSettings
+from errors import ElevenLabsClientError, InvalidScriptsError
+from incremental import STATE_DIR
+from journal import Journal, journal_path
+from manifest import Manifest, manifest_path
+from metrics import Metrics
+from rate_limit import CharacterBucket
+from retry import RetryPolicy
+from scheduling import chunk_costs, format_duration, makespan
+from synthesis_cache import SynthesisCache, default_cache_dir
+from tracing import Tracer
+from voice_catalog import VoiceCatalog, catalog_path
+
+# The SDK, and the other modules that take long to import, are imported where
+# they are used, so that `--help`, mistakes in arguments and runs with nothing
+# to build exit without waiting for them.
+if TYPE_CHECKING:
+    from pipeline import Pipeline
+
+
+BASE_URL = "https://api.elevenlabs.io"
+
+# The timeout of a single API request in seconds, matching the SDK default.
+REQUEST_TIMEOUT = 240
+
+# How often, in seconds, metrics are exported while a pipeline runs.
+METRICS_INTERVAL = 60
+
+
+@dataclass
+class Arguments:
+    input: Path
+    scripts: list[Path]
+    overwrite: bool
+    write_dir: Path
+    requests: int
+    max_requests: int | None
+    retries: int
+    chars_per_minute: int | None
+    cache_dir: Path | None
+    cache_size: int
+    prune_cache: bool
+    incremental: bool
+    resume: bool
+    watch: bool
+    base_url: str
+    fsync: bool = False
+    plan: bool = False
+    metrics_dir: Path | None = None
+    trace: Path | None = None
+    profile: Path | None = None
+
+
+@dataclass
+class ServeArguments:
+    write_dir: Path
+    jobs_dir: Path
+    host: str
+    port: int
+    requests: int
+    max_requests: int | None
+    retries: int
+    chars_per_minute: int | None
+    cache_dir: Path | None
+    cache_size: int
+    prune_cache: bool
+    base_url: str
+    incremental: bool = False
+    fsync: bool = False
+    metrics_dir: Path | None = None
+
+
+def add_request_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the options that control how requests are made to the API, and how
+    their results are stored.
+    """
+    parser.add_argument(
+        "-r",
+        "--requests",
+        type=int,
+        default=3,
+        help="number of simultaneous requests, default 3"
+    )
+
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        help=(
+            "adapt the number of simultaneous requests to how the API responds, "
+            "starting from --requests and never exceeding this ceiling"
+        ),
+    )
+
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=4,
+        help=(
+            "number of times to retry a request that was throttled or failed "
+            "for a transient reason, default 4"
+        ),
+    )
+
+    parser.add_argument(
+        "--chars-per-minute",
+        type=int,
+        help="pace requests to a quota of characters per minute",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=default_cache_dir(),
+        help=f"directory of cached API responses, default {default_cache_dir()}",
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="maximum size of the response cache in megabytes, default 1024",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="neither read from nor write to the response cache",
+    )
+
+    parser.add_argument(
+        "--prune-cache",
+        action="store_true",
+        help="evict cached responses down to --cache-size before running",
+    )
+
+    parser.add_argument(
+        "--base-url",
+        default=os.getenv("ELEVENLABS_BASE_URL") or BASE_URL,
+        help=(
+            "base URL of the ElevenLabs API, default $ELEVENLABS_BASE_URL or "
+            f"{BASE_URL}"
+        ),
+    )
 
-from dotenv import load_dotenv
-from elevenlabs import ElevenLabs
-from tqdm import tqdm
-from tqdm.contrib.concurrent import thread_map
-from dialog_script import DialogScript
-from elevenlabs_client import ElevenLabsClient
-from errors import ElevenLabsClientError, VoiceNotAvailableError
-from output_writer import OutputWriter
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        help=(
+            "flush output files to disk before they are reported as written, "
+            "once per batch of scripts"
+        ),
+    )
 
+    parser.add_argument(
+        "--metrics-dir",
+        type=Path,
+        help=(
+            "export counters and timings of every phase to daisies.prom and "
+            f"daisies.json in this directory, every {METRICS_INTERVAL} seconds "
+            "and on exit"
+        ),
+    )
 
-def parse_args() -> tuple[list[Path], bool, Path, int]:
+
+def find_scripts(directory: Path) -> list[Path]:
+    """
+    The JSON scripts in `directory`, found with a single directory listing.
+    """
+    with os.scandir(directory) as entries:
+        return [
+            directory / entry.name
+            for entry in entries
+            if entry.name.lower().endswith(".json") and entry.is_file()
+        ]
+
+
+def check_request_arguments(
+    parser: argparse.ArgumentParser,
+    args: argparse.Namespace,
+) -> None:
+    if args.requests < 1:
+        parser.error(f"Number of requests must be at least 1, not: {args.requests}")
+
+    if args.max_requests is not None and args.max_requests < args.requests:
+        parser.error(
+            f"Maximum requests cannot be less than --requests: {args.max_requests}"
+        )
+
+    if args.retries < 0:
+        parser.error(f"Number of retries cannot be negative: {args.retries}")
+
+    if args.chars_per_minute is not None and args.chars_per_minute < 1:
+        parser.error(
+            f"Characters per minute must be at least 1, not: {args.chars_per_minute}"
+        )
+
+    if args.cache_size < 0:
+        parser.error(f"Cache size cannot be negative: {args.cache_size}")
+
+
+def parse_args() -> Arguments:
     parser = argparse.ArgumentParser(
         prog="daisies",
         description="A utility for generating audio and timestamps from text dialog scripts.",
-        epilog="Examples:\n  daisies ./scripts\n  daisies ./scripts/dialog.json",
+        epilog=(
+            "Examples:\n  daisies ./scripts\n  daisies ./scripts/dialog.json\n"
+            "  daisies serve ./jobs"
+        ),
     )
 
     parser.add_argument(
@@ -26,25 +229,87 @@ def parse_args() -> tuple[list[Path], bool, Path, int]:
         help="a JSON script or directory that contains JSON scripts",
     )
 
-    parser.add_argument(
-        "-r",
-        "--requests",
-        type=int,
-        default=3,
-        help="number of simultaneous requests, default 3"
-    )
+    add_request_arguments(parser)
 
     parser.add_argument(
         "-o",
         "--overwrite",
         action="store_true",
-        help="allow overwriting of existing files",
+        help="rebuild every script, even if its outputs are up to date",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "finish the scripts of an interrupted run, reusing any audio that "
+            "was received before it stopped"
+        ),
+    )
+
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help=(
+            "keep running and rebuild scripts in the input directory as they "
+            "are created or modified"
+        ),
+    )
+
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="re-synthesize only the lines that changed since the last render",
+    )
+
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help=(
+            "print the scripts that would be built and an estimate of how "
+            "long that would take with --requests, without building them"
+        ),
+    )
+
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        metavar="FILE",
+        help=(
+            "write a timeline of every phase of every script, on the task or "
+            "thread it ran on, to FILE in the Chrome trace-event format, which "
+            "Perfetto opens"
+        ),
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="DIR",
+        help=(
+            "profile the time and memory that the run spends in each function, "
+            "and write a report, profile.pstats and allocations.snapshot to DIR; "
+            "tracing memory slows down work other than waiting on the API many "
+            "times over"
+        ),
     )
 
     args = parser.parse_args()
     path: Path = args.input
     overwrite: bool = args.overwrite
-    requests: int = args.requests
+
+    check_request_arguments(parser, args)
+
+    if args.resume and overwrite:
+        parser.error("Cannot resume and overwrite at the same time")
+
+    if args.resume and args.watch:
+        parser.error("Cannot resume and watch at the same time")
+
+    if args.plan and args.watch:
+        parser.error("Cannot plan and watch at the same time")
 
     if not path.exists():
         parser.error(f"Not found: {path}")
@@ -55,7 +320,7 @@ def parse_args() -> tuple[list[Path], bool, Path, int]:
         write_dir = path.parent / "output"
         scripts = [path]
     elif path.is_dir():
-        scripts = list({*path.glob("*.json"), *path.glob("*.JSON")})
+        scripts = find_scripts(path)
         if not scripts:
             parser.error(f"No JSON files found in directory: {path}")
         write_dir = path / "output"
@@ -65,7 +330,87 @@ def parse_args() -> tuple[list[Path], bool, Path, int]:
     if not os.access(write_dir.parent, os.W_OK):
         parser.error(f"No write permission in directory: {write_dir.parent}")
 
-    return scripts, overwrite, write_dir, requests
+    return Arguments(
+        input=path,
+        scripts=scripts,
+        overwrite=overwrite,
+        write_dir=write_dir,
+        requests=args.requests,
+        max_requests=args.max_requests,
+        retries=args.retries,
+        chars_per_minute=args.chars_per_minute,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+        prune_cache=args.prune_cache,
+        incremental=args.incremental,
+        resume=args.resume,
+        watch=args.watch,
+        base_url=args.base_url,
+        fsync=args.fsync,
+        plan=args.plan,
+        metrics_dir=args.metrics_dir,
+        trace=args.trace,
+        profile=args.profile,
+    )
+
+
+def parse_serve_args(argv: list[str]) -> ServeArguments:
+    parser = argparse.ArgumentParser(
+        prog="daisies serve",
+        description=(
+            "Serve dialog synthesis over HTTP. Scripts posted to /jobs are "
+            "queued, and their audio and output scripts are written to the "
+            "output directory under the job ID."
+        ),
+    )
+
+    parser.add_argument(
+        "directory",
+        type=Path,
+        help="directory that keeps the posted scripts and, in ./output, their outputs",
+    )
+
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="address to listen on, default 127.0.0.1",
+    )
+
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8080,
+        help="port to listen on, default 8080",
+    )
+
+    add_request_arguments(parser)
+
+    args = parser.parse_args(argv)
+    check_request_arguments(parser, args)
+
+    directory: Path = args.directory
+    if directory.exists() and not directory.is_dir():
+        parser.error(f"Expected a directory, but got: {directory}")
+
+    if not 0 <= args.port <= 65535:
+        parser.error(f"Invalid port: {args.port}")
+
+    return ServeArguments(
+        write_dir=directory / "output",
+        jobs_dir=directory,
+        host=args.host,
+        port=args.port,
+        requests=args.requests,
+        max_requests=args.max_requests,
+        retries=args.retries,
+        chars_per_minute=args.chars_per_minute,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+        prune_cache=args.prune_cache,
+        base_url=args.base_url,
+        fsync=args.fsync,
+        metrics_dir=args.metrics_dir,
+    )
 
 
 def get_api_key() -> str:
@@ -75,72 +420,420 @@ def get_api_key() -> str:
     return api_key
 
 
-def decide_files_to_write(
-    inputs: list[Path],
-    overwrite: bool,
-    write_dir: Path,
+def select_scripts(
+    paths: list[Path],
+    args: Arguments,
+    manifest: Manifest,
+    journal: Journal | None,
+    settings: RequestSettings,
 ) -> list[Path]:
-    if overwrite or not write_dir.exists():
-        return inputs
-    existing_stems = {file.stem for file in write_dir.iterdir()}
-    return [path for path in inputs if path.stem not in existing_stems]
+    """
+    The scripts among `paths` that need to be built: those that are outdated
+    according to the manifest, or all of them when overwriting, together with
+    those that the journal says were not finished.
+    """
+    if args.overwrite:
+        outdated = set(paths)
+    else:
+        outdated = set(manifest.outdated(paths, args.write_dir, settings))
+    if journal is None:
+        return [path for path in paths if path in outdated]
+    # Outputs of a script that was not finished may be incomplete, however
+    # current they look.
+    unfinished = {path.stem for path in journal.unfinished()}
+    return [path for path in paths if path in outdated or path.stem in unfinished]
+
+
+def print_plan(args: Arguments) -> None:
+    """
+    Print how many scripts a run would build, and an estimate of how long it
+    would take, without making any request or writing any file.
+    """
+    from pipeline import try_load_script
+
+    manifest = Manifest(manifest_path(args.write_dir))
+    # The journal is not opened, since that would create it.
+    scripts = select_scripts(args.scripts, args, manifest, None, RequestSettings())
+    if not scripts:
+        print("All outputs are up to date and overwriting was not enabled")
+        return
+    jobs: dict[str, list[float]] = {}
+    characters = 0
+    invalid = {}
+    for path in scripts:
+        script = try_load_script(path)
+        if isinstance(script, str):
+            invalid[path] = script
+            continue
+        jobs[script.stem] = chunk_costs(script)
+        characters += sum(len(line.synthesis_text) for line in script.lines)
+    if jobs:
+        requests = sum(len(costs) for costs in jobs.values())
+        longest = max(jobs, key=lambda stem: sum(jobs[stem]))
+        estimate = makespan(list(jobs.values()), args.requests)
+        print(
+            f"{len(jobs)} scripts to build, with {characters} characters in "
+            f"{requests} requests"
+        )
+        print(f"Longest script: {longest} ({format_duration(sum(jobs[longest]))})")
+        print(
+            f"Estimated time with {args.requests} simultaneous requests: "
+            f"{format_duration(estimate)}"
+        )
+    if invalid:
+        print(InvalidScriptsError(invalid).msg)
+
+
+def report_run(pipeline: Pipeline) -> None:
+    retries = pipeline.retries
+    if retries:
+        counts = ", ".join(f"{stem} ({n})" for stem, n in retries.most_common())
+        print(f"Retried {retries.total()} requests: {counts}")
+    if pipeline.deduplicated:
+        print(
+            f"Saved {pipeline.deduplicated} requests by sharing the responses "
+            "of identical dialogs"
+        )
+
+
+def write_trace(tracer: Tracer | None, path: Path | None) -> None:
+    if tracer is None or path is None:
+        return
+    try:
+        tracer.write(path)
+    except OSError as error:
+        print(f"Could not write the trace: {error}")
+    else:
+        print(f"Wrote the trace of the run to {path}")
+
+
+def export_metrics(metrics: Metrics, directory: Path) -> None:
+    try:
+        metrics.export(directory)
+    except OSError as error:
+        print(f"Could not export metrics: {error}")
+
+
+async def export_metrics_periodically(metrics: Metrics, directory: Path) -> None:
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL)
+        await asyncio.to_thread(export_metrics, metrics, directory)
+
+
+@asynccontextmanager
+async def open_pipeline(
+    args: Arguments | ServeArguments,
+    api_key: str,
+    cache: SynthesisCache | None,
+    voice_catalog: VoiceCatalog,
+    manifest: Manifest | None = None,
+    journal: Journal | None = None,
+    metrics: Metrics | None = None,
+) -> AsyncIterator[Pipeline]:
+    """
+    A pipeline with a connection pool of its own that is closed on exit.
+    Received audio is spooled to a directory of its own under the output
+    directory, which is removed on exit. With a metrics directory, the
+    metrics are exported there periodically and once more on exit.
+    """
+    import httpx
+    from elevenlabs import AsyncElevenLabs
+
+    from elevenlabs_client import AsyncElevenLabsClient
+    from pipeline import Pipeline
+
+    metrics = metrics or Metrics()
+    # The connection pool is sized to match the request limit, because the
+    # default pool would otherwise cap the number of requests in flight.
+    connections = args.max_requests or args.requests
+    limits = httpx.Limits(
+        max_connections=connections,
+        max_keepalive_connections=connections,
+    )
+    spool_root = args.write_dir / STATE_DIR / "spool"
+    spool_root.mkdir(parents=True, exist_ok=True)
+    spool_dir = Path(tempfile.mkdtemp(dir=spool_root))
+    async with httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT) as http:
+        api = AsyncElevenLabs(
+            base_url=args.base_url, api_key=api_key, httpx_client=http
+        )
+        pipeline = Pipeline(
+            client=AsyncElevenLabsClient(api, spool_dir=spool_dir, metrics=metrics),
+            write_dir=args.write_dir,
+            requests=args.requests,
+            cache=cache,
+            incremental=args.incremental,
+            max_requests=args.max_requests,
+            retry_policy=RetryPolicy(retries=args.retries),
+            character_bucket=(
+                CharacterBucket(args.chars_per_minute)
+                if args.chars_per_minute
+                else None
+            ),
+            voice_catalog=voice_catalog,
+            manifest=manifest,
+            journal=journal,
+            fsync=args.fsync,
+            metrics=metrics,
+        )
+        exporting = None
+        if args.metrics_dir is not None:
+            exporting = asyncio.create_task(
+                export_metrics_periodically(metrics, args.metrics_dir)
+            )
+        try:
+            yield pipeline
+        finally:
+            pipeline.close()
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            if exporting is not None:
+                exporting.cancel()
+                export_metrics(metrics, args.metrics_dir)
+
+
+async def run_pipeline(scripts: list[Path], **kwargs) -> Pipeline:
+    """
+    Process `scripts` with a pipeline of its own. See `open_pipeline` for
+    the keyword arguments.
+
+    Returns:
+        Pipeline: The pipeline, closed, with the statistics of the run.
+    """
+    async with open_pipeline(**kwargs) as pipeline:
+        await pipeline.run(scripts)
+    return pipeline
 
 
-def process_script(
-    script: DialogScript,
-    client: ElevenLabsClient,
-    write_dir: Path,
+async def watch_scripts(
+    scripts: list[Path],
+    args: Arguments,
+    manifest: Manifest,
+    journal: Journal,
+    **kwargs,
 ) -> None:
-    response = client.get_dialog(inputs=script.dialog_inputs)
-    writer = OutputWriter(
-        write_dir=write_dir,
-        input_script=script,
-        response=response,
+    """
+    Process `scripts`, then keep processing the scripts in the input
+    directory as they are created or modified, until interrupted. One
+    pipeline, and so one connection pool, serves every batch. An error stops
+    the batch that it happened in, but not the watching, and the scripts that
+    it left unfinished are retried with the next batch.
+    """
+    from watcher import watch
+
+    directory = args.input if args.input.is_dir() else args.input.parent
+    async with open_pipeline(
+        args=args, manifest=manifest, journal=journal, **kwargs
+    ) as pipeline:
+        settings = pipeline.client.settings
+
+        # The scripts that an error kept a batch from finishing, which are
+        # retried with the next batch rather than waiting for another edit.
+        interrupted: list[Path] = []
+
+        async def run_batch(batch: list[Path]) -> None:
+            stems = {path.stem for path in batch}
+            batch = batch + [
+                path
+                for path in interrupted
+                if path.stem not in stems and path.exists()
+            ]
+            interrupted.clear()
+            await asyncio.to_thread(journal.begin, batch)
+            pipeline.retries.clear()
+            pipeline.deduplicated = 0
+            try:
+                await pipeline.run(batch)
+            except InvalidScriptsError as error:
+                # Every other script was finished. The invalid ones are built
+                # again once they are edited, and not retried before then.
+                print(f"Error: {error.msg}")
+            except Exception as error:
+                print(f"Error: {getattr(error, 'msg', None) or error}")
+                unfinished = await asyncio.to_thread(journal.unfinished)
+                unfinished_stems = {path.stem for path in unfinished}
+                interrupted.extend(
+                    path for path in batch if path.stem in unfinished_stems
+                )
+            finally:
+                await asyncio.to_thread(manifest.save)
+            report_run(pipeline)
+
+        if scripts:
+            await run_batch(scripts)
+        print(f"Watching {directory} for changes, press Ctrl-C to stop")
+        async for changed in watch(directory):
+            if args.input.is_file():
+                # Only the script that was given is watched.
+                changed = [path for path in changed if path == args.input]
+            batch = await asyncio.to_thread(
+                select_scripts, changed, args, manifest, journal, settings
+            )
+            if batch:
+                await run_batch(batch)
+
+
+def open_voice_catalog(
+    args: Arguments | ServeArguments,
+    api_key: str,
+) -> VoiceCatalog:
+    """
+    The voice catalog of the API key, kept in the cache directory unless the
+    cache is disabled. The client that lists the voices is only made when
+    they need to be listed.
+    """
+
+    def fetch() -> set[str]:
+        from elevenlabs import ElevenLabs
+
+        api = ElevenLabs(base_url=args.base_url, api_key=api_key)
+        return ElevenLabsClient(api).available_voices()
+
+    path = (
+        None
+        if args.cache_dir is None
+        else catalog_path(args.cache_dir, args.base_url, api_key)
     )
-    writer.write_audio()
-    writer.write_output_script()
+    return VoiceCatalog(fetch, path)
 
 
-def main():
-    inputs, overwrite, write_dir, requests = parse_args()
+def open_cache(args: Arguments | ServeArguments) -> SynthesisCache | None:
+    if args.cache_dir is None:
+        return None
+    cache = SynthesisCache(args.cache_dir, max_bytes=args.cache_size)
+    if args.prune_cache:
+        cache.prune()
+    return cache
+
+
+async def serve(args: ServeArguments, **kwargs) -> None:
+    from server import DialogServer
+
+    async with open_pipeline(args=args, **kwargs) as pipeline:
+        server = DialogServer(pipeline, args.jobs_dir)
+        started = asyncio.Event()
+        serving = asyncio.create_task(server.serve(args.host, args.port, started))
+        await started.wait()
+        print(f"Serving on http://{args.host}:{server.port}, press Ctrl-C to stop")
+        await serving
+
+
+def serve_main(argv: list[str]) -> None:
+    from dotenv import load_dotenv
+
+    args = parse_serve_args(argv)
     load_dotenv()
 
-    api = ElevenLabs(
-        base_url="https://api.elevenlabs.io",
-        api_key=get_api_key(),
-    )
-    client = ElevenLabsClient(api)
+    api_key = get_api_key()
+    cache = open_cache(args)
+    voice_catalog = open_voice_catalog(args, api_key)
+    # Check the catalog up front, so that a bad API key stops the server
+    # before it accepts any job.
+    try:
+        voice_catalog.voices()
+    except ElevenLabsClientError as error:
+        raise SystemExit(error.msg)
 
-    scripts = decide_files_to_write(
-        inputs=inputs,
-        overwrite=overwrite,
-        write_dir=write_dir,
-    )
-    if not scripts:
-        raise SystemExit(
-            "All input files have corresponding outputs and overwriting was not enabled"
+    try:
+        asyncio.run(
+            serve(
+                args,
+                api_key=api_key,
+                cache=cache,
+                voice_catalog=voice_catalog,
+            )
         )
-    dialog_scripts = [DialogScript(path) for path in scripts]
+    except KeyboardInterrupt:
+        pass
 
-    voices = {voice for script in dialog_scripts for voice in script.voices}
-    try:
-        client.verify_voices(list(voices))
-    except VoiceNotAvailableError as e:
-        raise SystemExit(e)
+
+def main():
+    if sys.argv[1:2] == ["serve"]:
+        serve_main(sys.argv[2:])
+        return
+
+    args = parse_args()
+    if args.plan:
+        print_plan(args)
+        return
+    if args.profile is None:
+        build(args)
+        return
+    from profiling import profiled
+
+    with profiled(args.profile):
+        build(args)
+
+
+def build(args: Arguments) -> None:
+    """
+    Build the scripts that need it, or keep building them as they change in
+    watch mode.
+    """
+    from dotenv import load_dotenv
+
+    write_dir = args.write_dir
+    load_dotenv()
+
+    api_key = get_api_key()
+    cache = open_cache(args)
+    tracer = Tracer() if args.trace is not None else None
+    metrics = Metrics(tracer)
+
+    manifest = Manifest(manifest_path(write_dir))
+    journal = Journal(journal_path(write_dir))
+    if args.resume:
+        scripts = [path for path in journal.unfinished() if path.exists()]
+        if not scripts:
+            journal.close()
+            raise SystemExit("Nothing to resume")
+    else:
+        with metrics.timed("select_seconds"):
+            scripts = select_scripts(
+                args.scripts, args, manifest, journal, RequestSettings()
+            )
+        if not scripts and not args.watch:
+            manifest.save()
+            journal.close()
+            raise SystemExit(
+                "All outputs are up to date and overwriting was not enabled"
+            )
+        journal.begin(scripts)
+    # Voices are only listed once a script is parsed, and then only if the
+    # catalog on disk is stale or lacks a voice of the script.
+    voice_catalog = open_voice_catalog(args, api_key)
 
     write_dir.mkdir(exist_ok=True)
 
+    pipeline_args = dict(
+        args=args,
+        api_key=api_key,
+        cache=cache,
+        voice_catalog=voice_catalog,
+        manifest=manifest,
+        journal=journal,
+        metrics=metrics,
+    )
+    if args.watch:
+        try:
+            asyncio.run(watch_scripts(scripts, **pipeline_args))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            manifest.save()
+            journal.close()
+            write_trace(tracer, args.trace)
+        return
 
     try:
-        thread_map(
-            partial(process_script, client=client, write_dir=write_dir),
-            dialog_scripts,
-            max_workers=requests,
-            desc="Processing",
-            unit="file",
-        )
-    except ElevenLabsClientError as error:
+        pipeline = asyncio.run(run_pipeline(scripts, **pipeline_args))
+    except (ElevenLabsClientError, InvalidScriptsError) as error:
         raise SystemExit(error.msg)
+    finally:
+        manifest.save()
+        journal.close()
+        write_trace(tracer, args.trace)
+
+    report_run(pipeline)
 
 
 if __name__ == "__main__":
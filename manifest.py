@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Mapping
+from dataclasses import asdict
+from pathlib import Path
+
+from elevenlabs_client import RequestSettings
+from incremental import STATE_DIR
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(write_dir: Path) -> Path:
+    return write_dir / STATE_DIR / "manifest.json"
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_hash(settings: RequestSettings) -> str:
+    encoded = json.dumps(asdict(settings), sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _scan(directory: Path) -> dict[str, os.stat_result]:
+    """
+    Stat every file in `directory` with a single directory listing.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return {
+                entry.name: entry.stat() for entry in entries if entry.is_file()
+            }
+    except FileNotFoundError:
+        return {}
+
+
+def _file_record(path: Path, stat: os.stat_result, sha256: str) -> dict:
+    return {
+        "name": path.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+    }
+
+
+class Manifest:
+    """
+    A record of what every output in a directory was built from: the content
+    hash of the input script, a hash of the request settings, and the hashes
+    of the output files. It lets a run rebuild exactly the scripts whose
+    inputs or settings changed, or whose outputs went missing or were
+    modified, in the manner of `make`.
+
+    Files are only hashed when their size or modification time differs from
+    what was recorded, so unchanged files cost one `stat` each.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._scripts: dict[str, dict] = {}
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self._scripts = data["scripts"]
+
+    def _matches(
+        self,
+        path: Path,
+        stat: os.stat_result | None,
+        recorded: dict | None,
+    ) -> tuple[bool, str | None]:
+        """
+        Whether a file still has the content that was recorded for it, and
+        its hash if it had to be computed.
+        """
+        if stat is None or recorded is None:
+            return False, None
+        if (
+            stat.st_size == recorded["size"]
+            and stat.st_mtime_ns == recorded["mtime_ns"]
+        ):
+            return True, recorded["sha256"]
+        sha256 = file_hash(path)
+        return sha256 == recorded["sha256"], sha256
+
+    def outdated(
+        self,
+        inputs: list[Path],
+        write_dir: Path,
+        settings: RequestSettings,
+        output_suffixes: tuple[str, ...] = (".mp3", ".json"),
+    ) -> list[Path]:
+        """
+        The inputs whose outputs need to be built or rebuilt.
+
+        Outputs that were made before the manifest existed are adopted as they
+        are, provided that they are newer than their input. Adopted outputs
+        are recorded in the manifest as if they had been built by this run.
+        """
+        settings_key = settings_hash(settings)
+        input_stats: dict[Path, dict[str, os.stat_result]] = {}
+        output_stats = _scan(write_dir)
+        outdated = []
+
+        for path in inputs:
+            if path.parent not in input_stats:
+                input_stats[path.parent] = _scan(path.parent)
+            input_stat = input_stats[path.parent].get(path.name)
+            outputs = [path.stem + suffix for suffix in output_suffixes]
+            entry = self._scripts.get(path.stem)
+
+            if entry is None:
+                stats = [output_stats.get(name) for name in outputs]
+                if input_stat is not None and all(
+                    stat is not None and stat.st_mtime_ns >= input_stat.st_mtime_ns
+                    for stat in stats
+                ):
+                    self.record(path, [write_dir / name for name in outputs], settings)
+                else:
+                    outdated.append(path)
+                continue
+
+            input_matches, input_sha256 = self._matches(
+                path, input_stat, entry["input"]
+            )
+            if (
+                not input_matches
+                or entry["input"]["name"] != path.name
+                or entry["settings"] != settings_key
+                or any(
+                    not self._matches(
+                        write_dir / name,
+                        output_stats.get(name),
+                        entry["outputs"].get(name),
+                    )[0]
+                    for name in outputs
+                )
+            ):
+                outdated.append(path)
+            elif input_stat.st_mtime_ns != entry["input"]["mtime_ns"]:
+                # The input was touched but not changed, so remember its new
+                # modification time to avoid hashing it again next time.
+                entry["input"] = _file_record(path, input_stat, input_sha256)
+        return outdated
+
+    def record(
+        self,
+        input_path: Path,
+        output_paths: list[Path],
+        settings: RequestSettings,
+        source: tuple[os.stat_result, str] | None = None,
+        hashes: Mapping[Path, str] | None = None,
+    ) -> None:
+        """
+        Record that `output_paths` were built from `input_path`.
+
+        `source` is the status and hash of the input as it was read to build
+        the outputs, and `hashes` are the hashes of the outputs as they were
+        written. Without them, the files are taken as they are now, and only
+        hashed if they changed since they were last recorded.
+        """
+        with self._lock:
+            previous = self._scripts.get(input_path.stem)
+        if source is None:
+            source = self._version(input_path, previous and previous["input"])
+        outputs = {}
+        for path in output_paths:
+            stat = path.stat()
+            sha256 = (hashes or {}).get(path)
+            if sha256 is None:
+                sha256 = self._version(
+                    path, previous and previous["outputs"].get(path.name), stat
+                )[1]
+            outputs[path.name] = _file_record(path, stat, sha256)
+        with self._lock:
+            self._scripts[input_path.stem] = {
+                "input": _file_record(input_path, *source),
+                "settings": settings_hash(settings),
+                "outputs": outputs,
+            }
+
+    def _version(
+        self,
+        path: Path,
+        recorded: dict | None,
+        stat: os.stat_result | None = None,
+    ) -> tuple[os.stat_result, str]:
+        """
+        The status and hash of a file as it is now.
+        """
+        if stat is None:
+            stat = path.stat()
+        _, sha256 = self._matches(path, stat, recorded)
+        if sha256 is None:
+            sha256 = file_hash(path)
+        return stat, sha256
+
+    def save(self) -> None:
+        with self._lock:
+            data = {"version": MANIFEST_VERSION, "scripts": self._scripts}
+            encoded = json.dumps(data, indent=2, sort_keys=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f".{self.path.name}.tmp")
+        temp_path.write_text(encoded, encoding="utf-8")
+        os.replace(temp_path, self.path)
@@ -0,0 +1,201 @@
+import bisect
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from tracing import Tracer
+from write_batch import batch_or_single
+
+# The upper bounds, in seconds, of the buckets of every latency histogram,
+# from a fraction of a millisecond for the local phases to minutes for the
+# longest requests.
+BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# What each metric measures, for the HELP lines of the Prometheus export.
+DESCRIPTIONS = {
+    "scripts_invalid": "Scripts that were skipped as invalid",
+    "requests": "Text-to-dialog requests that were sent, retries included",
+    "request_errors": "Text-to-dialog requests that failed",
+    "retries": "Text-to-dialog requests that were retried",
+    "cache_hits": "Requests that were answered by the synthesis cache",
+    "deduplicated_requests": "Requests that shared an identical one in flight",
+    "characters_sent": "Characters of text sent to the API",
+    "audio_bytes_received": "Bytes of audio received from the API",
+    "bytes_written": "Bytes of output written",
+    "outputs_written": "Scripts whose outputs were written",
+    "select_seconds": "Time spent finding the scripts to build",
+    "parse_seconds": "Time spent loading and validating a script",
+    "voices_seconds": "Time spent checking the voices of a script",
+    "request_seconds": "Time spent on one text-to-dialog request",
+    "decode_seconds": "Time spent decoding the audio of a response",
+    "render_seconds": "Time spent getting the dialog of a script",
+    "build_seconds": "Time spent building an output script",
+    "validate_seconds": "Time spent validating an output script",
+    "write_seconds": "Time spent writing a batch of outputs",
+    "run_seconds": "Time spent on a whole run",
+}
+
+
+def _format_value(value: float) -> str:
+    """
+    A counter value in full: integral values as integers, and other values
+    as the shortest decimal that reads back as the same float.
+    """
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    Observations counted in the buckets of `BUCKETS`, like a Prometheus
+    histogram, together with their count, sum and maximum.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(BUCKETS, value)
+        if index < len(BUCKETS):
+            self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        An estimate of the `q` quantile: the upper bound of the bucket that
+        it falls into, or the maximum if it is beyond the last bucket.
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """
+    Counters and latency histograms of the phases of a run, which can be
+    updated from any thread, and exported as a Prometheus text file or a JSON
+    summary. With a `tracer`, every timed block is also recorded as a span.
+    """
+
+    def __init__(self, tracer: Tracer | None = None):
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        self.counters: dict[str, float] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+    def count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, name: str, **args: object) -> Iterator[None]:
+        """
+        Observe the wall time of the enclosed block, whether it succeeds or
+        not. It may enclose `await`s. The span that is traced, if any, is
+        named after the histogram and labelled with `args`.
+        """
+        span = (
+            self.tracer.span(name.removesuffix("_seconds"), **args)
+            if self.tracer is not None
+            else nullcontext()
+        )
+        started = time.perf_counter()
+        try:
+            with span:
+                yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def to_prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text format, as read from files by the
+        textfile collector of the node exporter.
+        """
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"daisies_{name}_total"
+                lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {_format_value(value)}")
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"daisies_{name}"
+                lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum:.6f}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> dict:
+        """
+        A summary of the metrics: the counters, and the count, total, mean,
+        estimated quantiles and maximum of every histogram.
+        """
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {
+                    name: {
+                        "count": histogram.count,
+                        "sum": round(histogram.sum, 6),
+                        "mean": round(histogram.sum / histogram.count, 6),
+                        "p50": round(histogram.quantile(0.5), 6),
+                        "p95": round(histogram.quantile(0.95), 6),
+                        "p99": round(histogram.quantile(0.99), 6),
+                        "max": round(histogram.max, 6),
+                    }
+                    for name, histogram in sorted(self.histograms.items())
+                },
+            }
+
+    def export(self, directory: Path) -> None:
+        """
+        Write the metrics to `daisies.prom` and `daisies.json` in `directory`,
+        replacing them at once, so that a collector never reads half a file.
+        """
+        with batch_or_single(None) as batch:
+            batch.write_text(directory / "daisies.prom", self.to_prometheus())
+            batch.write_text(
+                directory / "daisies.json", json.dumps(self.to_json(), indent=2)
+            )
@@ -0,0 +1,132 @@
+from typing import NamedTuple
+
+from errors import AudioDecodeError
+
+# Bitrates in kbps for MPEG Layer III, indexed by the 4-bit bitrate field.
+# Index 0 is "free format" and index 15 is invalid; neither is supported.
+_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+# Sample rates in Hz, keyed by the 2-bit version field.
+_SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG-1
+    0b10: (22050, 24000, 16000),  # MPEG-2
+    0b00: (11025, 12000, 8000),  # MPEG-2.5
+}
+
+
+class Frame(NamedTuple):
+    """
+    The location and length of one MPEG audio frame within an MP3 file.
+    """
+
+    offset: int
+    length: int
+    duration: float
+    is_info: bool
+
+
+class Mp3(NamedTuple):
+    """
+    An MP3 file split into its leading ID3v2 tag and its audio frames.
+    """
+
+    data: bytes
+    tag: bytes
+    frames: list[Frame]
+
+    @property
+    def audio_frames(self) -> list[Frame]:
+        """
+        The frames that carry audio, i.e. without a Xing/Info header frame.
+        """
+        return [frame for frame in self.frames if not frame.is_info]
+
+    def frame_bytes(self, frames: list[Frame]) -> bytes:
+        return b"".join(
+            self.data[frame.offset : frame.offset + frame.length] for frame in frames
+        )
+
+
+def _id3v2_length(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # The tag size is a "syncsafe" integer: 7 bits in each of 4 bytes.
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_header(data: bytes, offset: int) -> Frame | None:
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset : offset + 4]
+    if b0 != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version = (b1 >> 3) & 0b11
+    layer = (b1 >> 1) & 0b11
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0b11
+    if version == 0b01 or layer != 0b01 or sample_rate_index == 0b11:
+        return None
+    if bitrate_index in (0, 15):
+        return None
+
+    mpeg1 = version == 0b11
+    bitrate = (_BITRATES_V1 if mpeg1 else _BITRATES_V2)[bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    samples = 1152 if mpeg1 else 576
+    padding = (b2 >> 1) & 1
+    length = samples // 8 * bitrate // sample_rate + padding
+
+    mono = b3 >> 6 == 0b11
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    marker = data[offset + 4 + side_info : offset + 8 + side_info]
+
+    return Frame(
+        offset=offset,
+        length=length,
+        duration=samples / sample_rate,
+        is_info=marker in (b"Xing", b"Info"),
+    )
+
+
+def parse_mp3(data: bytes) -> Mp3:
+    """
+    Split MP3 data into its ID3v2 tag and its frames. Parsing stops at the
+    first byte that is not the start of a frame, which drops trailing data
+    such as an ID3v1 tag.
+
+    Raises:
+        AudioDecodeError: The data contains no MPEG Layer III frames.
+    """
+    tag_length = _id3v2_length(data)
+    frames: list[Frame] = []
+    offset = tag_length
+    while (frame := _parse_header(data, offset)) is not None:
+        if frame.offset + frame.length > len(data):
+            break
+        frames.append(frame)
+        offset += frame.length
+    if not frames:
+        raise AudioDecodeError()
+    return Mp3(data=data, tag=data[:tag_length], frames=frames)
+
+
+def nearest_frame_index(frames: list[Frame], seconds: float) -> int:
+    """
+    The index of the frame boundary closest to `seconds`, where index `n`
+    is the boundary just before `frames[n]` and `len(frames)` is the end.
+    """
+    elapsed = 0.0
+    for index, frame in enumerate(frames):
+        if seconds < elapsed + frame.duration / 2:
+            return index
+        elapsed += frame.duration
+    return len(frames)
+
+
+def duration(frames: list[Frame]) -> float:
+    return sum(frame.duration for frame in frames)
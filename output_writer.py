@@ -2,11 +2,10 @@ import json
 from pathlib import Path
 from typing import NamedTuple
 
-from jsonschema import validate
-
 from dialog_script import DialogScript
 from elevenlabs_client import DialogResponse
-from json_schema import OUTPUT
+from metrics import Metrics
+from write_batch import WriteBatch, batch_or_single
 
 
 class LineTiming(NamedTuple):
@@ -17,7 +16,8 @@ class LineTiming(NamedTuple):
 class OutputWriter:
     """
     A class that handles writing JSON scripts and audio files that are
-    compatible with Kantan Player apps.
+    compatible with Kantan Player apps. The time spent building and
+    validating the output script is observed in `metrics`, if given.
     """
 
     def __init__(
@@ -25,14 +25,19 @@ class OutputWriter:
         write_dir: Path,
         input_script: DialogScript,
         response: DialogResponse,
+        metrics: Metrics | None = None,
     ):
         self.write_dir = write_dir
         self.input_script = input_script
         self.response = response
+        self.metrics = metrics or Metrics()
         self.audio_write_path = write_dir / f"{input_script.stem}.mp3"
         self.script_write_path = write_dir / f"{input_script.stem}.json"
-        output_script = self._build_output_script()
-        self._validate_output_script(output_script)
+        stem = input_script.stem
+        with self.metrics.timed("build_seconds", script=stem):
+            output_script = self._build_output_script()
+        with self.metrics.timed("validate_seconds", script=stem):
+            self._validate_output_script(output_script)
         self.output_script = output_script
 
     def _build_output_script(self) -> dict:
@@ -67,19 +72,35 @@ class OutputWriter:
         return script
 
     def _validate_output_script(self, output_script: dict[str, object]) -> None:
-        validate(output_script, schema=OUTPUT)
+        from validation import validate_output
+
+        validate_output(output_script)
 
-    def write_output_script(self) -> None:
-        self.script_write_path.write_text(
-            json.dumps(
-                self.output_script,
-                indent=2,
-                ensure_ascii=False,
-            ),
-            encoding="utf-8",
-        )
+    def write_output_script(self, batch: WriteBatch | None = None) -> None:
+        """
+        Write the output script, as part of `batch` if one is given.
+        """
+        with batch_or_single(batch) as batch:
+            batch.write_text(
+                self.script_write_path,
+                json.dumps(
+                    self.output_script,
+                    indent=2,
+                    ensure_ascii=False,
+                ),
+            )
 
-    def write_audio(self) -> None:
-        self.audio_write_path.write_bytes(
-            self.response.audio_data,
-        )
+    def write_audio(self, batch: WriteBatch | None = None) -> None:
+        """
+        Write the audio, as part of `batch` if one is given. Spooled audio is
+        moved into place rather than copied.
+        """
+        with batch_or_single(batch) as batch:
+            if self.response.audio_path is None:
+                batch.write_bytes(self.audio_write_path, self.response.audio_data)
+            else:
+                batch.move(
+                    self.response.audio_path,
+                    self.audio_write_path,
+                    self.response.audio_sha256,
+                )
@@ -0,0 +1,727 @@
+import asyncio
+import multiprocessing
+import os
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TypeVar
+
+from elevenlabs import DialogueInput
+from jsonschema import ValidationError
+from tqdm import tqdm
+
+from chunking import MAX_CHUNK_CHARACTERS, MAX_CHUNK_VOICES, chunk_ranges, join_chunks
+from concurrency import AdaptiveLimiter
+from dialog_script import DialogScript
+from elevenlabs_client import AsyncElevenLabsClient, DialogResponse
+from errors import ElevenLabsClientError, InvalidScriptsError, VoiceNotAvailableError
+from incremental import (
+    RenderRecord,
+    changed_runs,
+    diff_lines,
+    line_keys,
+    record_path,
+    splice,
+)
+from journal import Journal
+from manifest import Manifest
+from metrics import Metrics
+from output_writer import OutputWriter
+from rate_limit import CharacterBucket
+from retry import RetryPolicy, call_with_retry
+from scheduling import LongestFirstQueue, chunk_costs, longest_first
+from synthesis_cache import SynthesisCache, synthesis_key
+from tracing import working_on
+from voice_catalog import VoiceCatalog
+from write_batch import WriteBatch
+
+
+# The number of threads that parse scripts and that write output.
+PARSERS = 4
+WRITERS = 2
+
+# The most rendered scripts whose outputs are written, and flushed, together.
+WRITE_BATCH_SIZE = 32
+
+# The number of scripts from which on they are parsed by a pool of processes
+# rather than by threads, which are held back by the GIL while validating.
+PROCESS_POOL_THRESHOLD = 64
+
+# How often, in seconds, the lengths of the queues are sampled when tracing.
+TRACE_SAMPLE_INTERVAL = 0.05
+
+# The errors that make a script invalid, rather than stopping the run.
+SCRIPT_ERRORS = (OSError, ValueError, ValidationError)
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+
+def describe_error(error: Exception) -> str:
+    """
+    Say briefly why a script is invalid.
+    """
+    if isinstance(error, ValidationError):
+        return f"{error.message} (at {error.json_path})"
+    if isinstance(error, OSError) and error.strerror:
+        return error.strerror
+    return str(error)
+
+
+def try_load_script(path: Path) -> DialogScript | str:
+    """
+    Load and validate a script, but return the reason that it is invalid
+    instead of raising. The reason is returned as text so that it makes the
+    trip back from a worker process intact.
+    """
+    try:
+        return DialogScript(path)
+    except SCRIPT_ERRORS as error:
+        return describe_error(error)
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # Forking a process that runs threads may deadlock the child.
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+@dataclass
+class Rendered:
+    """
+    A script together with its dialog, ready to be written.
+    """
+
+    script: DialogScript
+    keys: list[str]
+    response: DialogResponse
+    audio_changed: bool = True
+
+
+@dataclass
+class _InFlight:
+    """
+    A request that identical requests wait for rather than send again. Each
+    of the `waiters` gets a copy of the response of its own.
+    """
+
+    copies: asyncio.Future[list[DialogResponse]]
+    waiters: int = 0
+
+
+class Pipeline:
+    """
+    Turns dialog scripts into audio and output scripts on a single event loop.
+
+    Scripts flow through the stages described in `run`, and a limiter caps
+    the number of text-to-dialog requests that are in flight at once. The cap
+    is fixed at `requests` unless `max_requests` is higher, in which case it
+    adapts between 1 and `max_requests` to how the API responds. A character
+    bucket, if given, additionally paces requests to a quota of characters
+    per minute. Scripts that are too long for one request are synthesized in
+    chunks, and identical chunks that are requested while one of them is in
+    flight share its response. The voices of every script are checked
+    against a voice catalog, if given.
+
+    Disk access is handed off to worker threads so that it never holds up
+    the event loop, and outputs are written by a pool of threads of their
+    own, so that slow storage never takes threads from the requests. Outputs
+    are renamed into place once complete, and with `fsync` they are also
+    flushed to disk, once per batch of scripts. A journal, if given, is kept
+    up to date with the state of every script, and audio that it holds for a
+    script is used instead of synthesizing it again.
+
+    Every phase, from parsing to writing, is counted and timed in `metrics`,
+    and traced if it has a tracer, together with the lengths of the queues
+    between the stages and the number of requests in flight.
+    """
+
+    def __init__(
+        self,
+        client: AsyncElevenLabsClient,
+        write_dir: Path,
+        requests: int,
+        cache: SynthesisCache | None = None,
+        incremental: bool = False,
+        max_requests: int | None = None,
+        retry_policy: RetryPolicy = RetryPolicy(),
+        character_bucket: CharacterBucket | None = None,
+        voice_catalog: VoiceCatalog | None = None,
+        manifest: Manifest | None = None,
+        journal: Journal | None = None,
+        max_chunk_characters: int = MAX_CHUNK_CHARACTERS,
+        max_chunk_voices: int = MAX_CHUNK_VOICES,
+        fsync: bool = False,
+        metrics: Metrics | None = None,
+    ):
+        self.client = client
+        self.write_dir = write_dir
+        self.cache = cache
+        self.incremental = incremental
+        self.retry_policy = retry_policy
+        self.character_bucket = character_bucket
+        self.voice_catalog = voice_catalog
+        self.manifest = manifest
+        self.journal = journal
+        self.max_chunk_characters = max_chunk_characters
+        self.max_chunk_voices = max_chunk_voices
+        self.fsync = fsync
+        self.metrics = metrics or Metrics()
+        self.writers = ThreadPoolExecutor(WRITERS, thread_name_prefix="writer")
+        self.retries: Counter[str] = Counter()
+        # The number of requests that were not sent because an identical one
+        # was in flight, or was answered earlier in the run.
+        self.deduplicated = 0
+        self._in_flight: dict[str, _InFlight] = {}
+        # The responses of the requests that were answered during a run,
+        # kept when there is no cache to answer them again.
+        self._completed: dict[str, DialogResponse] | None = None
+        self.invalid: dict[Path, str] = {}
+        ceiling = max(requests, max_requests or requests)
+        self.limiter = AdaptiveLimiter(
+            initial=requests,
+            ceiling=ceiling,
+            floor=1 if ceiling > requests else requests,
+        )
+
+    async def synthesize(
+        self,
+        inputs: list[DialogueInput],
+        stem: str,
+    ) -> DialogResponse:
+        """
+        Get the dialog for `inputs`, splitting them into chunks that each fit
+        into one request if they are too long for one. The chunks are
+        synthesized concurrently, so a long script can hold several request
+        slots at once, and then joined.
+        """
+        ranges = chunk_ranges(inputs, self.max_chunk_characters, self.max_chunk_voices)
+        if len(ranges) == 1:
+            return await self.synthesize_chunk(inputs, stem)
+        responses = await asyncio.gather(
+            *(self.synthesize_chunk(inputs[start:end], stem) for start, end in ranges)
+        )
+        return await asyncio.to_thread(
+            join_chunks, ranges, list(responses), self.client.spool_dir
+        )
+
+    async def synthesize_chunk(
+        self,
+        inputs: list[DialogueInput],
+        stem: str,
+    ) -> DialogResponse:
+        """
+        Get the dialog for `inputs`, from the cache if possible and from the API
+        otherwise. Responses from the API are added to the cache. Failed
+        requests are retried according to the retry policy, and the retries
+        are counted against the script named `stem`.
+
+        If an identical request is already in flight, for another script with
+        the same lines or a chunk that scripts share, its response is shared
+        rather than requested again. Without a cache, so are the responses of
+        the requests that were answered earlier in the run.
+        """
+        key = synthesis_key(inputs, self.client.settings)
+        completed = None if self._completed is None else self._completed.get(key)
+        if completed is not None:
+            self.deduplicated += 1
+            self.metrics.count("deduplicated_requests")
+            return await asyncio.to_thread(completed.copy)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            index = in_flight.waiters
+            in_flight.waiters += 1
+            self.deduplicated += 1
+            self.metrics.count("deduplicated_requests")
+            # A waiter that is cancelled must not cancel the others.
+            copies = await asyncio.shield(in_flight.copies)
+            return copies[index]
+        in_flight = _InFlight(asyncio.get_running_loop().create_future())
+        self._in_flight[key] = in_flight
+        try:
+            response = await self._synthesize_chunk(inputs, stem, key)
+        except BaseException as error:
+            del self._in_flight[key]
+            if isinstance(error, asyncio.CancelledError):
+                in_flight.copies.cancel()
+            elif in_flight.waiters:
+                in_flight.copies.set_exception(error)
+            raise
+        # Later requests go to the cache, or are answered with a copy of the
+        # response that is kept for the rest of the run if there is none.
+        del self._in_flight[key]
+        keep = self._completed is not None and self.cache is None
+        if in_flight.waiters or keep:
+            try:
+                copies = await asyncio.to_thread(
+                    lambda: [
+                        response.copy() for _ in range(in_flight.waiters + keep)
+                    ]
+                )
+            except Exception as error:
+                if in_flight.waiters:
+                    in_flight.copies.set_exception(error)
+                raise
+            if keep:
+                assert self._completed is not None
+                self._completed[key] = copies.pop()
+            if in_flight.waiters:
+                in_flight.copies.set_result(copies)
+        return response
+
+    async def _synthesize_chunk(
+        self,
+        inputs: list[DialogueInput],
+        stem: str,
+        key: str,
+    ) -> DialogResponse:
+        if self.cache is not None:
+            response = await asyncio.to_thread(
+                self.cache.get, key, self.client.spool_dir
+            )
+            if response is not None:
+                self.metrics.count("cache_hits")
+                return response
+        characters = sum(len(line.text) for line in inputs)
+
+        async def request() -> DialogResponse:
+            # Every attempt is charged, since a retry sends the text again.
+            if self.character_bucket is not None:
+                await self.character_bucket.acquire(characters)
+            async with self.limiter.slot(characters):
+                self.metrics.count("requests")
+                self.metrics.count("characters_sent", characters)
+                try:
+                    with self.metrics.timed("request_seconds"):
+                        return await self.client.get_dialog(inputs=inputs)
+                except ElevenLabsClientError:
+                    self.metrics.count("request_errors")
+                    raise
+
+        def count_retry(error: ElevenLabsClientError) -> None:
+            self.retries[stem] += 1
+            self.metrics.count("retries")
+
+        response = await call_with_retry(request, self.retry_policy, count_retry)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, key, response)
+        return response
+
+    async def resynthesize(
+        self,
+        inputs: list[DialogueInput],
+        keys: list[str],
+        stem: str,
+        record: RenderRecord,
+    ) -> DialogResponse | None:
+        """
+        Get the dialog for `inputs` by re-synthesizing only the lines that
+        changed since the previous render. The whole script is synthesized if
+        the audio of the previous render is missing or has been replaced since.
+
+        Returns:
+            DialogResponse | None: The dialog, or `None` if nothing changed.
+        """
+        audio_path = self.write_dir / f"{stem}.mp3"
+        try:
+            stat = await asyncio.to_thread(audio_path.stat)
+        except FileNotFoundError:
+            return await self.synthesize(inputs, stem)
+        if record.audio_size != stat.st_size:
+            return await self.synthesize(inputs, stem)
+        opcodes = diff_lines(keys, record)
+        if opcodes is None:
+            return None
+        # The previous audio is only read once there is something to splice
+        # into it.
+        previous_audio = await asyncio.to_thread(audio_path.read_bytes)
+        if record.audio_size != len(previous_audio):
+            return await self.synthesize(inputs, stem)
+        responses = await asyncio.gather(
+            *(
+                self.synthesize(inputs[j1:j2], stem)
+                for j1, j2 in changed_runs(opcodes)
+            )
+        )
+        return await asyncio.to_thread(
+            splice,
+            inputs=inputs,
+            opcodes=opcodes,
+            previous=record,
+            previous_audio=previous_audio,
+            responses=list(responses),
+            spool_dir=self.client.spool_dir,
+        )
+
+    def check_voices(self, script: DialogScript) -> None:
+        """
+        Check that the voices of a script are available, according to the
+        voice catalog if there is one.
+
+        Raises:
+            VoiceNotAvailableError: The script uses an unavailable voice.
+        """
+        if self.voice_catalog is None:
+            return
+        with self.metrics.timed("voices_seconds"):
+            unavailable = self.voice_catalog.unavailable(script.voices)
+        if unavailable:
+            raise VoiceNotAvailableError(sorted(unavailable))
+
+    def load_script(self, path: Path) -> DialogScript:
+        with self.metrics.timed("parse_seconds"):
+            script = DialogScript(path)
+        self.check_voices(script)
+        return script
+
+    async def render(self, script: DialogScript) -> Rendered:
+        """
+        Get the dialog of a script, synthesizing as little of it as possible.
+        """
+        with working_on(script.stem), self.metrics.timed("render_seconds"):
+            return await self._render(script)
+
+    async def _render(self, script: DialogScript) -> Rendered:
+        inputs = script.dialog_inputs
+        keys = line_keys(inputs, self.client.settings)
+        key = synthesis_key(inputs, self.client.settings)
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.in_flight, script.stem)
+            response = await asyncio.to_thread(
+                self.journal.received, script.stem, key
+            )
+            if response is not None:
+                return Rendered(script, keys, response)
+        record = None
+        if self.incremental:
+            record_file = record_path(self.write_dir, script.stem)
+            record = await asyncio.to_thread(RenderRecord.load, record_file)
+        if record is not None:
+            response = await self.resynthesize(
+                inputs=inputs,
+                keys=keys,
+                stem=script.stem,
+                record=record,
+            )
+            if response is None:
+                # The audio is up to date, but the text or speakers shown with
+                # it may have been edited, so the output script is rewritten.
+                response = DialogResponse(
+                    audio_data=b"",
+                    segments=record.segments(inputs),
+                )
+                return Rendered(script, keys, response, audio_changed=False)
+        else:
+            response = await self.synthesize(inputs, script.stem)
+        if self.journal is not None:
+            await asyncio.to_thread(
+                self.journal.synthesized, script.stem, key, response
+            )
+        return Rendered(script, keys, response)
+
+    def close(self) -> None:
+        """
+        Wait for the outputs that are being written, and stop the writers.
+        """
+        self.writers.shutdown()
+
+    def _add_output(self, rendered: Rendered, batch: WriteBatch) -> list[Path]:
+        """
+        Build and validate the output of a rendered script, and add its files
+        to `batch`.
+
+        Returns:
+            list[Path]: The paths of the output files.
+        """
+        writer = OutputWriter(
+            write_dir=self.write_dir,
+            input_script=rendered.script,
+            response=rendered.response,
+            metrics=self.metrics,
+        )
+        writer.write_output_script(batch)
+        if rendered.audio_changed:
+            record = RenderRecord.from_response(rendered.keys, rendered.response)
+            writer.write_audio(batch)
+            record.save(record_path(self.write_dir, rendered.script.stem), batch)
+        return [writer.audio_write_path, writer.script_write_path]
+
+    def write(self, renders: list[Rendered]) -> None:
+        """
+        Build, validate and write the outputs of rendered scripts as one
+        batch, and only then record them as written.
+        """
+        batch = WriteBatch(self.fsync)
+        try:
+            stems = [rendered.script.stem for rendered in renders]
+            with self.metrics.timed("write_seconds", scripts=stems):
+                outputs = [self._add_output(rendered, batch) for rendered in renders]
+                batch.commit()
+        except BaseException:
+            batch.abort()
+            raise
+        self.metrics.count("outputs_written", len(renders))
+        self.metrics.count("bytes_written", batch.size)
+        for rendered, paths in zip(renders, outputs):
+            if self.manifest is not None:
+                script = rendered.script
+                self.manifest.record(
+                    script.path,
+                    paths,
+                    self.client.settings,
+                    source=(script.stat, script.sha256),
+                    hashes=batch.hashes,
+                )
+            if self.journal is not None:
+                self.journal.written(rendered.script.stem)
+
+    async def write_outputs(self, renders: list[Rendered]) -> None:
+        """
+        Write the outputs of rendered scripts on the writer threads.
+        """
+        async with self.journaled(*(rendered.script.stem for rendered in renders)):
+            await asyncio.get_running_loop().run_in_executor(
+                self.writers, self.write, renders
+            )
+
+    @asynccontextmanager
+    async def journaled(self, *stems: str) -> AsyncIterator[None]:
+        """
+        Record in the journal that the scripts named `stems` failed if the
+        enclosed block raises.
+        """
+        try:
+            yield
+        except Exception as error:
+            if self.journal is not None:
+                for stem in stems:
+                    await asyncio.to_thread(self.journal.failed, stem, str(error))
+            raise
+
+    async def process_script(self, script: DialogScript) -> None:
+        rendered = await self.render(script)
+        await self.write_outputs([rendered])
+
+    async def run(self, paths: list[Path]) -> None:
+        """
+        Process every script, stopping at the first error other than an
+        invalid script. Invalid scripts are skipped and reported together
+        once every other script has been processed.
+
+        The work is split into stages that run concurrently and hand their
+        results on through bounded queues: the paths are fed to parsing
+        threads, parsed scripts to the synthesis tasks, and rendered scripts
+        to writing threads. Large batches are parsed by a pool of processes
+        instead. The first request goes out as soon as the first script is
+        parsed, and the queues keep the number of scripts held in memory
+        independent of the number of paths. Each writer takes every rendered
+        script that is waiting, up to `WRITE_BATCH_SIZE`, and writes them as
+        one batch, and the queue of rendered scripts holds enough of them
+        that the synthesis tasks are not held up while a batch is written.
+
+        Scripts are scheduled longest first, so that a long script does not
+        start last and keep the run going long after the others finished:
+        paths are parsed in order of file size, largest first, and the
+        synthesis tasks take the parsed script with the highest estimated
+        cost among those waiting.
+
+        Raises:
+            InvalidScriptsError: Some of the scripts were invalid.
+        """
+        self._completed = {}
+        try:
+            with self.metrics.timed("run_seconds"):
+                await self._run(paths)
+        finally:
+            completed, self._completed = self._completed, None
+            await asyncio.to_thread(
+                lambda: [response.discard_audio() for response in completed.values()]
+            )
+        if self.invalid:
+            raise InvalidScriptsError(self.invalid)
+
+    async def _run(self, paths: list[Path]) -> None:
+        self.invalid = {}
+        processes = os.process_cpu_count() or 1
+        pool = None
+        if len(paths) >= PROCESS_POOL_THRESHOLD and processes > 1:
+            pool = _process_pool(processes)
+            # Enough tasks to keep every process busy while results travel.
+            parsers = 2 * processes
+        else:
+            parsers = min(PARSERS, len(paths)) or 1
+        synthesizers = self.limiter.ceiling
+        writers = WRITERS
+        path_queue: asyncio.Queue[Path | None] = asyncio.Queue(2 * parsers)
+        script_queue: LongestFirstQueue[DialogScript] = LongestFirstQueue(
+            2 * synthesizers,
+            lambda script: sum(
+                chunk_costs(script, self.max_chunk_characters, self.max_chunk_voices)
+            ),
+        )
+        # Rendered scripts are small, since their audio is spooled to disk.
+        write_queue: asyncio.Queue[Rendered | None] = asyncio.Queue(
+            2 * writers * WRITE_BATCH_SIZE
+        )
+
+        async def discover() -> None:
+            for path in await asyncio.to_thread(longest_first, paths):
+                await path_queue.put(path)
+            for _ in range(parsers):
+                await path_queue.put(None)
+
+        async def parse(path: Path) -> DialogScript | None:
+            with working_on(path.stem):
+                return await parse_script(path)
+
+        async def parse_script(path: Path) -> DialogScript | None:
+            if pool is None:
+                try:
+                    return await asyncio.to_thread(self.load_script, path)
+                except SCRIPT_ERRORS as error:
+                    result: DialogScript | str = describe_error(error)
+            else:
+                with self.metrics.timed("parse_seconds"):
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        pool, try_load_script, path
+                    )
+                if isinstance(result, DialogScript):
+                    try:
+                        await asyncio.to_thread(self.check_voices, result)
+                        return result
+                    except VoiceNotAvailableError as error:
+                        result = describe_error(error)
+            self.invalid[path] = result
+            self.metrics.count("scripts_invalid")
+            if self.journal is not None:
+                await asyncio.to_thread(self.journal.failed, path.stem, result)
+            progress.update()
+            return None
+
+        async def render(script: DialogScript) -> Rendered:
+            async with self.journaled(script.stem):
+                return await self.render(script)
+
+        async def write(renders: list[Rendered]) -> None:
+            await self.write_outputs(renders)
+            postfix = {}
+            if self.limiter.adaptive:
+                postfix["requests"] = int(self.limiter.limit)
+            if self.retries:
+                postfix["retries"] = self.retries.total()
+            if postfix:
+                progress.set_postfix(postfix)
+            progress.update(len(renders))
+
+        async def sample() -> None:
+            tracer = self.metrics.tracer
+            assert tracer is not None
+            while True:
+                tracer.counter(
+                    "queues",
+                    paths=path_queue.qsize(),
+                    scripts=script_queue.qsize(),
+                    renders=write_queue.qsize(),
+                )
+                tracer.counter(
+                    "requests",
+                    in_flight=self.limiter.in_flight,
+                    limit=self.limiter.limit,
+                )
+                await asyncio.sleep(TRACE_SAMPLE_INTERVAL)
+
+        sampling = None
+        if self.metrics.tracer is not None:
+            sampling = asyncio.create_task(sample())
+        with (
+            tqdm(total=len(paths), desc="Processing", unit="file") as progress,
+            pool or nullcontext(),
+        ):
+            try:
+                async with asyncio.TaskGroup() as group:
+                    group.create_task(discover())
+                    group.create_task(
+                        _stage(parsers, parse, path_queue, script_queue, synthesizers)
+                    )
+                    group.create_task(
+                        _stage(synthesizers, render, script_queue, write_queue, writers)
+                    )
+                    group.create_task(
+                        _batch_stage(writers, write, write_queue, WRITE_BATCH_SIZE)
+                    )
+            except ExceptionGroup as errors:
+                # Report the error that stopped the run rather than the group.
+                raise errors.exceptions[0]
+            finally:
+                if sampling is not None:
+                    sampling.cancel()
+
+
+async def _stage(
+    workers: int,
+    handle: Callable[[T], Awaitable[U]],
+    inbox: asyncio.Queue[T | None],
+    outbox: asyncio.Queue[U | None] | None = None,
+    next_workers: int = 0,
+) -> None:
+    """
+    Run `workers` tasks that take items from `inbox` until each of them gets
+    `None`, and put what `handle` makes of them into `outbox`, unless that is
+    `None`. Once they are all done, one `None` is put into `outbox` for each
+    of the `next_workers`. The tasks are named after `handle`.
+    """
+
+    async def work() -> None:
+        while (item := await inbox.get()) is not None:
+            result = await handle(item)
+            if outbox is not None and result is not None:
+                await outbox.put(result)
+
+    await asyncio.gather(
+        *(
+            asyncio.create_task(work(), name=f"{handle.__name__} {index}")
+            for index in range(workers)
+        )
+    )
+    if outbox is not None:
+        for _ in range(next_workers):
+            await outbox.put(None)
+
+
+async def _batch_stage(
+    workers: int,
+    handle: Callable[[list[T]], Awaitable[None]],
+    inbox: asyncio.Queue[T | None],
+    max_batch: int,
+) -> None:
+    """
+    Like `_stage` without an outbox, except that each task takes every item
+    that is waiting in `inbox`, up to `max_batch`, and hands them to `handle`
+    together.
+    """
+
+    async def work() -> None:
+        done = False
+        while not done and (item := await inbox.get()) is not None:
+            items = [item]
+            while len(items) < max_batch and not inbox.empty():
+                item = inbox.get_nowait()
+                if item is None:
+                    # This task's share of the end, after this last batch.
+                    done = True
+                    break
+                items.append(item)
+            await handle(items)
+
+    await asyncio.gather(
+        *(
+            asyncio.create_task(work(), name=f"{handle.__name__} {index}")
+            for index in range(workers)
+        )
+    )
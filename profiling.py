@@ -0,0 +1,197 @@
+import cProfile
+import functools
+import linecache
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+# The directory of the project's own modules, which time and allocations are
+# attributed to.
+PROJECT_DIR = Path(__file__).resolve().parent
+
+# Tracing allocations is what makes a profiled run slow, since every
+# allocation records its traceback, and CPU-bound work can run ten times as
+# long or more; waiting on the API takes no longer. The settings below trade
+# detail for speed.
+
+# The number of frames kept for every allocation. Each frame adds to the cost
+# of every allocation, and eight are enough to reach a frame of the project
+# from most calls into the standard library or the SDK. Memory allocated
+# deeper than that below the project is left out of the report.
+TRACEBACK_FRAMES = 8
+
+# How often, in seconds, traced memory is checked for a new peak. A snapshot
+# copies every traced allocation, so one is only taken once memory has grown
+# by `PEAK_GROWTH` since the last, and the peak that is reported may be that
+# much below the true one.
+PEAK_INTERVAL = 5.0
+PEAK_GROWTH = 1.1
+
+# The number of entries in each section of the report.
+REPORT_ENTRIES = 30
+
+
+@functools.cache
+def _project_file(filename: str) -> str | None:
+    """
+    The path of `filename` relative to the project, or `None` if it is not
+    one of the project's own modules.
+    """
+    # Code that was not loaded from a file, such as `<frozen abc>` or
+    # `<string>`, and the `~` that cProfile files built-in functions under.
+    if filename.startswith("<") or filename == "~":
+        return None
+    try:
+        path = Path(filename).resolve().relative_to(PROJECT_DIR)
+    except (OSError, ValueError):
+        return None
+    if "site-packages" in path.parts or path.parts[0].startswith("."):
+        return None
+    # The profiler's own work is left out.
+    if path.name == Path(__file__).name:
+        return None
+    return str(path)
+
+
+class Profile:
+    """
+    A CPU profile of every thread, such as the threads that decode audio
+    and write outputs, since a profiler sees them all from Python 3.12 on,
+    together with a snapshot of the allocations at the peak of the memory
+    that was traced. Worker processes are not profiled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profile = cProfile.Profile()
+        self.seconds = 0.0
+        self.peak_memory = 0
+        self._snapshot_memory = 0
+        self.stats: pstats.Stats | None = None
+        self.snapshot: tracemalloc.Snapshot | None = None
+
+    def _take_snapshot(self, growth: float = PEAK_GROWTH) -> None:
+        current, _ = tracemalloc.get_traced_memory()
+        if self.snapshot is None or current > self._snapshot_memory * growth:
+            snapshot = tracemalloc.take_snapshot()
+            with self._lock:
+                self.snapshot = snapshot
+                self._snapshot_memory = current
+
+    def _watch_memory(self, stopped: threading.Event) -> None:
+        while not stopped.wait(PEAK_INTERVAL):
+            self._take_snapshot()
+
+    @contextmanager
+    def running(self) -> Iterator[None]:
+        tracemalloc.start(TRACEBACK_FRAMES)
+        stopped = threading.Event()
+        watcher = threading.Thread(target=self._watch_memory, args=(stopped,))
+        watcher.start()
+        started = time.perf_counter()
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            self.seconds = time.perf_counter() - started
+            stopped.set()
+            watcher.join()
+            self._take_snapshot(growth=1.0)
+            _, self.peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stats = pstats.Stats(self._profile)
+
+    def _time_section(self, title: str, project: bool, sort: int) -> list[str]:
+        assert self.stats is not None
+        rows = []
+        entries = self.stats.stats.items()  # type: ignore[attr-defined]
+        for (filename, line, function), (_, calls, own, cumulative, _) in entries:
+            relative = _project_file(filename)
+            if (relative is not None) != project:
+                continue
+            name = f"{relative or filename}:{line}({function})"
+            rows.append((calls, own, cumulative, name))
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        lines = [title, f"{'calls':>10} {'own s':>9} {'cumul. s':>9}  function"]
+        for calls, own, cumulative, name in rows[:REPORT_ENTRIES]:
+            lines.append(f"{calls:>10} {own:>9.3f} {cumulative:>9.3f}  {name}")
+        return lines
+
+    def _allocation_section(self) -> list[str]:
+        """
+        The memory held at the peak, attributed to the innermost frame of the
+        project that allocated it, so that memory allocated by `json.dumps`,
+        say, counts against the line of the project that called it.
+        """
+        assert self.snapshot is not None
+        sizes: Counter[tuple[str, int]] = Counter()
+        counts: Counter[tuple[str, int]] = Counter()
+        for trace in self.snapshot.traces:
+            # The most recent frame comes last.
+            for frame in reversed(trace.traceback):
+                relative = _project_file(frame.filename)
+                if relative is not None:
+                    sizes[relative, frame.lineno] += trace.size
+                    counts[relative, frame.lineno] += 1
+                    break
+        lines = [
+            f"Memory held at {self._snapshot_memory / 1024 / 1024:.1f} MiB, the most "
+            "that was sampled, by the line of the project that allocated it",
+            f"{'KiB':>10} {'blocks':>9}  line",
+        ]
+        for (relative, lineno), size in sizes.most_common(REPORT_ENTRIES):
+            source = linecache.getline(str(PROJECT_DIR / relative), lineno).strip()
+            lines.append(
+                f"{size / 1024:>10.1f} {counts[relative, lineno]:>9}  "
+                f"{relative}:{lineno}  {source}"
+            )
+        return lines
+
+    def report(self) -> str:
+        """
+        The functions of the project by cumulative time, the functions of
+        libraries by their own time, and the memory held at the peak by the
+        lines of the project.
+        """
+        sections = [
+            [
+                f"Profiled {self.seconds:.3f} s, peak traced memory "
+                f"{self.peak_memory / 1024 / 1024:.1f} MiB",
+            ],
+            self._time_section("Functions of the project", project=True, sort=2),
+            self._time_section("Functions of libraries", project=False, sort=1),
+            self._allocation_section(),
+        ]
+        return "\n\n".join("\n".join(lines) for lines in sections) + "\n"
+
+    def save(self, directory: Path) -> None:
+        """
+        Write the report to `report.txt`, the CPU profile to `profile.pstats`
+        and the allocations to `allocations.snapshot` in `directory`.
+        """
+        assert self.stats is not None and self.snapshot is not None
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "report.txt").write_text(self.report(), encoding="utf-8")
+        self.stats.dump_stats(directory / "profile.pstats")
+        self.snapshot.dump(str(directory / "allocations.snapshot"))
+
+
+@contextmanager
+def profiled(directory: Path) -> Iterator[None]:
+    """
+    Profile the enclosed block, and save the results to `directory` however
+    it ends.
+    """
+    profile = Profile()
+    try:
+        with profile.running():
+            yield
+    finally:
+        profile.save(directory)
+        print(f"Wrote the profile of the run to {directory}")
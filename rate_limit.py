@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+
+class CharacterBucket:
+    """
+    A token bucket that paces requests to a quota of characters per minute.
+
+    The bucket refills continuously at `per_minute / 60` characters a second
+    and holds at most `burst` characters, ten seconds' worth by default, so
+    that a run starts smoothly instead of spending a whole minute of quota at
+    once. Callers are served in the order they ask. A request larger than the
+    bucket is let through once the bucket is full, leaving it in debt until
+    the quota has caught up.
+    """
+
+    def __init__(self, per_minute: int, burst: int | None = None):
+        if per_minute < 1:
+            raise ValueError(f"Quota must be at least 1, not: {per_minute}")
+        self.rate = per_minute / 60
+        self.burst = burst if burst is not None else max(1, per_minute // 6)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, characters: int) -> None:
+        """
+        Wait until `characters` may be sent, then charge them to the bucket.
+        """
+        async with self._lock:
+            self._refill()
+            needed = min(characters, self.burst)
+            if self.tokens < needed:
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= characters
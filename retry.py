@@ -0,0 +1,63 @@
+import asyncio
+import random
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from errors import ElevenLabsClientError
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How often and how patiently to retry requests that failed for reasons
+    that may go away on their own. See `ElevenLabsClientError.retryable`.
+    """
+
+    retries: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        The number of seconds to wait after failed attempt number `attempt`,
+        counting from zero. A delay requested by the API with `Retry-After` is
+        honored up to `max_delay`, so that a single header cannot stall a run
+        for hours. Otherwise, the delay is drawn uniformly between zero and an
+        exponentially growing cap ("full jitter"), so that requests which
+        failed together do not all retry together.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        cap = min(self.max_delay, self.base_delay * 2**attempt)
+        return random.uniform(0, cap)
+
+
+async def call_with_retry(
+    call: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    on_retry: Callable[[ElevenLabsClientError], None] | None = None,
+) -> T:
+    """
+    Await `call()` until it succeeds, it fails with an error that is not
+    retryable, or the retries of `policy` run out. `on_retry` is told about
+    every error that is followed by another attempt.
+
+    Raises:
+        ElevenLabsClientError: The last error, if no attempt succeeded.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except ElevenLabsClientError as error:
+            if not error.retryable or attempt >= policy.retries:
+                if attempt:
+                    error.msg = f"{error.msg} (after {attempt + 1} attempts)"
+                raise
+            if on_retry is not None:
+                on_retry(error)
+            await asyncio.sleep(policy.delay(attempt, error.retry_after))
+            attempt += 1
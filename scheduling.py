@@ -0,0 +1,103 @@
+import asyncio
+import heapq
+import itertools
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Generic, TypeVar
+
+from chunking import MAX_CHUNK_CHARACTERS, MAX_CHUNK_VOICES, line_ranges
+from dialog_script import DialogScript
+
+T = TypeVar("T")
+
+# A rough model of how long a text-to-dialog request takes: a fixed cost for
+# the round trip, and a cost for every character and every line of dialog.
+REQUEST_SECONDS = 2.0
+CHARACTER_SECONDS = 0.01
+LINE_SECONDS = 0.2
+
+
+def chunk_costs(
+    script: DialogScript,
+    max_characters: int = MAX_CHUNK_CHARACTERS,
+    max_voices: int = MAX_CHUNK_VOICES,
+) -> list[float]:
+    """
+    The estimated time in seconds of each request that a script makes, one
+    per chunk. It is worked out from the lines of the script, without building
+    the dialog inputs that the requests are made of.
+    """
+    lines = [(len(line.synthesis_text), line.voice_id) for line in script.lines]
+    return [
+        REQUEST_SECONDS
+        + CHARACTER_SECONDS * sum(length for length, _ in lines[start:end])
+        + LINE_SECONDS * (end - start)
+        for start, end in line_ranges(lines, max_characters, max_voices)
+    ]
+
+
+def longest_first(paths: list[Path]) -> list[Path]:
+    """
+    Sort script paths by file size, largest first, as a guess at their cost
+    that needs no parsing. Paths that cannot be read are put last.
+    """
+
+    def size(path: Path) -> int:
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return -1
+
+    return sorted(paths, key=size, reverse=True)
+
+
+def makespan(jobs: list[list[float]], slots: int) -> float:
+    """
+    The time it takes to run `jobs` on `slots` request slots, when the jobs
+    are started longest first and each of their requests takes the slot that
+    is free first. Each job is a list of the costs of its requests.
+    """
+    free_at = [0.0] * slots
+    finished = 0.0
+    for costs in sorted(jobs, key=sum, reverse=True):
+        for cost in costs:
+            end = heapq.heappop(free_at) + cost
+            heapq.heappush(free_at, end)
+            finished = max(finished, end)
+    return finished
+
+
+class LongestFirstQueue(asyncio.Queue, Generic[T]):
+    """
+    A queue that hands out the item with the highest `cost` first, and
+    `None`, the end of a stage, only once no other item is left.
+    """
+
+    def __init__(self, maxsize: int, cost: Callable[[T], float]):
+        self._cost = cost
+        self._order = itertools.count()
+        super().__init__(maxsize)
+
+    def _init(self, maxsize: int) -> None:
+        self._queue: list[tuple[float, int, T | None]] = []
+
+    def _put(self, item: T | None) -> None:
+        priority = float("inf") if item is None else -self._cost(item)
+        heapq.heappush(self._queue, (priority, next(self._order), item))
+
+    def _get(self) -> T | None:
+        return heapq.heappop(self._queue)[2]
+
+
+def format_duration(seconds: float) -> str:
+    """
+    A duration as hours, minutes and seconds, such as "1h 02m 05s".
+    """
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02}m {seconds:02}s"
+    if minutes:
+        return f"{minutes}m {seconds:02}s"
+    return f"{seconds}s"
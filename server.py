@@ -0,0 +1,275 @@
+import asyncio
+import json
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from enum import StrEnum
+from json import JSONDecodeError
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from jsonschema import ValidationError
+
+from dialog_script import DialogScript
+from errors import ElevenLabsClientError
+from pipeline import Pipeline
+
+# The most jobs that may wait in the queue before new ones are turned away.
+MAX_QUEUED_JOBS = 1000
+
+# The most finished jobs that are kept. Beyond that, the oldest is forgotten
+# and its files are deleted.
+MAX_FINISHED_JOBS = 1000
+
+# The largest request body that is accepted, in bytes.
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    411: "Length Required",
+    413: "Content Too Large",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: str
+    script: DialogScript
+    status: JobStatus = JobStatus.QUEUED
+    error: str | None = None
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+@dataclass
+class Response:
+    status: int
+    body: bytes = b""
+    content_type: str = "application/json"
+
+    @classmethod
+    def json(cls, status: int, data: object) -> "Response":
+        return cls(status, json.dumps(data).encode("utf-8"))
+
+    @classmethod
+    def error(cls, status: int, message: str) -> "Response":
+        return cls.json(status, {"error": message})
+
+
+class DialogServer:
+    """
+    An HTTP service that turns dialog scripts into audio and timing output on
+    a long-lived pipeline, so that the API client, its connection pool and the
+    list of available voices are shared by every job.
+
+    Scripts are posted to `/jobs` and queued. Each job is processed by the
+    first free worker, and its outputs are written to the output directory of
+    the pipeline under the job ID. Only the last `MAX_FINISHED_JOBS` finished
+    jobs are kept. The endpoints are:
+
+        POST /jobs                 Queue a script. With `?wait=true`, respond
+                                   once the job has finished.
+        GET  /jobs/<id>            The status of a job.
+        GET  /jobs/<id>/audio      The MP3 audio of a finished job.
+        GET  /jobs/<id>/script     The output script of a finished job.
+    """
+
+    def __init__(self, pipeline: Pipeline, jobs_dir: Path):
+        self.pipeline = pipeline
+        self.jobs_dir = jobs_dir
+        self.jobs: dict[str, Job] = {}
+        # The IDs of the finished jobs, the oldest first.
+        self.finished: deque[str] = deque()
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(MAX_QUEUED_JOBS)
+        jobs_dir.mkdir(parents=True, exist_ok=True)
+        pipeline.write_dir.mkdir(parents=True, exist_ok=True)
+
+    async def serve(self, host: str, port: int, started: asyncio.Event | None = None):
+        """
+        Accept connections and process jobs until cancelled. `started` is set
+        once the server is listening, and `port` may be 0 to pick any free
+        port, which is then found in `self.port`.
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        async with server, asyncio.TaskGroup() as group:
+            for _ in range(self.pipeline.limiter.ceiling):
+                group.create_task(self._work())
+            if started is not None:
+                started.set()
+            await server.serve_forever()
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            job.status = JobStatus.RUNNING
+            try:
+                await self.pipeline.process_script(job.script)
+            except Exception as error:
+                job.status = JobStatus.FAILED
+                job.error = getattr(error, "msg", None) or str(error)
+            else:
+                job.status = JobStatus.DONE
+            finally:
+                self.finished.append(job.id)
+                try:
+                    if len(self.finished) > MAX_FINISHED_JOBS:
+                        await self._forget(self.finished.popleft())
+                finally:
+                    job.finished.set()
+
+    async def _forget(self, job_id: str) -> None:
+        """
+        Drop a finished job and delete its script and outputs.
+        """
+        del self.jobs[job_id]
+        paths = [
+            self.jobs_dir / f"{job_id}.json",
+            self.pipeline.write_dir / f"{job_id}.mp3",
+            self.pipeline.write_dir / f"{job_id}.json",
+        ]
+        for path in paths:
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+
+    def _load_script(self, job_id: str, body: bytes) -> DialogScript:
+        """
+        Save a posted script under the job ID, then load and validate it.
+        """
+        path = self.jobs_dir / f"{job_id}.json"
+        path.write_bytes(body)
+        try:
+            return self.pipeline.load_script(path)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+
+    async def submit(self, body: bytes, wait: bool = False) -> Response:
+        if self.queue.full():
+            return Response.error(503, "Too many jobs are queued")
+        job_id = uuid.uuid4().hex
+        try:
+            script = await asyncio.to_thread(self._load_script, job_id, body)
+        except (JSONDecodeError, UnicodeDecodeError) as error:
+            return Response.error(400, f"Invalid JSON: {error}")
+        except ValidationError as error:
+            return Response.error(400, f"Invalid script: {error.message}")
+        except ValueError as error:
+            return Response.error(400, getattr(error, "msg", None) or str(error))
+        job = Job(job_id, script)
+        try:
+            # Other jobs may have filled the queue while this one was loaded.
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            await asyncio.to_thread(script.path.unlink, missing_ok=True)
+            return Response.error(503, "Too many jobs are queued")
+        self.jobs[job_id] = job
+        if wait:
+            await job.finished.wait()
+            return Response.json(200, job.to_json())
+        return Response.json(202, job.to_json())
+
+    async def _output(self, job: Job, suffix: str, content_type: str) -> Response:
+        if job.status != JobStatus.DONE:
+            return Response.error(409, f"Job is {job.status}")
+        path = self.pipeline.write_dir / f"{job.id}{suffix}"
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            return Response.error(404, "Output not found")
+        return Response(200, data, content_type)
+
+    async def route(self, method: str, target: str, body: bytes) -> Response:
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["jobs"]:
+            if method != "POST":
+                return Response.error(405, "Use POST to submit a job")
+            query = parse_qs(url.query)
+            wait = query.get("wait", ["false"])[0].lower() in ("1", "true", "yes")
+            return await self.submit(body, wait=wait)
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            if method != "GET":
+                return Response.error(405, "Use GET to read a job")
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return Response.error(404, f"No such job: {parts[1]}")
+            if len(parts) == 2:
+                return Response.json(200, job.to_json())
+            if parts[2] == "audio":
+                return await self._output(job, ".mp3", "audio/mpeg")
+            if parts[2] == "script":
+                return await self._output(job, ".json", "application/json")
+        return Response.error(404, f"Not found: {url.path}")
+
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        try:
+            response = await self._handle_request(reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            response = Response.error(400, "Malformed request")
+        except ElevenLabsClientError as error:
+            # Listing the voices to check a script against may fail.
+            response = Response.error(502, error.msg)
+        except Exception as error:
+            response = Response.error(500, f"Internal error: {error}")
+        status_line = f"HTTP/1.1 {response.status} {REASONS[response.status]}"
+        head = "\r\n".join(
+            [
+                status_line,
+                f"Content-Type: {response.content_type}",
+                f"Content-Length: {len(response.body)}",
+                "Connection: close",
+                "",
+                "",
+            ]
+        )
+        try:
+            writer.write(head.encode("latin-1") + response.body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader) -> Response:
+        head = await reader.readuntil(b"\r\n\r\n")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        body = b""
+        if method == "POST":
+            if "content-length" not in headers:
+                return Response.error(411, "Content-Length is required")
+            length = int(headers["content-length"])
+            if length > MAX_BODY_SIZE:
+                return Response.error(413, "Script is too large")
+            body = await reader.readexactly(length)
+        return await self.route(method, target, body)
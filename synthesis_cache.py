@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from elevenlabs_client import DialogResponse, RequestSettings
+from write_batch import temp_file
+
+if TYPE_CHECKING:
+    from elevenlabs import DialogueInput
+
+
+def default_cache_dir() -> Path:
+    """
+    The directory used for the synthesis cache when none is given, following
+    the XDG convention of `$XDG_CACHE_HOME`, falling back to `~/.cache`.
+    """
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "daisies"
+
+
+def synthesis_key(inputs: list[DialogueInput], settings: RequestSettings) -> str:
+    """
+    Build a key that identifies a text-to-dialog request by its content. Two
+    requests with the same key are expected to produce the same audio.
+    """
+    payload = {
+        "inputs": [[line.text, line.voice_id] for line in inputs],
+        "settings": asdict(settings),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SynthesisCache:
+    """
+    A persistent, content-addressed store of text-to-dialog responses.
+
+    Every entry is a pair of files named after its key: the MP3 audio and a
+    JSON file of voice segments. The segments file is written last, so an entry
+    without one is incomplete and is treated as a miss. Reading an entry marks
+    it as recently used, and the least recently used entries are evicted
+    whenever the total size of the cache exceeds `max_bytes`.
+
+    The total size is counted once, on the first store, and then kept up to
+    date as entries are stored, so that the directory is only listed again
+    when the cache is full.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # The total size of the entries, or `None` until it is counted.
+        self._size: int | None = None
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def _entry_size(self, key: str) -> int:
+        size = 0
+        for path in (self._audio_path(key), self._segments_path(key)):
+            try:
+                size += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return size
+
+    def _audio_path(self, key: str) -> Path:
+        return self.directory / f"{key}.mp3"
+
+    def _segments_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _temp_path(self, path: Path) -> Path:
+        return path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        temp_path = self._temp_path(path)
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+    def get(self, key: str, spool_dir: Path | None = None) -> DialogResponse | None:
+        """
+        Return the cached response for `key`, or `None` on a miss. With a
+        `spool_dir`, the audio is copied to a temporary file in it rather than
+        read into memory.
+        """
+        audio_path = self._audio_path(key)
+        segments_path = self._segments_path(key)
+        try:
+            segments = json.loads(segments_path.read_text(encoding="utf-8"))
+            if spool_dir is None:
+                audio_data = audio_path.read_bytes()
+                spooled = None
+            else:
+                audio_data = b""
+                spooled = self._spool(audio_path, spool_dir)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        for path in (audio_path, segments_path):
+            os.utime(path)
+        from elevenlabs.types import VoiceSegment
+
+        return DialogResponse(
+            audio_data=audio_data,
+            segments=[VoiceSegment(**segment) for segment in segments],
+            audio_path=spooled,
+        )
+
+    def _spool(self, audio_path: Path, spool_dir: Path) -> Path:
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = temp_file(spool_dir, suffix=".mp3")
+        os.close(fd)
+        try:
+            shutil.copyfile(audio_path, path)
+        except BaseException:
+            path.unlink()
+            raise
+        return path
+
+    def put(self, key: str, response: DialogResponse) -> None:
+        """
+        Store a response under `key`, then evict old entries if needed.
+        """
+        segments = [segment.model_dump() for segment in response.segments]
+        replaced = self._entry_size(key)
+        audio_path = self._audio_path(key)
+        temp_path = self._temp_path(audio_path)
+        response.save_audio(temp_path, keep=True)
+        os.replace(temp_path, audio_path)
+        self._write_atomic(
+            self._segments_path(key),
+            json.dumps(segments).encode("utf-8"),
+        )
+        added = self._entry_size(key) - replaced
+        with self._lock:
+            if self._size is not None:
+                self._size += added
+            full = self._size is None or self._size > self.max_bytes
+        if full:
+            self.prune()
+
+    def prune(self, max_bytes: int | None = None) -> int:
+        """
+        Evict the least recently used entries until the cache is no larger
+        than `max_bytes`, which defaults to the limit of the cache.
+
+        Returns:
+            int: The number of entries that were evicted.
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            entries: dict[str, list[int | float]] = {}
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.startswith(".") or not entry.is_file():
+                        continue
+                    key, _, suffix = entry.name.rpartition(".")
+                    if suffix not in ("mp3", "json"):
+                        continue
+                    stat = entry.stat()
+                    size_and_time = entries.setdefault(key, [0, 0.0])
+                    size_and_time[0] += stat.st_size
+                    size_and_time[1] = max(size_and_time[1], stat.st_mtime)
+
+            total = sum(size for size, _ in entries.values())
+            evicted = 0
+            for key, (size, _) in sorted(entries.items(), key=lambda e: e[1][1]):
+                if total <= limit:
+                    break
+                self._segments_path(key).unlink(missing_ok=True)
+                self._audio_path(key).unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+            self._size = total
+        return evicted
@@ -1,15 +1,16 @@
 import json
 import os
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from elevenlabs.core import ApiError
 import pytest
 from elevenlabs import (
     AudioWithTimestampsAndVoiceSegmentsResponseModel,
+    AsyncElevenLabs,
     DialogueInput,
     ElevenLabs,
-    GetVoicesResponse,
+    GetVoicesV2Response,
     UnprocessableEntityError,
     Voice,
     VoiceSegment,
@@ -313,37 +314,40 @@ def dialog_script_no_first_speaker(
 
 
 @pytest.fixture
-def mock_elevenlabs_api(
-    voice_segments: list[VoiceSegment],
-    user_voice_1: Voice,
-    user_voice_2: Voice,
-):
+def mock_elevenlabs_api(user_voice_1: Voice, user_voice_2: Voice):
     """
-    Mock a successful ElevenLabs API for happy path events.
+    Mock a successful request for the voices available to the API key.
     """
     mock = MagicMock(spec=ElevenLabs)
+    mock_search_result = MagicMock(spec=GetVoicesV2Response)
+    mock_search_result.voices = [user_voice_1, user_voice_2]
+    mock_search_result.has_more = False
+    mock_search_result.next_page_token = None
+    mock.voices.search.return_value = mock_search_result
+
+    return mock
 
-    # Mock a successful result of requesting a dialogue with timestamps.
+
+@pytest.fixture
+def mock_async_elevenlabs_api(voice_segments: list[VoiceSegment]):
+    """
+    Mock a successful asynchronous ElevenLabs API for happy path events.
+    """
+    mock = MagicMock(spec=AsyncElevenLabs)
     mock_get_dialogue_result = MagicMock(
         spec=AudioWithTimestampsAndVoiceSegmentsResponseModel
     )
     mock_get_dialogue_result.audio_base_64 = MP3_BASE64
     mock_get_dialogue_result.voice_segments = voice_segments
-    mock.text_to_dialogue.convert_with_timestamps.return_value = (
-        mock_get_dialogue_result
+    mock.text_to_dialogue.convert_with_timestamps = AsyncMock(
+        return_value=mock_get_dialogue_result
     )
-
-    # Mock a successful request for the voices available to the API key.
-    mock_verify_voices_result = MagicMock(spec=GetVoicesResponse)
-    mock_verify_voices_result.voices = [user_voice_1, user_voice_2]
-    mock.voices.get_all.return_value = mock_verify_voices_result
-
     return mock
 
 
 @pytest.fixture
 def mock_api_unprocessable_entity_error():
-    mock = MagicMock(spec=ElevenLabs)
+    mock = MagicMock(spec=AsyncElevenLabs)
     error = UnprocessableEntityError(body=MagicMock())
     error.body.detail = [
         MagicMock(
@@ -351,7 +355,7 @@ def mock_api_unprocessable_entity_error():
             msg="Error message",
         )
     ]
-    mock.text_to_dialogue.convert_with_timestamps.side_effect = error
+    mock.text_to_dialogue.convert_with_timestamps = AsyncMock(side_effect=error)
     return mock
 
 
@@ -359,19 +363,19 @@ def mock_api_unprocessable_entity_error():
 def mock_api_unhandled_error():
     """
     Unhandled errors should raise an `ElevenLabsClientError` when encountered
-    within `ElevenlabsClient`.
+    within `AsyncElevenLabsClient`.
     """
-    mock = MagicMock(spec=ElevenLabs)
+    mock = MagicMock(spec=AsyncElevenLabs)
     error = Exception()
-    mock.text_to_dialogue.convert_with_timestamps.side_effect = error
+    mock.text_to_dialogue.convert_with_timestamps = AsyncMock(side_effect=error)
     return mock
 
 
 @pytest.fixture
 def mock_elevenlabs_api_error():
-    mock = MagicMock(spec=ElevenLabs)
+    mock = MagicMock(spec=AsyncElevenLabs)
     error = ApiError()
-    mock.text_to_dialogue.convert_with_timestamps.side_effect = error
+    mock.text_to_dialogue.convert_with_timestamps = AsyncMock(side_effect=error)
     return mock
 
 
@@ -380,9 +384,11 @@ def mock_elevenlabs_api_bad_audio(
     invalid_base64_audio_string: str,
     voice_segments: list[VoiceSegment],
 ):
-    mock = MagicMock(spec=ElevenLabs)
+    mock = MagicMock(spec=AsyncElevenLabs)
     mock_result = MagicMock(spec=AudioWithTimestampsAndVoiceSegmentsResponseModel)
     mock_result.audio_base_64 = invalid_base64_audio_string
     mock_result.voice_segments = voice_segments
-    mock.text_to_dialogue.convert_with_timestamps.return_value = mock_result
+    mock.text_to_dialogue.convert_with_timestamps = AsyncMock(
+        return_value=mock_result
+    )
     return mock
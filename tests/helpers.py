@@ -66,3 +66,13 @@ def make_output_script(
             ),
         ],
     }
+
+
+def make_mp3(frame_count: int) -> bytes:
+    """
+    Build a valid MP3 of `frame_count` silent frames, each 24 ms long, by
+    repeating the last audio frame of `mp3_bytes` after its ID3 tag and Info
+    frame.
+    """
+    header, frame = mp3_bytes[:237], mp3_bytes[-24:]
+    return header + frame * frame_count
@@ -0,0 +1,96 @@
+import hashlib
+
+import pytest
+from elevenlabs import DialogueInput, VoiceSegment
+
+from chunking import chunk_ranges, join_chunks
+from elevenlabs_client import DialogResponse
+from mp3_frames import duration, parse_mp3
+from tests.helpers import VOICE_ID_1, VOICE_ID_2, make_mp3
+
+
+def line(text: str, voice_id: str = VOICE_ID_1) -> DialogueInput:
+    return DialogueInput(text=text, voice_id=voice_id)
+
+
+def segment(index: int, start: float, end: float) -> VoiceSegment:
+    return VoiceSegment(
+        voice_id=VOICE_ID_1,
+        start_time_seconds=start,
+        end_time_seconds=end,
+        character_start_index=0,
+        character_end_index=1,
+        dialogue_input_index=index,
+    )
+
+
+class TestChunkRanges:
+    def test_short_script_is_one_chunk(self):
+        inputs = [line("a" * 10), line("b" * 10)]
+        assert chunk_ranges(inputs, max_characters=100) == [(0, 2)]
+
+    def test_split_by_characters(self):
+        inputs = [line("a" * 40) for _ in range(5)]
+        assert chunk_ranges(inputs, max_characters=100) == [(0, 2), (2, 4), (4, 5)]
+
+    def test_long_line_is_a_chunk_of_its_own(self):
+        inputs = [line("a" * 10), line("b" * 500), line("c" * 10)]
+        assert chunk_ranges(inputs, max_characters=100) == [(0, 1), (1, 2), (2, 3)]
+
+    def test_split_by_voices(self):
+        inputs = [line("a", f"voice{index}") for index in range(5)]
+        inputs.append(line("b", "voice0"))
+        assert chunk_ranges(inputs, max_voices=2) == [(0, 2), (2, 4), (4, 6)]
+
+    def test_repeated_voices_do_not_count_twice(self):
+        inputs = [line("a", VOICE_ID_1), line("b", VOICE_ID_2)] * 5
+        assert chunk_ranges(inputs, max_voices=2) == [(0, 10)]
+
+    def test_empty(self):
+        assert chunk_ranges([]) == []
+
+
+class TestJoinChunks:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        # 10 frames of 24 ms, then 5 frames, for three lines.
+        self.ranges = [(0, 2), (2, 3)]
+        self.responses = [
+            DialogResponse(
+                audio_data=make_mp3(10),
+                segments=[segment(0, 0.0, 0.1), segment(1, 0.12, 0.2)],
+            ),
+            DialogResponse(
+                audio_data=make_mp3(5),
+                segments=[segment(0, 0.01, 0.1)],
+            ),
+        ]
+        self.joined = join_chunks(self.ranges, self.responses)
+
+    def test_audio_is_concatenated(self):
+        mp3 = parse_mp3(self.joined.audio_data)
+        assert len(mp3.audio_frames) == 15
+        assert duration(mp3.audio_frames) == pytest.approx(0.36)
+        assert not any(frame.is_info for frame in mp3.frames)
+
+    def test_tag_of_first_chunk_is_kept(self):
+        first = parse_mp3(self.responses[0].audio_data)
+        assert self.joined.audio_data.startswith(first.tag)
+
+    def test_segments_are_rebased(self):
+        segments = self.joined.segments
+        assert [s.dialogue_input_index for s in segments] == [0, 1, 2]
+        assert segments[1].start_time_seconds == pytest.approx(0.12)
+        assert segments[2].start_time_seconds == pytest.approx(0.24 + 0.01)
+        assert segments[2].end_time_seconds == pytest.approx(0.24 + 0.1)
+
+    def test_spooled(self, tmp_path):
+        for index, response in enumerate(self.responses):
+            response.audio_path = tmp_path / f"chunk{index}.mp3"
+            response.audio_path.write_bytes(response.audio_data)
+        joined = join_chunks(self.ranges, self.responses, tmp_path)
+        assert joined.audio_data == b""
+        assert joined.audio_path.read_bytes() == self.joined.audio_data
+        assert joined.audio_sha256 == hashlib.sha256(self.joined.audio_data).hexdigest()
+        # The chunks are deleted once they are joined.
+        assert list(tmp_path.iterdir()) == [joined.audio_path]
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+
+from concurrency import AdaptiveLimiter
+from errors import ElevenLabsClientError
+
+
+class TestAdaptiveLimiter:
+    def test_invalid_initial(self):
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(initial=5, ceiling=4)
+
+    def test_fixed_limit_is_not_adaptive(self):
+        limiter = AdaptiveLimiter(initial=3, ceiling=3, floor=3)
+        assert not limiter.adaptive
+        limiter.on_throttled(time.monotonic())
+        assert limiter.limit == 3
+
+    def test_additive_increase_up_to_ceiling(self):
+        limiter = AdaptiveLimiter(initial=2, ceiling=4)
+        for _ in range(2):
+            limiter.on_success(1.0)
+        assert limiter.limit == pytest.approx(2.9, abs=0.1)
+        for _ in range(100):
+            limiter.on_success(1.0)
+        assert limiter.limit == 4
+
+    def test_slow_response_does_not_increase(self):
+        limiter = AdaptiveLimiter(initial=2, ceiling=4)
+        limiter.on_success(1.0)
+        limit = limiter.limit
+        limiter.on_success(10.0)
+        assert limiter.limit == limit
+
+    def test_multiplicative_decrease_down_to_floor(self):
+        limiter = AdaptiveLimiter(initial=8, ceiling=8)
+        limiter.on_throttled(time.monotonic())
+        assert limiter.limit == 4
+        for _ in range(5):
+            limiter.on_throttled(time.monotonic())
+        assert limiter.limit == 1
+
+    def test_one_decrease_per_burst(self):
+        limiter = AdaptiveLimiter(initial=8, ceiling=8)
+        started = time.monotonic()
+        limiter.on_throttled(started)
+        limiter.on_throttled(started)
+        assert limiter.limit == 4
+
+
+class TestAdaptiveLimiterSlot:
+    def test_limits_requests_in_flight(self):
+        limiter = AdaptiveLimiter(initial=2, ceiling=2, floor=2)
+        most_in_flight = 0
+
+        async def request() -> None:
+            nonlocal most_in_flight
+            async with limiter.slot():
+                most_in_flight = max(most_in_flight, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def main() -> None:
+            await asyncio.gather(*(request() for _ in range(6)))
+
+        asyncio.run(main())
+        assert most_in_flight == 2
+        assert limiter.in_flight == 0
+
+    @pytest.mark.parametrize(
+        "status_code, expected", [(429, 2), (503, 2), (422, 4), (None, 4)]
+    )
+    def test_backs_off_on_throttling(self, status_code: int | None, expected: int):
+        limiter = AdaptiveLimiter(initial=4, ceiling=8)
+
+        async def request() -> None:
+            async with limiter.slot():
+                raise ElevenLabsClientError("error", status_code=status_code)
+
+        with pytest.raises(ElevenLabsClientError):
+            asyncio.run(request())
+        assert limiter.limit == expected
+        assert limiter.in_flight == 0
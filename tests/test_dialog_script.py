@@ -1,3 +1,5 @@
+import json
+import pickle
 from json import JSONDecodeError
 from pathlib import Path
 from jsonschema import ValidationError
@@ -120,3 +122,33 @@ class TestDialogScriptLinesProperty:
         assert lines[1].speaker == SPEAKER_2
         assert lines[1].voice_id == VOICE_ID_2
         assert lines[1].text == TEXT_2
+
+
+class TestDialogScriptRepresentation:
+    def test_raw_data_is_not_kept(self, sample_script_file):
+        script = DialogScript(sample_script_file)
+        assert not hasattr(script, "data")
+        assert not hasattr(script, "__dict__")
+
+    def test_voices_are_built_once(self, sample_script_file):
+        script = DialogScript(sample_script_file)
+        assert script.voices is script.voices
+
+    def test_repeated_values_are_shared(self, tmp_path, sample_script):
+        sample_script["lines"].append(dict(sample_script["lines"][0]))
+        path = tmp_path / "repeated.json"
+        path.write_text(json.dumps(sample_script))
+        lines = DialogScript(path).lines
+        assert lines[0].voice_id is lines[-1].voice_id
+        assert lines[0].speaker is lines[-1].speaker
+
+    def test_tagged_text(self, sample_script_file):
+        lines = DialogScript(sample_script_file).lines
+        assert lines[0].tagged_text == TAGGED_TEXT_1
+        assert lines[0].synthesis_text == TAGGED_TEXT_1
+
+    def test_pickle(self, sample_script_file):
+        script = DialogScript(sample_script_file)
+        copied = pickle.loads(pickle.dumps(script))
+        assert copied.lines == script.lines
+        assert copied.voices == script.voices
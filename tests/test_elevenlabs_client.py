@@ -1,12 +1,21 @@
+import asyncio
+import hashlib
+import stat
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
 from unittest.mock import MagicMock
 
+import httpx
 import pytest
 from elevenlabs import DialogueInput, VoiceSegment
-from elevenlabs.types import ModelSettingsResponseModel
-from elevenlabs_client import DialogResponse, ElevenLabsClient
+from elevenlabs.core import ApiError
+from elevenlabs.types import GetVoicesV2Response, ModelSettingsResponseModel, Voice
+import elevenlabs_client
+from elevenlabs_client import AsyncElevenLabsClient, DialogResponse, ElevenLabsClient
+from write_batch import FILE_MODE
 
-from tests.helpers import VOICE_ID_1, VOICE_ID_2, VOICE_ID_3
-from errors import AudioDecodeError, ElevenLabsClientError, VoiceNotAvailableError
+from tests.helpers import VOICE_ID_1, VOICE_ID_2, mp3_bytes
+from errors import AudioDecodeError, ElevenLabsClientError
 
 
 class TestElevenLabsClientGetDialogSuccess:
@@ -15,10 +24,10 @@ class TestElevenLabsClientGetDialogSuccess:
     """
 
     @pytest.fixture(autouse=True)
-    def setup(self, mock_elevenlabs_api, dialog_input_list):
-        self.mock: MagicMock = mock_elevenlabs_api
-        self.client = ElevenLabsClient(mock_elevenlabs_api)
-        self.result = self.client.get_dialog(dialog_input_list)
+    def setup(self, mock_async_elevenlabs_api, dialog_input_list):
+        self.mock: MagicMock = mock_async_elevenlabs_api
+        self.client = AsyncElevenLabsClient(mock_async_elevenlabs_api)
+        self.result = asyncio.run(self.client.get_dialog(dialog_input_list))
 
     def test_api_called_with_correct_parameters(self):
         """Verify the API receives the expected configuration."""
@@ -39,8 +48,8 @@ class TestElevenLabsClientGetDialogSuccess:
         assert settings.stability == 0.5
 
     def test_api_is_called(self):
-        """Verify that the API method was called once."""
-        self.mock.text_to_dialogue.convert_with_timestamps.assert_called_once()
+        """Verify that the API method was awaited once."""
+        self.mock.text_to_dialogue.convert_with_timestamps.assert_awaited_once()
 
     def test_return_dialog_response(self):
         """Verify that the response is the correct type."""
@@ -76,9 +85,9 @@ class TestElevenLabsClientError:
         dialog_input_list: list[DialogueInput],
         mock_api_unprocessable_entity_error: MagicMock,
     ):
-        client = ElevenLabsClient(mock_api_unprocessable_entity_error)
+        client = AsyncElevenLabsClient(mock_api_unprocessable_entity_error)
         with pytest.raises(ElevenLabsClientError) as exception_info:
-            client.get_dialog(dialog_input_list)
+            asyncio.run(client.get_dialog(dialog_input_list))
         assert "Error location" in exception_info.value.msg
         assert "Error message" in exception_info.value.msg
 
@@ -87,9 +96,9 @@ class TestElevenLabsClientError:
         dialog_input_list: list[DialogueInput],
         mock_api_unhandled_error: MagicMock,
     ):
-        client = ElevenLabsClient(mock_api_unhandled_error)
+        client = AsyncElevenLabsClient(mock_api_unhandled_error)
         with pytest.raises(ElevenLabsClientError) as exception_info:
-            client.get_dialog(dialog_input_list)
+            asyncio.run(client.get_dialog(dialog_input_list))
         assert "Unhandled API client error" in exception_info.value.msg
 
     def test_raise_elevenlabs_client_error_on_api_error(
@@ -97,49 +106,239 @@ class TestElevenLabsClientError:
         dialog_input_list: list[DialogueInput],
         mock_elevenlabs_api_error: MagicMock,
     ) -> None:
-        client = ElevenLabsClient(mock_elevenlabs_api_error)
+        client = AsyncElevenLabsClient(mock_elevenlabs_api_error)
         with pytest.raises(ElevenLabsClientError) as exception_info:
-            client.get_dialog(dialog_input_list)
+            asyncio.run(client.get_dialog(dialog_input_list))
 
     def test_raise_audio_decode_error(
         self,
         dialog_input_list: list[DialogueInput],
         mock_elevenlabs_api_bad_audio: MagicMock,
     ):
-        client = ElevenLabsClient(mock_elevenlabs_api_bad_audio)
+        client = AsyncElevenLabsClient(mock_elevenlabs_api_bad_audio)
         with pytest.raises(AudioDecodeError):
-            client.get_dialog(dialog_input_list)
+            asyncio.run(client.get_dialog(dialog_input_list))
 
 
-class TestElevenLabsClientVerifyVoices:
+class TestElevenLabsClientAvailableVoices:
     """
-    Tests for the `_verify_voices` method that confirms whether or not the
-    user's API key may access all of the voices used in the script.
+    Tests for the `available_voices` method that lists the voices the user's
+    API key may access.
     """
 
-    def test_voices_available(
+    def test_voices_available(self, mock_elevenlabs_api: MagicMock):
+        client = ElevenLabsClient(mock_elevenlabs_api)
+        assert client.available_voices() == {VOICE_ID_1, VOICE_ID_2}
+        mock_elevenlabs_api.voices.search.assert_called_once()
+
+    def test_voices_are_listed_page_by_page(
         self,
         mock_elevenlabs_api: MagicMock,
+        user_voice_1: Voice,
+        user_voice_2: Voice,
     ):
-        """
-        All voices in the script are available to the user's API key. The method
-        should not raise and error.
-        """
+        first = GetVoicesV2Response(
+            voices=[user_voice_1], has_more=True, total_count=2, next_page_token="2"
+        )
+        second = GetVoicesV2Response(
+            voices=[user_voice_2], has_more=False, total_count=2
+        )
+        mock_elevenlabs_api.voices.search.side_effect = [first, second]
         client = ElevenLabsClient(mock_elevenlabs_api)
-        client.verify_voices([VOICE_ID_1, VOICE_ID_2])
-        mock_elevenlabs_api.voices.get_all.assert_called_once()
+        assert client.available_voices() == {VOICE_ID_1, VOICE_ID_2}
+        calls = mock_elevenlabs_api.voices.search.call_args_list
+        assert [call.kwargs["next_page_token"] for call in calls] == [None, "2"]
+        assert calls[0].kwargs["page_size"] == 100
+
+    def test_listing_error(self, mock_elevenlabs_api: MagicMock):
+        mock_elevenlabs_api.voices.search.side_effect = ApiError(status_code=401)
+        client = ElevenLabsClient(mock_elevenlabs_api)
+        with pytest.raises(ElevenLabsClientError):
+            client.available_voices()
+
+
+class TestAsyncElevenLabsClientGetDialog:
+    """
+    Test requests made with the asynchronous SDK client.
+    """
 
-    def test_voice_not_available(
+    def test_success(
         self,
-        mock_elevenlabs_api: MagicMock,
+        mock_async_elevenlabs_api: MagicMock,
+        dialog_input_list: list[DialogueInput],
     ):
-        """
-        The script contains one voice that is not available to the user's API.
-        Should raise a `VoiceNotAvailableError` and the error message should
-        contain the offending voice ID.
-        """
-        client = ElevenLabsClient(mock_elevenlabs_api)
-        with pytest.raises(VoiceNotAvailableError) as exception_info:
-            client.verify_voices([VOICE_ID_3])
-        mock_elevenlabs_api.voices.get_all.assert_called_once()
-        assert VOICE_ID_3 in exception_info.value.msg
+        client = AsyncElevenLabsClient(mock_async_elevenlabs_api)
+        result = asyncio.run(client.get_dialog(dialog_input_list))
+        assert isinstance(result, DialogResponse)
+        assert isinstance(result.audio_data, bytes)
+        assert len(result.segments) == 2
+        call_kwargs = (
+            mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps.call_args.kwargs
+        )
+        assert call_kwargs["model_id"] == "eleven_v3"
+        assert call_kwargs["inputs"] == dialog_input_list
+
+    def test_api_error(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        dialog_input_list: list[DialogueInput],
+    ):
+        mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps.side_effect = ApiError(
+            status_code=503
+        )
+        client = AsyncElevenLabsClient(mock_async_elevenlabs_api)
+        with pytest.raises(ElevenLabsClientError) as exception_info:
+            asyncio.run(client.get_dialog(dialog_input_list))
+        assert "503" in exception_info.value.msg
+        assert exception_info.value.status_code == 503
+        assert exception_info.value.throttled
+
+    def test_api_error_plain_text_body(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        dialog_input_list: list[DialogueInput],
+    ):
+        mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps.side_effect = ApiError(
+            status_code=502, body="Bad Gateway"
+        )
+        client = AsyncElevenLabsClient(mock_async_elevenlabs_api)
+        with pytest.raises(ElevenLabsClientError) as exception_info:
+            asyncio.run(client.get_dialog(dialog_input_list))
+        assert exception_info.value.msg == "API error 502: Bad Gateway"
+
+
+class TestSpooledAudio:
+    """
+    Test a client that decodes the audio of its responses into files.
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, monkeypatch):
+        # Decode a few characters at a time to go through several pieces.
+        monkeypatch.setattr(elevenlabs_client, "DECODE_CHUNK_SIZE", 8)
+        self.spool_dir = tmp_path / "spool"
+
+    def test_audio_is_spooled(self, mock_async_elevenlabs_api, dialog_input_list):
+        client = AsyncElevenLabsClient(
+            mock_async_elevenlabs_api, spool_dir=self.spool_dir
+        )
+        result = asyncio.run(client.get_dialog(dialog_input_list))
+        assert result.audio_data == b""
+        assert result.audio_path.parent == self.spool_dir
+        assert result.audio_path.read_bytes() == mp3_bytes
+        assert result.audio_size == len(mp3_bytes)
+        assert result.read_audio() == mp3_bytes
+        assert result.audio_sha256 == hashlib.sha256(mp3_bytes).hexdigest()
+
+    def test_spooled_audio_can_be_read_by_others(
+        self, mock_async_elevenlabs_api, dialog_input_list
+    ):
+        # Spooled audio is renamed into place as the output, mode and all.
+        client = AsyncElevenLabsClient(
+            mock_async_elevenlabs_api, spool_dir=self.spool_dir
+        )
+        result = asyncio.run(client.get_dialog(dialog_input_list))
+        for path in (result.audio_path, result.copy().audio_path):
+            assert stat.S_IMODE(path.stat().st_mode) == FILE_MODE
+
+    def test_invalid_audio_leaves_no_file(
+        self,
+        mock_elevenlabs_api_bad_audio: MagicMock,
+        dialog_input_list: list[DialogueInput],
+    ):
+        client = AsyncElevenLabsClient(
+            mock_elevenlabs_api_bad_audio, spool_dir=self.spool_dir
+        )
+        with pytest.raises(AudioDecodeError):
+            asyncio.run(client.get_dialog(dialog_input_list))
+        assert list(self.spool_dir.iterdir()) == []
+
+    def test_save_audio_moves_file(self, tmp_path):
+        spooled = tmp_path / "spooled.mp3"
+        spooled.write_bytes(mp3_bytes)
+        response = DialogResponse(b"", [], audio_path=spooled)
+        response.save_audio(tmp_path / "out.mp3")
+        assert not spooled.exists()
+        assert (tmp_path / "out.mp3").read_bytes() == mp3_bytes
+
+    def test_save_audio_keeps_file(self, tmp_path):
+        spooled = tmp_path / "spooled.mp3"
+        spooled.write_bytes(mp3_bytes)
+        response = DialogResponse(b"", [], audio_path=spooled)
+        response.save_audio(tmp_path / "copy.mp3", keep=True)
+        assert spooled.read_bytes() == mp3_bytes
+        assert (tmp_path / "copy.mp3").read_bytes() == mp3_bytes
+        response.discard_audio()
+        assert not spooled.exists()
+        assert response.audio_path is None
+
+
+class TestElevenLabsClientRetryableErrors:
+    """
+    Errors carry what is needed to decide whether, and when, to retry.
+    """
+
+    def get_error(
+        self,
+        mock: MagicMock,
+        dialog_input_list: list[DialogueInput],
+        error: Exception,
+    ) -> ElevenLabsClientError:
+        mock.text_to_dialogue.convert_with_timestamps.side_effect = error
+        client = AsyncElevenLabsClient(mock)
+        with pytest.raises(ElevenLabsClientError) as exception_info:
+            asyncio.run(client.get_dialog(dialog_input_list))
+        return exception_info.value
+
+    def test_retry_after_seconds(self, mock_async_elevenlabs_api, dialog_input_list):
+        error = self.get_error(
+            mock_async_elevenlabs_api,
+            dialog_input_list,
+            ApiError(status_code=429, headers={"retry-after": "7"}),
+        )
+        assert error.retryable
+        assert error.retry_after == 7.0
+
+    def test_retry_after_date(self, mock_async_elevenlabs_api, dialog_input_list):
+        date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30))
+        error = self.get_error(
+            mock_async_elevenlabs_api,
+            dialog_input_list,
+            ApiError(status_code=503, headers={"Retry-After": date}),
+        )
+        assert error.retry_after is not None
+        assert 0 < error.retry_after <= 30
+
+    def test_retry_after_date_without_zone(
+        self, mock_async_elevenlabs_api, dialog_input_list
+    ):
+        later = datetime.now(timezone.utc) + timedelta(seconds=30)
+        date = format_datetime(later.replace(tzinfo=None))
+        assert date.endswith("-0000")
+        error = self.get_error(
+            mock_async_elevenlabs_api,
+            dialog_input_list,
+            ApiError(status_code=503, headers={"Retry-After": date}),
+        )
+        assert error.retry_after is not None
+        assert 0 < error.retry_after <= 30
+
+    def test_connection_error(self, mock_async_elevenlabs_api, dialog_input_list):
+        error = self.get_error(
+            mock_async_elevenlabs_api,
+            dialog_input_list,
+            httpx.ConnectError("Connection refused"),
+        )
+        assert error.transient
+        assert error.retryable
+
+    def test_unprocessable_entity_is_fatal(
+        self,
+        mock_api_unprocessable_entity_error,
+        dialog_input_list,
+    ):
+        client = AsyncElevenLabsClient(mock_api_unprocessable_entity_error)
+        with pytest.raises(ElevenLabsClientError) as exception_info:
+            asyncio.run(client.get_dialog(dialog_input_list))
+        assert exception_info.value.status_code == 422
+        assert not exception_info.value.retryable
@@ -0,0 +1,188 @@
+import hashlib
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from elevenlabs import DialogueInput, VoiceSegment
+
+from elevenlabs_client import DialogResponse, RequestSettings
+from incremental import (
+    LineSpan,
+    RenderRecord,
+    line_keys,
+    line_spans,
+    changed_runs,
+    diff_lines,
+    record_path,
+    splice,
+)
+from mp3_frames import parse_mp3
+from tests.helpers import TEXT_1, TEXT_2, VOICE_ID_1, VOICE_ID_2, make_mp3
+
+TEXT_3 = "Blah."
+EDITED_TEXT = "Blah blah, blah."
+
+
+def segment(index: int, start: float, end: float) -> VoiceSegment:
+    return VoiceSegment(
+        voice_id=VOICE_ID_1,
+        start_time_seconds=start,
+        end_time_seconds=end,
+        character_start_index=0,
+        character_end_index=1,
+        dialogue_input_index=index,
+    )
+
+
+def test_line_spans_merges_segments():
+    segments = [segment(0, 0.0, 0.5), segment(0, 0.5, 0.9), segment(1, 1.0, 2.0)]
+    assert line_spans(segments, 2) == [(0.0, 0.9), (1.0, 2.0)]
+
+
+def test_line_spans_missing_line():
+    with pytest.raises(ValueError):
+        line_spans([segment(0, 0.0, 1.0)], 2)
+
+
+def test_record_round_trip(tmp_path: Path):
+    path = record_path(tmp_path, "script")
+    record = RenderRecord(audio_size=10, lines=[LineSpan("key", 0.0, 1.0)])
+    record.save(path)
+    assert RenderRecord.load(path) == record
+
+
+def test_record_missing(tmp_path: Path):
+    assert RenderRecord.load(record_path(tmp_path, "script")) is None
+
+
+class TestRenderIncrementally:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.settings = RequestSettings()
+        self.inputs = [
+            DialogueInput(text=TEXT_1, voice_id=VOICE_ID_1),
+            DialogueInput(text=TEXT_2, voice_id=VOICE_ID_2),
+            DialogueInput(text=TEXT_3, voice_id=VOICE_ID_1),
+        ]
+        # 30 frames of 24 ms, with each line starting on a 10-frame slot.
+        self.previous_audio = make_mp3(30)
+        self.previous = RenderRecord(
+            audio_size=len(self.previous_audio),
+            lines=[
+                LineSpan(key, start, end)
+                for key, (start, end) in zip(
+                    line_keys(self.inputs, self.settings),
+                    [(0.0, 0.2), (0.24, 0.44), (0.48, 0.7)],
+                )
+            ],
+        )
+        self.synthesize = MagicMock(
+            return_value=DialogResponse(
+                audio_data=make_mp3(5),
+                segments=[segment(0, 0.0, 0.1)],
+            )
+        )
+
+    def render(
+        self,
+        inputs: list[DialogueInput],
+        settings: RequestSettings | None = None,
+        spool_dir: Path | None = None,
+    ) -> DialogResponse | None:
+        keys = line_keys(inputs, settings or self.settings)
+        opcodes = diff_lines(keys, self.previous)
+        if opcodes is None:
+            return None
+        return splice(
+            inputs=inputs,
+            opcodes=opcodes,
+            previous=self.previous,
+            previous_audio=self.previous_audio,
+            responses=[
+                self.synthesize(inputs[j1:j2]) for j1, j2 in changed_runs(opcodes)
+            ],
+            spool_dir=spool_dir,
+        )
+
+    def starts_and_ends(self, response: DialogResponse) -> list[tuple]:
+        return [
+            (
+                pytest.approx(s.start_time_seconds),
+                pytest.approx(s.end_time_seconds),
+            )
+            for s in response.segments
+        ]
+
+    def test_unchanged(self):
+        assert self.render(self.inputs) is None
+        self.synthesize.assert_not_called()
+
+    def test_edited_line(self):
+        inputs = list(self.inputs)
+        inputs[1] = DialogueInput(text=EDITED_TEXT, voice_id=VOICE_ID_2)
+        response = self.render(inputs)
+        assert response is not None
+        self.synthesize.assert_called_once_with([inputs[1]])
+        assert len(parse_mp3(response.audio_data).audio_frames) == 25
+        assert self.starts_and_ends(response) == [
+            (0.0, 0.2),
+            (0.24, 0.34),
+            (0.36, 0.58),
+        ]
+        assert [s.dialogue_input_index for s in response.segments] == [0, 1, 2]
+
+    def test_spooled(self, tmp_path: Path):
+        inputs = list(self.inputs)
+        inputs[1] = DialogueInput(text=EDITED_TEXT, voice_id=VOICE_ID_2)
+        in_memory = self.render(inputs)
+        spooled = self.render(inputs, spool_dir=tmp_path)
+        assert in_memory is not None and spooled is not None
+        assert spooled.audio_data == b""
+        assert spooled.audio_path.parent == tmp_path
+        assert spooled.read_audio() == in_memory.audio_data
+        assert spooled.audio_sha256 == hashlib.sha256(in_memory.audio_data).hexdigest()
+        assert spooled.segments == in_memory.segments
+
+    def test_inserted_line(self):
+        inserted = DialogueInput(text=EDITED_TEXT, voice_id=VOICE_ID_2)
+        inputs = [self.inputs[0], inserted, *self.inputs[1:]]
+        response = self.render(inputs)
+        assert response is not None
+        self.synthesize.assert_called_once_with([inserted])
+        assert len(parse_mp3(response.audio_data).audio_frames) == 35
+        assert self.starts_and_ends(response) == [
+            (0.0, 0.2),
+            (0.24, 0.34),
+            (0.36, 0.56),
+            (0.6, 0.82),
+        ]
+
+    def test_deleted_line(self):
+        response = self.render([self.inputs[0], self.inputs[2]])
+        assert response is not None
+        self.synthesize.assert_not_called()
+        assert len(parse_mp3(response.audio_data).audio_frames) == 20
+        assert self.starts_and_ends(response) == [(0.0, 0.2), (0.24, 0.46)]
+
+    def test_settings_change_replaces_every_line(self):
+        self.synthesize.return_value = DialogResponse(
+            audio_data=make_mp3(30),
+            segments=[segment(i, i * 0.24, i * 0.24 + 0.2) for i in range(3)],
+        )
+        response = self.render(self.inputs, RequestSettings(stability=0.9))
+        assert response is not None
+        self.synthesize.assert_called_once_with(self.inputs)
+
+
+def test_record_segments():
+    inputs = [
+        DialogueInput(text=TEXT_1, voice_id=VOICE_ID_1),
+        DialogueInput(text=TEXT_2, voice_id=VOICE_ID_2),
+    ]
+    record = RenderRecord(
+        audio_size=10,
+        lines=[LineSpan("a", 0.0, 1.0), LineSpan("b", 1.5, 2.0)],
+    )
+    segments = record.segments(inputs)
+    assert [s.voice_id for s in segments] == [VOICE_ID_1, VOICE_ID_2]
+    assert line_spans(segments, 2) == [(0.0, 1.0), (1.5, 2.0)]
@@ -1,4 +1,4 @@
-from tests.helpers import SPEAKER_1, TEXT_1, VOICE_ID_1
+from tests.helpers import SPEAKER_1, TAGGED_TEXT_1, TEXT_1, VOICE_ID_1
 from input_script_line import InputScriptLine
 
 
@@ -23,3 +23,18 @@ def test_null_speaker():
     assert line.speaker is None
     assert line.voice_id == VOICE_ID_1
     assert line.text == TEXT_1
+
+
+def test_synthesis_text():
+    line = InputScriptLine(
+        speaker=SPEAKER_1,
+        voice_id=VOICE_ID_1,
+        text=TEXT_1,
+        tagged_text=TAGGED_TEXT_1,
+    )
+    assert line.synthesis_text == TAGGED_TEXT_1
+
+
+def test_synthesis_text_no_tagged_text():
+    line = InputScriptLine(speaker=SPEAKER_1, voice_id=VOICE_ID_1, text=TEXT_1)
+    assert line.synthesis_text == TEXT_1
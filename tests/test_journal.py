@@ -0,0 +1,146 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from elevenlabs_client import DialogResponse
+from journal import Journal, JobState, journal_path
+
+
+@pytest.fixture
+def journal(tmp_path: Path):
+    journal = Journal(journal_path(tmp_path / "output"))
+    yield journal
+    journal.close()
+
+
+@pytest.fixture
+def paths(tmp_path: Path) -> list[Path]:
+    return [tmp_path / f"script_{index}.json" for index in range(3)]
+
+
+class TestJournal:
+    def test_begin_makes_every_script_pending(
+        self, journal: Journal, paths: list[Path]
+    ):
+        journal.begin(paths)
+        assert journal.unfinished() == [path.absolute() for path in paths]
+        assert journal.state(paths[0].stem) == JobState.PENDING
+
+    def test_written_scripts_are_finished(self, journal: Journal, paths: list[Path]):
+        journal.begin(paths)
+        journal.written(paths[1].stem)
+        assert journal.unfinished() == [paths[0].absolute(), paths[2].absolute()]
+
+    def test_failed_scripts_are_unfinished(
+        self, journal: Journal, paths: list[Path]
+    ):
+        journal.begin(paths)
+        journal.failed(paths[0].stem, "boom")
+        assert journal.state(paths[0].stem) == JobState.FAILED
+        assert paths[0].absolute() in journal.unfinished()
+
+    def test_received_audio(
+        self,
+        journal: Journal,
+        paths: list[Path],
+        dialog_response: DialogResponse,
+    ):
+        stem = paths[0].stem
+        journal.begin(paths)
+        journal.synthesized(stem, "key", dialog_response)
+        assert journal.state(stem) == JobState.SYNTHESIZED
+        received = journal.received(stem, "key")
+        assert received is not None
+        assert received.read_audio() == dialog_response.audio_data
+        assert received.segments == dialog_response.segments
+        assert journal.received(stem, "other key") is None
+
+    def test_written_drops_audio(
+        self,
+        journal: Journal,
+        paths: list[Path],
+        dialog_response: DialogResponse,
+    ):
+        stem = paths[0].stem
+        journal.begin(paths)
+        journal.synthesized(stem, "key", dialog_response)
+        journal.written(stem)
+        assert journal.received(stem, "key") is None
+        assert list(journal.audio_dir.iterdir()) == []
+
+    def test_spooled_audio_is_linked(
+        self,
+        journal: Journal,
+        paths: list[Path],
+        dialog_response: DialogResponse,
+        tmp_path: Path,
+    ):
+        stem = paths[0].stem
+        spooled = tmp_path / "spooled.mp3"
+        spooled.write_bytes(dialog_response.audio_data)
+        dialog_response.audio_path = spooled
+        journal.begin(paths)
+        journal.synthesized(stem, "key", dialog_response)
+        kept = journal.audio_dir / f"{stem}.mp3"
+        assert kept.stat().st_ino == spooled.stat().st_ino
+        # The spooled file may be moved or deleted once it was journaled.
+        spooled.unlink()
+        received = journal.received(stem, "key")
+        assert received is not None
+        assert received.audio_path.parent == journal.audio_dir
+        assert received.read_audio() == dialog_response.audio_data
+
+    def test_new_batch_keeps_unwritten_audio(
+        self,
+        journal: Journal,
+        paths: list[Path],
+        dialog_response: DialogResponse,
+    ):
+        journal.begin(paths)
+        journal.synthesized(paths[0].stem, "key", dialog_response)
+        journal.begin(paths[:1])
+        assert journal.received(paths[0].stem, "key") is not None
+
+    def test_new_batch_keeps_unfinished_scripts(
+        self,
+        journal: Journal,
+        paths: list[Path],
+        dialog_response: DialogResponse,
+    ):
+        journal.begin(paths)
+        journal.synthesized(paths[1].stem, "key", dialog_response)
+        journal.written(paths[2].stem)
+        journal.begin(paths[:1])
+        assert journal.unfinished() == [path.absolute() for path in paths[:2]]
+        assert journal.received(paths[1].stem, "key") is not None
+        assert journal.state(paths[2].stem) is None
+
+    def test_survives_reopening(
+        self,
+        tmp_path: Path,
+        paths: list[Path],
+        dialog_response: DialogResponse,
+    ):
+        path = journal_path(tmp_path / "output")
+        journal = Journal(path)
+        journal.begin(paths)
+        journal.synthesized(paths[0].stem, "key", dialog_response)
+        journal.close()
+
+        journal = Journal(path)
+        assert journal.state(paths[0].stem) == JobState.SYNTHESIZED
+        assert journal.received(paths[0].stem, "key") is not None
+        journal.close()
+
+    def test_older_journal_is_started_afresh(self, tmp_path: Path, paths: list[Path]):
+        path = journal_path(tmp_path / "output")
+        path.parent.mkdir(parents=True)
+        connection = sqlite3.connect(path, isolation_level=None)
+        connection.execute("CREATE TABLE jobs (stem TEXT PRIMARY KEY, audio BLOB)")
+        connection.execute("INSERT INTO jobs VALUES ('old', x'00')")
+        connection.close()
+        journal = Journal(path)
+        journal.begin(paths)
+        assert journal.unfinished() == [path.absolute() for path in paths]
+        journal.close()
@@ -0,0 +1,128 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import manifest as manifest_module
+from dialog_script import DialogScript
+from elevenlabs_client import RequestSettings
+from manifest import Manifest, manifest_path
+
+SETTINGS = RequestSettings()
+
+
+class TestManifest:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path: Path, sample_script_file: Path) -> None:
+        self.input = sample_script_file
+        self.write_dir = tmp_path / "output"
+        self.write_dir.mkdir()
+        self.outputs = [
+            self.write_dir / f"{self.input.stem}.mp3",
+            self.write_dir / f"{self.input.stem}.json",
+        ]
+        self.manifest = Manifest(manifest_path(self.write_dir))
+
+    def build(self) -> None:
+        for output in self.outputs:
+            output.write_text(output.name)
+        self.manifest.record(self.input, self.outputs, SETTINGS)
+
+    def outdated(self, settings: RequestSettings = SETTINGS) -> list[Path]:
+        return self.manifest.outdated([self.input], self.write_dir, settings)
+
+    def set_mtime(self, path: Path, seconds: int) -> None:
+        os.utime(path, (seconds, seconds))
+
+    def test_never_built(self):
+        assert self.outdated() == [self.input]
+
+    def test_up_to_date(self):
+        self.build()
+        assert self.outdated() == []
+
+    def test_input_changed(self):
+        self.build()
+        self.input.write_text(self.input.read_text() + " ")
+        assert self.outdated() == [self.input]
+
+    def test_input_touched(self):
+        self.build()
+        self.set_mtime(self.input, 2_000_000_000)
+        assert self.outdated() == []
+        with patch.object(
+            manifest_module, "file_hash", wraps=manifest_module.file_hash
+        ) as file_hash:
+            assert self.outdated() == []
+        file_hash.assert_not_called()
+
+    def test_input_changed_while_building(self):
+        script = DialogScript(self.input)
+        self.input.write_text(self.input.read_text() + " ")
+        for output in self.outputs:
+            output.write_text(output.name)
+        self.manifest.record(
+            self.input, self.outputs, SETTINGS, source=(script.stat, script.sha256)
+        )
+        assert self.outdated() == [self.input]
+
+    def test_output_hashes_are_not_taken_again(self):
+        hashes = {}
+        for output in self.outputs:
+            output.write_text(output.name)
+            hashes[output] = manifest_module.file_hash(output)
+        script = DialogScript(self.input)
+        with patch.object(manifest_module, "file_hash") as file_hash:
+            self.manifest.record(
+                self.input,
+                self.outputs,
+                SETTINGS,
+                source=(script.stat, script.sha256),
+                hashes=hashes,
+            )
+        file_hash.assert_not_called()
+        assert self.outdated() == []
+
+    def test_settings_changed(self):
+        self.build()
+        assert self.outdated(RequestSettings(stability=0.9)) == [self.input]
+
+    def test_output_missing(self):
+        self.build()
+        self.outputs[0].unlink()
+        assert self.outdated() == [self.input]
+
+    def test_output_modified(self):
+        self.build()
+        self.outputs[1].write_text("edited by hand")
+        assert self.outdated() == [self.input]
+
+    def test_legacy_outputs_are_adopted(self):
+        for output in self.outputs:
+            output.write_text(output.name)
+        self.set_mtime(self.input, 1_000_000_000)
+        assert self.outdated() == []
+        # Once adopted, an edit to the input is noticed.
+        self.input.write_text(self.input.read_text() + " ")
+        assert self.outdated() == [self.input]
+
+    def test_legacy_outputs_older_than_input(self):
+        for output in self.outputs:
+            output.write_text(output.name)
+            self.set_mtime(output, 1_000_000_000)
+        assert self.outdated() == [self.input]
+
+    def test_save_and_load(self):
+        self.build()
+        self.manifest.save()
+        loaded = Manifest(manifest_path(self.write_dir))
+        assert loaded.outdated([self.input], self.write_dir, SETTINGS) == []
+
+    def test_corrupt_manifest_is_ignored(self):
+        path = manifest_path(self.write_dir)
+        path.parent.mkdir()
+        path.write_text("{")
+        assert Manifest(path).outdated([self.input], self.write_dir, SETTINGS) == [
+            self.input
+        ]
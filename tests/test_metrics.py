@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import metrics
+from metrics import Histogram, Metrics
+
+
+def test_counters_add_up():
+    registry = Metrics()
+    registry.count("requests")
+    registry.count("requests")
+    registry.count("characters_sent", 120)
+    assert registry.counters == {"requests": 2, "characters_sent": 120}
+
+
+def test_timed_observes_failures():
+    registry = Metrics()
+    with pytest.raises(ValueError):
+        with registry.timed("parse_seconds"):
+            raise ValueError()
+    assert registry.histograms["parse_seconds"].count == 1
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    for value in [0.002, 0.003, 0.2, 1000]:
+        histogram.observe(value)
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(1000.205)
+    assert histogram.buckets[metrics.BUCKETS.index(0.005)] == 2
+    assert histogram.buckets[metrics.BUCKETS.index(0.25)] == 1
+    # Beyond the last bucket, only the count and the sum hold the value.
+    assert sum(histogram.buckets) == 3
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(1) == 1000
+
+
+def test_prometheus_format():
+    registry = Metrics()
+    registry.count("requests", 3)
+    registry.observe("request_seconds", 0.3)
+    registry.observe("request_seconds", 0.7)
+    lines = registry.to_prometheus().splitlines()
+    assert "# TYPE daisies_requests_total counter" in lines
+    assert "daisies_requests_total 3" in lines
+    assert "# TYPE daisies_request_seconds histogram" in lines
+    assert 'daisies_request_seconds_bucket{le="0.25"} 0' in lines
+    assert 'daisies_request_seconds_bucket{le="0.5"} 1' in lines
+    assert 'daisies_request_seconds_bucket{le="1"} 2' in lines
+    assert 'daisies_request_seconds_bucket{le="+Inf"} 2' in lines
+    assert "daisies_request_seconds_sum 1.000000" in lines
+    assert "daisies_request_seconds_count 2" in lines
+
+
+def test_prometheus_counters_keep_precision():
+    registry = Metrics()
+    registry.count("bytes_written", 123456789)
+    registry.count("characters_sent", 0.1)
+    registry.count("characters_sent", 0.2)
+    lines = registry.to_prometheus().splitlines()
+    assert "daisies_bytes_written_total 123456789" in lines
+    assert "daisies_characters_sent_total 0.30000000000000004" in lines
+
+
+def test_export(tmp_path: Path):
+    registry = Metrics()
+    registry.count("bytes_written", 2048)
+    registry.observe("write_seconds", 0.02)
+    registry.export(tmp_path / "metrics")
+    summary = json.loads((tmp_path / "metrics" / "daisies.json").read_text())
+    assert summary["counters"] == {"bytes_written": 2048}
+    assert summary["histograms"]["write_seconds"]["count"] == 1
+    assert summary["histograms"]["write_seconds"]["mean"] == 0.02
+    prometheus = (tmp_path / "metrics" / "daisies.prom").read_text()
+    assert "daisies_bytes_written_total 2048" in prometheus
+    # No temporary file is left behind.
+    names = sorted(path.name for path in (tmp_path / "metrics").iterdir())
+    assert names == ["daisies.json", "daisies.prom"]
@@ -0,0 +1,50 @@
+import pytest
+
+from errors import AudioDecodeError
+from mp3_frames import duration, nearest_frame_index, parse_mp3
+from tests.helpers import make_mp3, mp3_bytes
+
+
+class TestParseMp3:
+    def test_sample_file(self):
+        mp3 = parse_mp3(mp3_bytes)
+        assert mp3.tag == mp3_bytes[:45]
+        assert len(mp3.frames) == 5
+        assert mp3.frames[0].is_info
+        assert len(mp3.audio_frames) == 4
+        assert all(frame.duration == pytest.approx(0.024) for frame in mp3.frames)
+
+    def test_frames_are_contiguous(self):
+        mp3 = parse_mp3(make_mp3(10))
+        for previous, frame in zip(mp3.frames, mp3.frames[1:]):
+            assert frame.offset == previous.offset + previous.length
+        assert mp3.frames[-1].offset + mp3.frames[-1].length == len(mp3.data)
+
+    def test_trailing_garbage_is_dropped(self):
+        mp3 = parse_mp3(make_mp3(3) + b"TAG" + bytes(125))
+        assert len(mp3.audio_frames) == 3
+
+    def test_frame_bytes(self):
+        data = make_mp3(3)
+        mp3 = parse_mp3(data)
+        assert mp3.frame_bytes(mp3.audio_frames) == data[237:]
+
+    def test_not_mp3(self):
+        with pytest.raises(AudioDecodeError):
+            parse_mp3(b"not an mp3 file")
+
+
+class TestNearestFrameIndex:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.frames = parse_mp3(make_mp3(10)).audio_frames
+
+    def test_duration(self):
+        assert duration(self.frames) == pytest.approx(0.24)
+
+    @pytest.mark.parametrize(
+        "seconds, expected",
+        [(0.0, 0), (0.011, 0), (0.013, 1), (0.048, 2), (0.1, 4), (1.0, 10)],
+    )
+    def test_rounds_to_nearest_boundary(self, seconds: float, expected: int):
+        assert nearest_frame_index(self.frames, seconds) == expected
@@ -26,6 +26,7 @@ from tests.helpers import (
     TEXT_2,
     make_output_script,
 )
+from write_batch import WriteBatch
 
 
 def test_line_timing() -> None:
@@ -223,3 +224,45 @@ class TestWriteAudio:
     def test_file_validity(self) -> None:
         file = File(self.audio_path)
         assert isinstance(file, MP3)
+
+
+class TestWriteInBatch:
+    @pytest.fixture(autouse=True)
+    def setup(
+        self,
+        tmp_path: Path,
+        dialog_script_complete_script: DialogScript,
+        dialog_response: DialogResponse,
+    ) -> None:
+        self.write_dir = tmp_path / "output"
+        self.writer = OutputWriter(
+            write_dir=self.write_dir,
+            input_script=dialog_script_complete_script,
+            response=dialog_response,
+        )
+        self.batch = WriteBatch()
+        self.writer.write_output_script(self.batch)
+        self.writer.write_audio(self.batch)
+
+    def test_nothing_in_place_before_commit(self) -> None:
+        assert not self.writer.script_write_path.exists()
+        assert not self.writer.audio_write_path.exists()
+        assert len(list(self.write_dir.iterdir())) == 2
+
+    def test_commit(self) -> None:
+        self.batch.commit()
+        assert sorted(self.write_dir.iterdir()) == sorted(
+            [self.writer.script_write_path, self.writer.audio_write_path]
+        )
+
+    def test_abort(self) -> None:
+        self.batch.abort()
+        assert list(self.write_dir.iterdir()) == []
+
+    def test_spooled_audio_is_moved(self, tmp_path: Path) -> None:
+        spooled = tmp_path / "spooled.mp3"
+        spooled.write_bytes(self.writer.response.audio_data)
+        self.writer.response.audio_path = spooled
+        self.writer.write_audio()
+        assert not spooled.exists()
+        assert isinstance(File(self.writer.audio_write_path), MP3)
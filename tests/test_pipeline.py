@@ -0,0 +1,620 @@
+import asyncio
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from elevenlabs.core import ApiError
+
+from dialog_script import DialogScript
+from elevenlabs_client import AsyncElevenLabsClient
+from errors import ElevenLabsClientError, InvalidScriptsError
+from incremental import record_path
+from journal import JobState, Journal, journal_path
+from metrics import Metrics
+import pipeline as pipeline_module
+from pipeline import Pipeline, Rendered
+from retry import RetryPolicy
+from synthesis_cache import SynthesisCache
+from tests.helpers import VOICE_ID_1, VOICE_ID_2
+from tracing import Tracer
+from voice_catalog import VoiceCatalog
+
+
+@pytest.fixture
+def output_dir(tmp_path: Path) -> Path:
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    return output_dir
+
+
+@pytest.fixture
+def script_paths(tmp_path: Path, sample_script_file: Path) -> list[Path]:
+    """
+    Several variants of `sample_script_file` under different names, each
+    with lines of its own, so that no two of them make the same request.
+    """
+    data = json.loads(sample_script_file.read_text())
+    paths = [tmp_path / f"script_{index}.json" for index in range(6)]
+    for index, path in enumerate(paths):
+        lines = [
+            {**line, "taggedText": f"{line['taggedText']} {index}"}
+            for line in data["lines"]
+        ]
+        path.write_text(json.dumps({**data, "lines": lines}))
+    return paths
+
+
+def make_pipeline(api: MagicMock, output_dir: Path, **kwargs) -> Pipeline:
+    return Pipeline(
+        client=AsyncElevenLabsClient(api),
+        write_dir=output_dir,
+        **{"requests": 3, **kwargs},
+    )
+
+
+class TestPipelineRun:
+    def test_writes_outputs(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+    ):
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir)
+        asyncio.run(pipeline.run(script_paths))
+        for path in script_paths:
+            assert (output_dir / f"{path.stem}.mp3").exists()
+            assert (output_dir / f"{path.stem}.json").exists()
+            assert record_path(output_dir, path.stem).exists()
+
+    def test_requests_are_limited(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+    ):
+        in_flight = 0
+        most_in_flight = 0
+        result = (
+            mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps.return_value
+        )
+
+        async def convert(**kwargs):
+            nonlocal in_flight, most_in_flight
+            in_flight += 1
+            most_in_flight = max(most_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return result
+
+        api = mock_async_elevenlabs_api
+        api.text_to_dialogue.convert_with_timestamps.side_effect = convert
+        pipeline = make_pipeline(api, output_dir, requests=2)
+        asyncio.run(pipeline.run(script_paths))
+        assert most_in_flight == 2
+
+    def test_cache_hit_skips_api(
+        self,
+        tmp_path: Path,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+    ):
+        cache = SynthesisCache(tmp_path / "cache", max_bytes=1024 * 1024)
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir, cache=cache)
+        asyncio.run(pipeline.run(script_paths))
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        calls = convert.await_count
+        asyncio.run(pipeline.run(script_paths))
+        assert convert.await_count == calls
+
+
+class TestPipelineStages:
+    def test_unavailable_voice_is_reported(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+    ):
+        pipeline = make_pipeline(
+            mock_async_elevenlabs_api,
+            output_dir,
+            voice_catalog=VoiceCatalog(lambda: {VOICE_ID_1}),
+        )
+        with pytest.raises(InvalidScriptsError) as exception_info:
+            asyncio.run(pipeline.run([sample_script_file]))
+        assert VOICE_ID_2 in exception_info.value.reasons[sample_script_file]
+
+    def test_available_voices(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+    ):
+        pipeline = make_pipeline(
+            mock_async_elevenlabs_api,
+            output_dir,
+            voice_catalog=VoiceCatalog(lambda: {VOICE_ID_1, VOICE_ID_2}),
+        )
+        asyncio.run(pipeline.run([sample_script_file]))
+        assert (output_dir / f"{sample_script_file.stem}.mp3").exists()
+
+    @pytest.mark.parametrize("processes", [False, True])
+    def test_voice_catalog_is_refreshed_for_unknown_voice(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+        tmp_path: Path,
+        processes: bool,
+    ):
+        if processes:
+            monkeypatch.setattr(pipeline_module, "PROCESS_POOL_THRESHOLD", 1)
+            monkeypatch.setattr(pipeline_module.os, "process_cpu_count", lambda: 2)
+        # A catalog on disk from before the second voice was added.
+        catalog_file = tmp_path / "voices.json"
+        VoiceCatalog(MagicMock(return_value={VOICE_ID_1}), catalog_file).voices()
+        fetch = MagicMock(return_value={VOICE_ID_1, VOICE_ID_2})
+        pipeline = make_pipeline(
+            mock_async_elevenlabs_api,
+            output_dir,
+            voice_catalog=VoiceCatalog(fetch, catalog_file),
+        )
+        asyncio.run(pipeline.run(script_paths))
+        fetch.assert_called_once()
+        for path in script_paths:
+            assert (output_dir / f"{path.stem}.mp3").exists()
+
+    def test_invalid_scripts_are_reported_together(
+        self,
+        tmp_path: Path,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+        sample_script_schema_violation: Path,
+    ):
+        invalid_json = tmp_path / "invalid.json"
+        invalid_json.write_text("?")
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir)
+        invalid = [invalid_json, sample_script_schema_violation]
+        with pytest.raises(InvalidScriptsError) as exception_info:
+            asyncio.run(pipeline.run([*invalid, *script_paths]))
+        assert sorted(exception_info.value.reasons) == sorted(invalid)
+        for path in script_paths:
+            assert (output_dir / f"{path.stem}.mp3").exists()
+
+    def test_parsing_in_processes(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+        sample_script_file_invalid_json: Path,
+    ):
+        monkeypatch.setattr(pipeline_module, "PROCESS_POOL_THRESHOLD", 1)
+        monkeypatch.setattr(pipeline_module.os, "process_cpu_count", lambda: 2)
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir)
+        with pytest.raises(InvalidScriptsError) as exception_info:
+            asyncio.run(pipeline.run([*script_paths, sample_script_file_invalid_json]))
+        reason = exception_info.value.reasons[sample_script_file_invalid_json]
+        assert reason.startswith("Expecting value")
+        for path in script_paths:
+            assert (output_dir / f"{path.stem}.mp3").exists()
+
+    def test_synthesis_starts_before_parsing_ends(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+    ):
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir, requests=1)
+        events: list[str] = []
+        load_script = pipeline.load_script
+
+        def record_load(path: Path) -> DialogScript:
+            events.append("parse")
+            return load_script(path)
+
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        result = convert.return_value
+
+        async def record_convert(**kwargs):
+            events.append("request")
+            return result
+
+        pipeline.load_script = record_load
+        convert.side_effect = record_convert
+        many_paths = script_paths * 5
+        asyncio.run(pipeline.run(many_paths))
+        assert events.count("parse") == len(many_paths)
+        assert events.index("request") < len(many_paths) - 1
+
+
+    def test_outputs_are_written_in_batches(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+    ):
+        fsyncs: list[int] = []
+        monkeypatch.setattr(pipeline_module.os, "fsync", fsyncs.append)
+        pipeline = make_pipeline(
+            mock_async_elevenlabs_api, output_dir, requests=6, fsync=True
+        )
+        batches: list[int] = []
+        write = pipeline.write
+
+        def record_write(renders: list[Rendered]) -> None:
+            batches.append(len(renders))
+            write(renders)
+
+        pipeline.write = record_write
+        asyncio.run(pipeline.run(script_paths))
+        pipeline.close()
+        assert sum(batches) == len(script_paths)
+        assert len(batches) < len(script_paths)
+        assert fsyncs
+        outputs = {path.name for path in output_dir.iterdir()}
+        assert outputs == {
+            f"{path.stem}{suffix}" for path in script_paths for suffix in [".mp3", ".json"]
+        } | {".daisies"}
+
+
+class TestPipelineScheduling:
+    def test_longest_script_first(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        tmp_path: Path,
+        sample_script_file: Path,
+    ):
+        data = json.loads(sample_script_file.read_text())
+        paths = []
+        for name, repeat in [("short", 1), ("long", 3), ("medium", 2)]:
+            path = tmp_path / f"{name}.json"
+            path.write_text(json.dumps({**data, "lines": data["lines"] * repeat}))
+            paths.append(path)
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        result = convert.return_value
+        sizes = []
+
+        async def convert_script(inputs, **kwargs):
+            sizes.append(len(inputs))
+            response = MagicMock()
+            response.audio_base_64 = result.audio_base_64
+            segment = result.voice_segments[0]
+            response.voice_segments = [
+                segment.model_copy(update={"dialogue_input_index": index})
+                for index in range(len(inputs))
+            ]
+            return response
+
+        convert.side_effect = convert_script
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir, requests=1)
+        asyncio.run(pipeline.run(paths))
+        assert sizes == [6, 4, 2]
+
+
+class TestPipelineDeduplication:
+    @pytest.fixture(autouse=True)
+    def setup(
+        self,
+        tmp_path: Path,
+        mock_async_elevenlabs_api: MagicMock,
+        sample_script_file: Path,
+    ):
+        self.paths = [tmp_path / f"copy_{index}.json" for index in range(4)]
+        for path in self.paths:
+            path.write_bytes(sample_script_file.read_bytes())
+        self.convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        result = self.convert.return_value
+
+        # Slow enough that every copy is parsed while the first is in flight.
+        async def convert(**kwargs):
+            await asyncio.sleep(0.05)
+            return result
+
+        self.convert.side_effect = convert
+
+    @pytest.mark.parametrize("spooled", [False, True])
+    # With one request at a time, the copies are only synthesized once the
+    # first has been answered.
+    @pytest.mark.parametrize("requests", [1, 4])
+    def test_identical_scripts_share_one_request(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        tmp_path: Path,
+        spooled: bool,
+        requests: int,
+    ):
+        pipeline = Pipeline(
+            client=AsyncElevenLabsClient(
+                mock_async_elevenlabs_api,
+                spool_dir=tmp_path / "spool" if spooled else None,
+            ),
+            write_dir=output_dir,
+            requests=requests,
+        )
+        asyncio.run(pipeline.run(self.paths))
+        assert self.convert.await_count == 1
+        assert pipeline.deduplicated == 3
+        audio = {(output_dir / f"{path.stem}.mp3").read_bytes() for path in self.paths}
+        assert len(audio) == 1
+        if spooled:
+            assert list((tmp_path / "spool").iterdir()) == []
+
+    def test_error_is_shared(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+    ):
+        async def reject(**kwargs):
+            await asyncio.sleep(0.05)
+            raise ApiError(status_code=401)
+
+        self.convert.side_effect = reject
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir, requests=4)
+        with pytest.raises(ElevenLabsClientError):
+            asyncio.run(pipeline.run(self.paths))
+        assert self.convert.await_count == 1
+
+
+class TestPipelineRetries:
+    def test_retries_are_counted_per_script(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+    ):
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        convert.side_effect = [ApiError(status_code=503), convert.return_value]
+        pipeline = make_pipeline(
+            mock_async_elevenlabs_api,
+            output_dir,
+            retry_policy=RetryPolicy(base_delay=0.0),
+        )
+        asyncio.run(pipeline.run([sample_script_file]))
+        assert pipeline.retries == {sample_script_file.stem: 1}
+        assert (output_dir / f"{sample_script_file.stem}.mp3").exists()
+
+    def test_fatal_error_stops_run(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+    ):
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        convert.side_effect = ApiError(status_code=401)
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir)
+        with pytest.raises(ElevenLabsClientError):
+            asyncio.run(pipeline.run([sample_script_file]))
+        assert convert.await_count == 1
+
+
+class TestPipelineMetrics:
+    def test_phases_are_counted_and_timed(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+    ):
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        convert.side_effect = [ApiError(status_code=503), convert.return_value]
+        metrics = Metrics()
+        pipeline = Pipeline(
+            client=AsyncElevenLabsClient(mock_async_elevenlabs_api, metrics=metrics),
+            write_dir=output_dir,
+            requests=1,
+            retry_policy=RetryPolicy(base_delay=0.0),
+            metrics=metrics,
+        )
+        asyncio.run(pipeline.run([sample_script_file]))
+        script = DialogScript(sample_script_file)
+        characters = sum(len(line.text) for line in script.dialog_inputs)
+        audio = output_dir / f"{script.stem}.mp3"
+        outputs = [audio, output_dir / f"{script.stem}.json"]
+        outputs.append(record_path(output_dir, script.stem))
+        assert metrics.counters == {
+            "requests": 2,
+            "request_errors": 1,
+            "retries": 1,
+            "characters_sent": 2 * characters,
+            "audio_bytes_received": audio.stat().st_size,
+            "outputs_written": 1,
+            "bytes_written": sum(path.stat().st_size for path in outputs),
+        }
+        assert metrics.histograms["request_seconds"].count == 2
+        for phase in [
+            "parse_seconds",
+            "decode_seconds",
+            "render_seconds",
+            "build_seconds",
+            "validate_seconds",
+            "write_seconds",
+            "run_seconds",
+        ]:
+            assert metrics.histograms[phase].count == 1
+
+    def test_phases_are_traced(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+    ):
+        tracer = Tracer()
+        metrics = Metrics(tracer)
+        pipeline = Pipeline(
+            client=AsyncElevenLabsClient(mock_async_elevenlabs_api, metrics=metrics),
+            write_dir=output_dir,
+            requests=2,
+            metrics=metrics,
+        )
+        asyncio.run(pipeline.run(script_paths))
+        events = tracer._events
+        stems = {path.stem for path in script_paths}
+        for phase in ["parse", "render", "request", "decode", "build", "validate"]:
+            scripts = [
+                event["args"]["script"] for event in events if event["name"] == phase
+            ]
+            assert sorted(scripts) == sorted(stems)
+        written = [
+            stem
+            for event in events
+            if event["name"] == "write"
+            for stem in event["args"]["scripts"]
+        ]
+        assert sorted(written) == sorted(stems)
+        lanes = {event["args"]["name"] for event in events if event["ph"] == "M"}
+        assert {"render 0", "render 1", "writer_0"} <= lanes
+        assert any(event["name"] == "queues" for event in events)
+
+
+class TestPipelineIncremental:
+    def test_unchanged_script_is_not_synthesized(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+    ):
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir)
+        asyncio.run(pipeline.run([sample_script_file]))
+        assert convert.await_count == 1
+
+        pipeline = make_pipeline(
+            mock_async_elevenlabs_api, output_dir, incremental=True
+        )
+        asyncio.run(pipeline.run([sample_script_file]))
+        assert convert.await_count == 1
+
+    def test_edited_text_is_rewritten(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+    ):
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir)
+        asyncio.run(pipeline.run([sample_script_file]))
+
+        # Only the untagged text changes, so the audio can be kept as it is.
+        data = json.loads(sample_script_file.read_text())
+        data["lines"][0]["text"] = "Edited."
+        sample_script_file.write_text(json.dumps(data))
+        pipeline = make_pipeline(
+            mock_async_elevenlabs_api, output_dir, incremental=True
+        )
+        asyncio.run(pipeline.run([sample_script_file]))
+
+        output = json.loads((output_dir / "script.json").read_text())
+        assert output["lines"][0]["text"] == "Edited."
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        assert convert.await_count == 1
+
+
+
+class TestPipelineJournal:
+    @pytest.fixture
+    def journal(self, output_dir: Path):
+        journal = Journal(journal_path(output_dir))
+        yield journal
+        journal.close()
+
+    def test_scripts_are_written(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        script_paths: list[Path],
+        journal: Journal,
+    ):
+        journal.begin(script_paths)
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir, journal=journal)
+        asyncio.run(pipeline.run(script_paths))
+        assert journal.unfinished() == []
+
+    def test_received_audio_is_not_synthesized_again(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+        journal: Journal,
+    ):
+        journal.begin([sample_script_file])
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir, journal=journal)
+
+        def crash(renders: list[Rendered]) -> None:
+            raise OSError("disk full")
+
+        pipeline.write = crash
+        with pytest.raises(OSError):
+            asyncio.run(pipeline.run([sample_script_file]))
+        assert journal.state(sample_script_file.stem) == JobState.FAILED
+
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir, journal=journal)
+        asyncio.run(pipeline.run(journal.unfinished()))
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        assert convert.await_count == 1
+        assert journal.state(sample_script_file.stem) == JobState.WRITTEN
+
+    def test_failure_is_recorded(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+        journal: Journal,
+    ):
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        convert.side_effect = ApiError(status_code=401)
+        journal.begin([sample_script_file])
+        pipeline = make_pipeline(mock_async_elevenlabs_api, output_dir, journal=journal)
+        with pytest.raises(ElevenLabsClientError):
+            asyncio.run(pipeline.run([sample_script_file]))
+        assert journal.state(sample_script_file.stem) == JobState.FAILED
+        assert journal.unfinished() == [sample_script_file.absolute()]
+
+
+class TestPipelineChunking:
+    def test_long_script_is_synthesized_in_chunks(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        output_dir: Path,
+        sample_script_file: Path,
+    ):
+        data = json.loads(sample_script_file.read_text())
+        data["lines"] = [
+            {**line, "taggedText": f"{line['taggedText']} {index}"}
+            for index in range(3)
+            for line in data["lines"]
+        ]
+        sample_script_file.write_text(json.dumps(data))
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        result = convert.return_value
+        chunk_sizes = []
+
+        async def convert_chunk(inputs, **kwargs):
+            chunk_sizes.append(len(inputs))
+            response = MagicMock()
+            response.audio_base_64 = result.audio_base_64
+            segment = result.voice_segments[0]
+            response.voice_segments = [
+                segment.model_copy(update={"dialogue_input_index": index})
+                for index in range(len(inputs))
+            ]
+            return response
+
+        convert.side_effect = convert_chunk
+        # Room for two lines in each chunk.
+        characters = sum(len(line["taggedText"]) for line in data["lines"][:2])
+        pipeline = make_pipeline(
+            mock_async_elevenlabs_api, output_dir, max_chunk_characters=characters
+        )
+        asyncio.run(pipeline.run([sample_script_file]))
+
+        assert chunk_sizes == [2, 2, 2]
+        output = json.loads((output_dir / "script.json").read_text())
+        start_times = [line["startTime"] for line in output["lines"]]
+        assert len(start_times) == 6
+        assert start_times == sorted(start_times)
+        assert start_times[2] > start_times[0]
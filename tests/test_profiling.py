@@ -0,0 +1,51 @@
+import pstats
+import threading
+import tracemalloc
+from pathlib import Path
+
+from dialog_script import DialogScript
+from profiling import PROJECT_DIR, Profile, _project_file, profiled
+
+
+def test_project_functions_are_reported(sample_script_file: Path):
+    profile = Profile()
+    with profile.running():
+        scripts = [DialogScript(sample_script_file) for _ in range(50)]
+        inputs = [script.dialog_inputs for script in scripts]
+    assert inputs
+    report = profile.report()
+    project = report.split("Functions of the project")[1].split("Functions of")[0]
+    assert "dialog_script.py" in project
+    assert "(dialog_inputs)" in project
+    allocations = report.split("Memory held at")[1]
+    assert "dialog_script.py:" in allocations
+
+
+def test_threads_are_profiled(sample_script_file: Path):
+    profile = Profile()
+    with profile.running():
+        thread = threading.Thread(target=DialogScript, args=(sample_script_file,))
+        thread.start()
+        thread.join()
+    report = profile.report()
+    project = report.split("Functions of the project")[1].split("Functions of")[0]
+    assert "dialog_script.py" in project
+
+
+def test_code_without_a_file_is_not_the_project():
+    assert _project_file("~") is None
+    assert _project_file("<frozen abc>") is None
+    assert _project_file(str(PROJECT_DIR / "dialog_script.py")) == "dialog_script.py"
+
+
+def test_profiled_saves_files(tmp_path: Path, sample_script_file: Path):
+    with profiled(tmp_path / "profile"):
+        DialogScript(sample_script_file)
+    assert (tmp_path / "profile" / "report.txt").exists()
+    stats = pstats.Stats(str(tmp_path / "profile" / "profile.pstats"))
+    assert stats.total_calls > 0  # type: ignore[attr-defined]
+    snapshot = tracemalloc.Snapshot.load(
+        str(tmp_path / "profile" / "allocations.snapshot")
+    )
+    assert snapshot.traces
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+from rate_limit import CharacterBucket
+
+
+def test_invalid_quota():
+    with pytest.raises(ValueError):
+        CharacterBucket(per_minute=0)
+
+
+def test_default_burst():
+    bucket = CharacterBucket(per_minute=6000)
+    assert bucket.burst == 1000
+    assert bucket.tokens == 1000
+
+
+def test_within_burst_does_not_wait():
+    bucket = CharacterBucket(per_minute=6000)
+
+    async def main() -> float:
+        started = time.monotonic()
+        await bucket.acquire(400)
+        await bucket.acquire(600)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.05
+    assert bucket.tokens == pytest.approx(0, abs=5)
+
+
+def test_waits_for_refill():
+    # 60,000 characters a minute is 1,000 a second.
+    bucket = CharacterBucket(per_minute=60_000, burst=100)
+
+    async def main() -> float:
+        await bucket.acquire(100)
+        started = time.monotonic()
+        await bucket.acquire(100)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) == pytest.approx(0.1, abs=0.05)
+
+
+def test_oversized_request_goes_into_debt():
+    bucket = CharacterBucket(per_minute=60_000, burst=100)
+
+    async def main() -> None:
+        await bucket.acquire(250)
+
+    asyncio.run(main())
+    assert bucket.tokens == pytest.approx(-150, abs=5)
+
+
+def test_shared_by_concurrent_callers():
+    bucket = CharacterBucket(per_minute=60_000, burst=100)
+
+    async def main() -> float:
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire(100) for _ in range(4)))
+        return time.monotonic() - started
+
+    # The first request is covered by the full bucket, the other three wait.
+    assert asyncio.run(main()) == pytest.approx(0.3, abs=0.1)
@@ -0,0 +1,64 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from errors import ElevenLabsClientError
+from retry import RetryPolicy, call_with_retry
+
+NO_DELAY = RetryPolicy(retries=3, base_delay=0.0)
+
+
+class TestRetryPolicyDelay:
+    def test_full_jitter_within_cap(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=60.0)
+        for attempt in range(10):
+            cap = min(60.0, 2**attempt)
+            assert 0 <= policy.delay(attempt) <= cap
+
+    def test_retry_after_is_honored(self):
+        policy = RetryPolicy(max_delay=60.0)
+        assert policy.delay(0, retry_after=30.0) == 30.0
+
+    def test_retry_after_is_capped(self):
+        policy = RetryPolicy(max_delay=60.0)
+        assert policy.delay(0, retry_after=4 * 60 * 60) == 60.0
+
+
+class TestCallWithRetry:
+    def test_success_without_retry(self):
+        call = AsyncMock(return_value="ok")
+        assert asyncio.run(call_with_retry(call, NO_DELAY)) == "ok"
+        assert call.await_count == 1
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            ElevenLabsClientError("throttled", status_code=429),
+            ElevenLabsClientError("unavailable", status_code=503),
+            ElevenLabsClientError("timeout", status_code=408),
+            ElevenLabsClientError("connection", transient=True),
+        ],
+    )
+    def test_retryable_errors(self, error: ElevenLabsClientError):
+        call = AsyncMock(side_effect=[error, "ok"])
+        retried: list[ElevenLabsClientError] = []
+        result = asyncio.run(call_with_retry(call, NO_DELAY, retried.append))
+        assert result == "ok"
+        assert retried == [error]
+
+    @pytest.mark.parametrize("status_code", [400, 401, 422, None])
+    def test_fatal_errors(self, status_code: int | None):
+        error = ElevenLabsClientError("fatal", status_code=status_code)
+        call = AsyncMock(side_effect=[error, "ok"])
+        with pytest.raises(ElevenLabsClientError) as exception_info:
+            asyncio.run(call_with_retry(call, NO_DELAY))
+        assert call.await_count == 1
+        assert exception_info.value.msg == "fatal"
+
+    def test_gives_up(self):
+        call = AsyncMock(side_effect=ElevenLabsClientError("busy", status_code=429))
+        with pytest.raises(ElevenLabsClientError) as exception_info:
+            asyncio.run(call_with_retry(call, NO_DELAY))
+        assert call.await_count == 4
+        assert exception_info.value.msg == "busy (after 4 attempts)"
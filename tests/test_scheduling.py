@@ -0,0 +1,87 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import scheduling
+from chunking import chunk_ranges
+from dialog_script import DialogScript
+from scheduling import (
+    LongestFirstQueue,
+    chunk_costs,
+    format_duration,
+    longest_first,
+    makespan,
+)
+
+
+@pytest.fixture
+def script(sample_script_file: Path) -> DialogScript:
+    return DialogScript(sample_script_file)
+
+
+def test_chunk_costs(script: DialogScript):
+    characters = sum(len(line.text) for line in script.dialog_inputs)
+    [cost] = chunk_costs(script)
+    assert cost == pytest.approx(
+        scheduling.REQUEST_SECONDS
+        + scheduling.CHARACTER_SECONDS * characters
+        + scheduling.LINE_SECONDS * 2
+    )
+
+
+def test_chunk_costs_of_long_script(script: DialogScript):
+    costs = chunk_costs(script, max_characters=1)
+    assert len(costs) == 2
+    assert sum(costs) > sum(chunk_costs(script))
+
+
+def test_chunk_costs_match_chunks(script: DialogScript):
+    # The costs are worked out from the lines, but split like the inputs.
+    for max_characters in (1, 60, 2000):
+        ranges = chunk_ranges(script.dialog_inputs, max_characters=max_characters)
+        assert len(chunk_costs(script, max_characters=max_characters)) == len(ranges)
+
+
+def test_longest_first(tmp_path: Path):
+    paths = []
+    for name, size in [("short", 10), ("long", 1000), ("medium", 100)]:
+        path = tmp_path / f"{name}.json"
+        path.write_text("x" * size)
+        paths.append(path)
+    missing = tmp_path / "missing.json"
+    ordered = longest_first([missing, *paths])
+    assert [path.stem for path in ordered] == ["long", "medium", "short", "missing"]
+
+
+def test_makespan_runs_longest_first():
+    # In the given order on two slots, the job of 5 would start last, at 3.
+    jobs = [[2.0], [2.0], [1.0], [5.0]]
+    assert makespan(jobs, 2) == 5.0
+
+
+def test_makespan_spreads_chunks():
+    assert makespan([[3.0, 3.0]], 2) == 3.0
+    assert makespan([[3.0, 3.0]], 1) == 6.0
+
+
+def test_makespan_of_nothing():
+    assert makespan([], 3) == 0.0
+
+
+def test_longest_first_queue():
+    async def drain() -> list[str | None]:
+        queue: LongestFirstQueue[str] = LongestFirstQueue(0, len)
+        for item in ["bb", None, "a", "ccc", "dd"]:
+            queue.put_nowait(item)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    assert asyncio.run(drain()) == ["ccc", "bb", "dd", "a", None]
+
+
+@pytest.mark.parametrize(
+    "seconds, text",
+    [(0.4, "0s"), (59, "59s"), (61, "1m 01s"), (3725, "1h 02m 05s")],
+)
+def test_format_duration(seconds: float, text: str):
+    assert format_duration(seconds) == text
@@ -0,0 +1,281 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from elevenlabs.core import ApiError
+
+import server
+from elevenlabs_client import AsyncElevenLabsClient
+from errors import ElevenLabsClientError
+from pipeline import Pipeline
+from retry import RetryPolicy
+from server import DialogServer
+from tests.helpers import VOICE_ID_1, VOICE_ID_2
+from voice_catalog import VoiceCatalog
+
+
+def with_server(
+    api: MagicMock,
+    tmp_path: Path,
+    test: Callable[[httpx.AsyncClient], Awaitable[None]],
+) -> None:
+    """
+    Run `test` with a client of a server that listens on a free port.
+    """
+
+    async def run() -> None:
+        pipeline = Pipeline(
+            client=AsyncElevenLabsClient(api),
+            write_dir=tmp_path / "jobs" / "output",
+            requests=2,
+            retry_policy=RetryPolicy(retries=0),
+            voice_catalog=VoiceCatalog(lambda: {VOICE_ID_1, VOICE_ID_2}),
+        )
+        server = DialogServer(pipeline, tmp_path / "jobs")
+        started = asyncio.Event()
+        serving = asyncio.create_task(server.serve("127.0.0.1", 0, started))
+        await started.wait()
+        base_url = f"http://127.0.0.1:{server.port}"
+        try:
+            async with httpx.AsyncClient(base_url=base_url) as client:
+                await test(client)
+        finally:
+            serving.cancel()
+
+    asyncio.run(run())
+
+
+class TestDialogServer:
+    def test_job_is_queued_and_finished(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+    ):
+        async def test(client: httpx.AsyncClient) -> None:
+            response = await client.post(
+                "/jobs", content=sample_script_file.read_bytes()
+            )
+            assert response.status_code == 202
+            job = response.json()
+            assert job["status"] in ("queued", "running")
+            for _ in range(100):
+                job = (await client.get(f"/jobs/{job['id']}")).json()
+                if job["status"] == "done":
+                    break
+                await asyncio.sleep(0.01)
+            assert job["status"] == "done"
+            audio = await client.get(f"/jobs/{job['id']}/audio")
+            assert audio.headers["content-type"] == "audio/mpeg"
+            assert audio.content
+            script = await client.get(f"/jobs/{job['id']}/script")
+            assert len(script.json()["lines"]) == 2
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_wait_for_job(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+    ):
+        async def test(client: httpx.AsyncClient) -> None:
+            response = await client.post(
+                "/jobs?wait=true", content=sample_script_file.read_bytes()
+            )
+            assert response.status_code == 200
+            assert response.json()["status"] == "done"
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_jobs_share_one_client(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+    ):
+        data = json.loads(sample_script_file.read_text())
+
+        def variant(index: int) -> bytes:
+            # Scripts with different lines, which make different requests.
+            lines = [
+                {**line, "taggedText": f"{line['taggedText']} {index}"}
+                for line in data["lines"]
+            ]
+            return json.dumps({**data, "lines": lines}).encode("utf-8")
+
+        async def test(client: httpx.AsyncClient) -> None:
+            responses = await asyncio.gather(
+                *(
+                    client.post("/jobs?wait=true", content=variant(index))
+                    for index in range(5)
+                )
+            )
+            assert {response.json()["status"] for response in responses} == {"done"}
+            assert len({response.json()["id"] for response in responses}) == 5
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        assert convert.await_count == 5
+
+    def test_invalid_json(self, mock_async_elevenlabs_api: MagicMock, tmp_path: Path):
+        async def test(client: httpx.AsyncClient) -> None:
+            response = await client.post("/jobs", content=b"{")
+            assert response.status_code == 400
+            assert response.json()["error"].startswith("Invalid JSON")
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_invalid_script(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+    ):
+        async def test(client: httpx.AsyncClient) -> None:
+            response = await client.post("/jobs", content=json.dumps({"lines": []}))
+            assert response.status_code == 400
+            assert response.json()["error"].startswith("Invalid script")
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_unavailable_voice(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+    ):
+        data = json.loads(sample_script_file.read_text())
+        data["lines"][0]["voiceId"] = "unknown"
+
+        async def test(client: httpx.AsyncClient) -> None:
+            response = await client.post("/jobs", content=json.dumps(data))
+            assert response.status_code == 400
+            assert "unknown" in response.json()["error"]
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_failed_job(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+    ):
+        convert = mock_async_elevenlabs_api.text_to_dialogue.convert_with_timestamps
+        convert.side_effect = ApiError(status_code=401, body="Unauthorized")
+
+        async def test(client: httpx.AsyncClient) -> None:
+            response = await client.post(
+                "/jobs?wait=true", content=sample_script_file.read_bytes()
+            )
+            job = response.json()
+            assert job["status"] == "failed"
+            assert "401" in job["error"]
+            audio = await client.get(f"/jobs/{job['id']}/audio")
+            assert audio.status_code == 409
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_voices_cannot_be_listed(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        def check_voices(self, script) -> None:
+            raise ElevenLabsClientError("Unauthorized", status_code=401)
+
+        monkeypatch.setattr(Pipeline, "check_voices", check_voices)
+
+        async def test(client: httpx.AsyncClient) -> None:
+            response = await client.post(
+                "/jobs", content=sample_script_file.read_bytes()
+            )
+            assert response.status_code == 502
+            assert response.json()["error"] == "Unauthorized"
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_unexpected_error(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        def check_voices(self, script) -> None:
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(Pipeline, "check_voices", check_voices)
+
+        async def test(client: httpx.AsyncClient) -> None:
+            response = await client.post(
+                "/jobs", content=sample_script_file.read_bytes()
+            )
+            assert response.status_code == 500
+            assert "boom" in response.json()["error"]
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_queue_filled_while_loading(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(server, "MAX_QUEUED_JOBS", 1)
+        body = sample_script_file.read_bytes()
+
+        async def run() -> list[int]:
+            pipeline = Pipeline(
+                client=AsyncElevenLabsClient(mock_async_elevenlabs_api),
+                write_dir=tmp_path / "jobs" / "output",
+                requests=1,
+            )
+            # No workers take jobs off the queue, and both submissions find
+            # it empty before their scripts are loaded.
+            dialog_server = DialogServer(pipeline, tmp_path / "jobs")
+            responses = await asyncio.gather(
+                dialog_server.submit(body), dialog_server.submit(body)
+            )
+            return sorted(response.status for response in responses)
+
+        assert asyncio.run(run()) == [202, 503]
+        assert len(list((tmp_path / "jobs").glob("*.json"))) == 1
+
+    def test_oldest_finished_job_is_forgotten(
+        self,
+        mock_async_elevenlabs_api: MagicMock,
+        tmp_path: Path,
+        sample_script_file: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(server, "MAX_FINISHED_JOBS", 1)
+        write_dir = tmp_path / "jobs" / "output"
+
+        async def test(client: httpx.AsyncClient) -> None:
+            jobs = []
+            for _ in range(2):
+                response = await client.post(
+                    "/jobs?wait=true", content=sample_script_file.read_bytes()
+                )
+                jobs.append(response.json()["id"])
+            assert (await client.get(f"/jobs/{jobs[0]}")).status_code == 404
+            assert not (write_dir / f"{jobs[0]}.mp3").exists()
+            assert not (tmp_path / "jobs" / f"{jobs[0]}.json").exists()
+            assert (await client.get(f"/jobs/{jobs[1]}/audio")).status_code == 200
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
+
+    def test_unknown_job(self, mock_async_elevenlabs_api: MagicMock, tmp_path: Path):
+        async def test(client: httpx.AsyncClient) -> None:
+            assert (await client.get("/jobs/nope")).status_code == 404
+            assert (await client.get("/elsewhere")).status_code == 404
+            assert (await client.get("/jobs")).status_code == 405
+
+        with_server(mock_async_elevenlabs_api, tmp_path, test)
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that take long to import, and that are only needed once there is
+# something to build.
+DEFERRED = ["elevenlabs", "pydantic", "httpx", "jsonschema", "tqdm", "dotenv"]
+
+# The most time, in microseconds, that importing `main` may take. It took
+# over 700 ms when the SDK was imported up front, and about a fifth of that
+# since.
+IMPORT_BUDGET = 300_000
+
+
+def import_times(*args: str) -> dict[str, int]:
+    """
+    The cumulative import time, in microseconds, of every module imported by
+    Python run with `args`, as reported by `-X importtime`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["-c", "import main"], ["main.py", "--help"], ["main.py", "missing"]],
+    ids=["import", "help", "argument error"],
+)
+def test_heavy_modules_are_deferred(args: list[str]):
+    imported = import_times(*args)
+    assert imported
+    for module in DEFERRED:
+        loaded = [
+            name
+            for name in imported
+            if name == module or name.startswith(f"{module}.")
+        ]
+        assert not loaded, f"{module} is imported on startup"
+
+
+def test_import_is_within_budget():
+    # The best of a few runs, since a busy machine slows any one of them.
+    best = min(import_times("-c", "import main")["main"] for _ in range(3))
+    assert best < IMPORT_BUDGET
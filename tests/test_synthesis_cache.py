@@ -0,0 +1,112 @@
+import json
+import os
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from elevenlabs import DialogueInput
+
+from elevenlabs_client import DialogResponse, RequestSettings
+from synthesis_cache import SynthesisCache, synthesis_key
+from tests.helpers import TEXT_1, VOICE_ID_1, mp3_bytes
+
+
+class TestSynthesisKey:
+    def test_same_inputs_same_key(self, dialog_input_list: list[DialogueInput]):
+        settings = RequestSettings()
+        assert synthesis_key(dialog_input_list, settings) == synthesis_key(
+            list(dialog_input_list), settings
+        )
+
+    def test_text_changes_key(self, dialog_input_list: list[DialogueInput]):
+        settings = RequestSettings()
+        edited = [DialogueInput(text=TEXT_1, voice_id=VOICE_ID_1)]
+        assert synthesis_key(dialog_input_list, settings) != synthesis_key(
+            edited, settings
+        )
+
+    def test_settings_change_key(self, dialog_input_list: list[DialogueInput]):
+        settings = RequestSettings()
+        other = replace(settings, stability=0.9)
+        assert synthesis_key(dialog_input_list, settings) != synthesis_key(
+            dialog_input_list, other
+        )
+
+
+class TestSynthesisCache:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path: Path) -> None:
+        self.directory = tmp_path / "cache"
+        self.cache = SynthesisCache(self.directory, max_bytes=1024 * 1024)
+
+    def test_miss(self):
+        assert self.cache.get("missing") is None
+
+    def test_round_trip(self, dialog_response: DialogResponse):
+        self.cache.put("key", dialog_response)
+        cached = self.cache.get("key")
+        assert cached is not None
+        assert cached.audio_data == mp3_bytes
+        assert cached.segments == dialog_response.segments
+
+    def test_spooled(self, dialog_response: DialogResponse, tmp_path: Path):
+        self.cache.put("key", dialog_response)
+        cached = self.cache.get("key", spool_dir=tmp_path / "spool")
+        assert cached is not None
+        assert cached.audio_data == b""
+        assert cached.audio_path.parent == tmp_path / "spool"
+        assert cached.read_audio() == mp3_bytes
+        # The copy is the response's own, and may be moved into place.
+        cached.discard_audio()
+        assert self.cache.get("key") is not None
+
+    def test_incomplete_entry_is_a_miss(self, dialog_response: DialogResponse):
+        self.cache.put("key", dialog_response)
+        (self.directory / "key.json").unlink()
+        assert self.cache.get("key") is None
+
+    def test_prune_evicts_least_recently_used(
+        self,
+        dialog_response: DialogResponse,
+    ):
+        for age, key in enumerate(["newest", "middle", "oldest"]):
+            self.cache.put(key, dialog_response)
+            for suffix in ("mp3", "json"):
+                path = self.directory / f"{key}.{suffix}"
+                os.utime(path, (1000 - age, 1000 - age))
+        entry_size = len(mp3_bytes) + (self.directory / "newest.json").stat().st_size
+
+        evicted = self.cache.prune(max_bytes=2 * entry_size)
+        assert evicted == 1
+        assert self.cache.get("oldest") is None
+        assert self.cache.get("middle") is not None
+        assert self.cache.get("newest") is not None
+
+    def test_prune_to_zero_empties_cache(self, dialog_response: DialogResponse):
+        self.cache.put("key", dialog_response)
+        self.cache.prune(max_bytes=0)
+        assert list(self.directory.iterdir()) == []
+
+    def test_put_only_lists_the_directory_when_full(
+        self, dialog_response: DialogResponse
+    ):
+        entry_size = len(mp3_bytes) + len(
+            json.dumps([s.model_dump() for s in dialog_response.segments])
+        )
+        cache = SynthesisCache(self.directory, max_bytes=2 * entry_size)
+        with patch.object(cache, "prune", wraps=cache.prune) as prune:
+            cache.put("a", dialog_response)
+            cache.put("b", dialog_response)
+            # Storing an entry again replaces its size rather than adding it.
+            cache.put("b", dialog_response)
+            assert prune.call_count == 1
+            cache.put("c", dialog_response)
+            assert prune.call_count == 2
+        assert cache.get("a") is None
+        assert cache.get("c") is not None
+
+    def test_put_respects_limit(self, dialog_response: DialogResponse):
+        cache = SynthesisCache(self.directory, max_bytes=len(mp3_bytes))
+        cache.put("key", dialog_response)
+        assert cache.get("key") is None
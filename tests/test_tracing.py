@@ -0,0 +1,76 @@
+import asyncio
+import json
+from pathlib import Path
+
+from tracing import Tracer, working_on
+
+
+def spans(tracer: Tracer, name: str) -> list[dict]:
+    return [event for event in tracer._events if event["name"] == name]
+
+
+def lane_names(tracer: Tracer) -> dict[int, str]:
+    return {
+        event["tid"]: event["args"]["name"]
+        for event in tracer._events
+        if event["ph"] == "M"
+    }
+
+
+def test_tasks_get_lanes_of_their_own():
+    tracer = Tracer()
+
+    async def work() -> None:
+        with tracer.span("request"):
+            await asyncio.sleep(0.01)
+
+    async def run() -> None:
+        await asyncio.gather(
+            asyncio.create_task(work(), name="render 0"),
+            asyncio.create_task(work(), name="render 1"),
+        )
+
+    asyncio.run(run())
+    lanes = [span["tid"] for span in spans(tracer, "request")]
+    assert len(set(lanes)) == 2
+    assert sorted(lane_names(tracer)[lane] for lane in lanes) == [
+        "render 0",
+        "render 1",
+    ]
+
+
+def test_spans_are_labelled_with_the_script():
+    tracer = Tracer()
+
+    def decode() -> None:
+        with tracer.span("decode"):
+            pass
+
+    async def render() -> None:
+        with working_on("dialog"), tracer.span("render", chunks=1):
+            await asyncio.to_thread(decode)
+        with tracer.span("write"):
+            pass
+
+    asyncio.run(render())
+    [render_span] = spans(tracer, "render")
+    [decode_span] = spans(tracer, "decode")
+    [write_span] = spans(tracer, "write")
+    assert render_span["args"] == {"script": "dialog", "chunks": 1}
+    assert decode_span["args"] == {"script": "dialog"}
+    assert write_span["args"] == {}
+    # The thread that decoded is a lane of its own.
+    assert decode_span["tid"] != render_span["tid"]
+    assert decode_span["ts"] >= render_span["ts"]
+    assert decode_span["dur"] <= render_span["dur"]
+
+
+def test_write(tmp_path: Path):
+    tracer = Tracer()
+    with tracer.span("parse"):
+        pass
+    tracer.counter("queues", scripts=2)
+    tracer.write(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    phases = [event["ph"] for event in trace["traceEvents"]]
+    assert phases == ["M", "X", "C"]
@@ -0,0 +1,96 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+from jsonschema import ValidationError, validate
+
+from json_schema import INPUT, OUTPUT
+from validation import SchemaValidator, compile_checker, validate_input
+
+
+def invalid_variants(script: dict) -> list[dict]:
+    """
+    Copies of a valid input script with one thing wrong in each.
+    """
+    variants = []
+
+    def variant(change) -> None:
+        copied = copy.deepcopy(script)
+        change(copied)
+        variants.append(copied)
+
+    variant(lambda s: s.pop("locale"))
+    variant(lambda s: s.pop("lines"))
+    variant(lambda s: s.update(extra=1))
+    variant(lambda s: s["locale"].pop("languageCode"))
+    variant(lambda s: s["locale"].update(languageCode=1))
+    variant(lambda s: s["locale"].update(region="US"))
+    variant(lambda s: s.update(lines=[]))
+    variant(lambda s: s.update(lines={}))
+    variant(lambda s: s["lines"][0].pop("voiceId"))
+    variant(lambda s: s["lines"][1].update(text=None))
+    variant(lambda s: s["lines"][1].update(speaker=True))
+    variant(lambda s: s["lines"][0].update(emotion="sad"))
+    variant(lambda s: s["lines"].append("line"))
+    return variants
+
+
+@pytest.fixture
+def script(sample_script_file: Path) -> dict:
+    return json.loads(sample_script_file.read_text())
+
+
+class TestValidateInput:
+    def test_valid(self, script: dict):
+        validate_input(script)
+
+    def test_null_speaker_is_valid(self, script: dict):
+        script["lines"][0]["speaker"] = None
+        validate_input(script)
+
+    def test_same_errors_as_jsonschema(self, script: dict):
+        for variant in invalid_variants(script):
+            with pytest.raises(ValidationError) as expected:
+                validate(variant, schema=INPUT)
+            with pytest.raises(ValidationError) as actual:
+                validate_input(variant)
+            assert actual.value.message == expected.value.message
+            assert actual.value.json_path == expected.value.json_path
+
+    def test_not_an_object(self):
+        with pytest.raises(ValidationError):
+            validate_input([])
+
+
+class TestCompileChecker:
+    def test_agrees_with_jsonschema(self, script: dict):
+        validator = SchemaValidator(INPUT).validator
+        check = compile_checker(INPUT)
+        for variant in [script, *invalid_variants(script)]:
+            assert check(variant) == validator.is_valid(variant)
+
+    @pytest.mark.parametrize("value", [1, 1.0, -3])
+    def test_integer(self, value):
+        assert compile_checker({"type": "integer"})(value)
+
+    @pytest.mark.parametrize("value", [True, 1.5, "1", None])
+    def test_not_integer(self, value):
+        assert not compile_checker({"type": "integer"})(value)
+
+    def test_output_schema_compiles(self):
+        script = {
+            "locale": {"languageCode": "en"},
+            "lines": [{"speaker": None, "text": "Hi"}],
+        }
+        assert compile_checker(OUTPUT)(script)
+
+    def test_unsupported_keyword(self):
+        with pytest.raises(ValueError):
+            compile_checker({"type": "string", "pattern": "^a"})
+
+    def test_unsupported_keyword_falls_back_to_jsonschema(self):
+        validator = SchemaValidator({"type": "string", "pattern": "^a"})
+        validator.validate("abc")
+        with pytest.raises(ValidationError):
+            validator.validate("xyz")
@@ -0,0 +1,79 @@
+import json
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+import voice_catalog
+from tests.helpers import VOICE_ID_1, VOICE_ID_2, VOICE_ID_3
+from voice_catalog import VoiceCatalog, catalog_path
+
+
+@pytest.fixture
+def fetch() -> MagicMock:
+    return MagicMock(return_value={VOICE_ID_1, VOICE_ID_2})
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    return catalog_path(tmp_path, "https://api.example.com", "secret")
+
+
+def test_catalog_path_hides_api_key(tmp_path: Path, path: Path):
+    assert "secret" not in str(path)
+    assert path != catalog_path(tmp_path, "https://api.example.com", "other")
+
+
+def test_voices_are_listed_lazily(fetch: MagicMock, path: Path):
+    catalog = VoiceCatalog(fetch, path)
+    fetch.assert_not_called()
+    assert catalog.voices() == {VOICE_ID_1, VOICE_ID_2}
+    assert catalog.voices() == {VOICE_ID_1, VOICE_ID_2}
+    fetch.assert_called_once()
+
+
+def test_catalog_is_kept_on_disk(fetch: MagicMock, path: Path):
+    VoiceCatalog(fetch, path).voices()
+    assert VoiceCatalog(fetch, path).voices() == {VOICE_ID_1, VOICE_ID_2}
+    fetch.assert_called_once()
+
+
+def test_stale_catalog_is_listed_again(fetch: MagicMock, path: Path):
+    VoiceCatalog(fetch, path).voices()
+    data = json.loads(path.read_text())
+    data["fetched_at"] = time.time() - 2 * voice_catalog.CATALOG_TTL
+    path.write_text(json.dumps(data))
+    VoiceCatalog(fetch, path).voices()
+    assert fetch.call_count == 2
+
+
+def test_corrupt_catalog_is_listed_again(fetch: MagicMock, path: Path):
+    path.parent.mkdir(parents=True)
+    path.write_text("{")
+    assert VoiceCatalog(fetch, path).voices() == {VOICE_ID_1, VOICE_ID_2}
+    fetch.assert_called_once()
+
+
+def test_known_voices_are_not_listed_again(fetch: MagicMock, path: Path):
+    VoiceCatalog(fetch, path).voices()
+    catalog = VoiceCatalog(fetch, path)
+    assert catalog.unavailable([VOICE_ID_1, VOICE_ID_2]) == set()
+    fetch.assert_called_once()
+
+
+def test_unknown_voice_lists_voices_again(fetch: MagicMock, path: Path):
+    VoiceCatalog(fetch, path).voices()
+    fetch.return_value = {VOICE_ID_1, VOICE_ID_2, VOICE_ID_3}
+    catalog = VoiceCatalog(fetch, path)
+    assert catalog.unavailable([VOICE_ID_3]) == set()
+    assert fetch.call_count == 2
+    # The new voice is kept for the next run.
+    assert VOICE_ID_3 in VoiceCatalog(fetch, path).voices()
+
+
+def test_unavailable_voice_is_listed_at_most_once(fetch: MagicMock):
+    catalog = VoiceCatalog(fetch)
+    assert catalog.unavailable([VOICE_ID_3]) == {VOICE_ID_3}
+    assert catalog.unavailable([VOICE_ID_1, VOICE_ID_3]) == {VOICE_ID_3}
+    fetch.assert_called_once()
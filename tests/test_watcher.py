@@ -0,0 +1,104 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from watcher import inotify_available, watch
+
+
+async def next_batch(
+    directory: Path,
+    edit,
+    use_inotify: bool,
+    debounce: float = 0.2,
+) -> list[Path]:
+    """
+    Start watching `directory`, make the changes of `edit`, and return the
+    first batch that is reported.
+    """
+    batches = watch(
+        directory,
+        debounce=debounce,
+        poll_interval=0.05,
+        use_inotify=use_inotify,
+    )
+    first = asyncio.ensure_future(anext(batches))
+    # Let the watcher take its first look at the directory.
+    await asyncio.sleep(0.1)
+    await edit()
+    try:
+        return await asyncio.wait_for(first, 5)
+    finally:
+        await batches.aclose()
+
+
+watchers = pytest.mark.parametrize(
+    "use_inotify",
+    [
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(
+                not inotify_available(), reason="inotify is not available"
+            ),
+        ),
+        False,
+    ],
+    ids=["inotify", "polling"],
+)
+
+
+@watchers
+class TestWatch:
+    def test_created_script(self, tmp_path: Path, use_inotify: bool):
+        script = tmp_path / "new.json"
+
+        async def edit():
+            script.write_text("{}")
+
+        batch = asyncio.run(next_batch(tmp_path, edit, use_inotify))
+        assert batch == [script]
+
+    def test_modified_script(self, tmp_path: Path, use_inotify: bool):
+        script = tmp_path / "script.json"
+        script.write_text("{}")
+
+        async def edit():
+            script.write_text('{"lines": []}')
+
+        batch = asyncio.run(next_batch(tmp_path, edit, use_inotify))
+        assert batch == [script]
+
+    def test_renamed_into_place(self, tmp_path: Path, use_inotify: bool):
+        script = tmp_path / "script.json"
+        temp = tmp_path / ".script.json.swp"
+
+        async def edit():
+            temp.write_text("{}")
+            temp.rename(script)
+
+        batch = asyncio.run(next_batch(tmp_path, edit, use_inotify))
+        assert batch == [script]
+
+    def test_other_files_are_ignored(self, tmp_path: Path, use_inotify: bool):
+        script = tmp_path / "script.json"
+
+        async def edit():
+            (tmp_path / "notes.txt").write_text("notes")
+            await asyncio.sleep(0.1)
+            script.write_text("{}")
+
+        batch = asyncio.run(next_batch(tmp_path, edit, use_inotify))
+        assert batch == [script]
+
+    def test_repeated_writes_are_debounced(self, tmp_path: Path, use_inotify: bool):
+        first = tmp_path / "first.json"
+        second = tmp_path / "second.json"
+
+        async def edit():
+            for text in ("{", "{}", '{"lines": []}'):
+                first.write_text(text)
+                await asyncio.sleep(0.08)
+            second.write_text("{}")
+
+        batch = asyncio.run(next_batch(tmp_path, edit, use_inotify, debounce=0.3))
+        assert batch == [first, second]
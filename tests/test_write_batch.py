@@ -0,0 +1,108 @@
+import hashlib
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from write_batch import FILE_MODE, WriteBatch, batch_or_single
+
+
+@pytest.fixture
+def fsyncs(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    calls: list[int] = []
+    monkeypatch.setattr(os, "fsync", calls.append)
+    return calls
+
+
+def test_files_appear_on_commit(tmp_path: Path):
+    batch = WriteBatch()
+    batch.write_text(tmp_path / "a.json", "{}")
+    batch.write_bytes(tmp_path / "b.mp3", b"audio")
+    assert not (tmp_path / "a.json").exists()
+    batch.commit()
+    assert (tmp_path / "a.json").read_text() == "{}"
+    assert (tmp_path / "b.mp3").read_bytes() == b"audio"
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_files_get_the_usual_mode(tmp_path: Path):
+    batch = WriteBatch()
+    batch.write_text(tmp_path / "a.json", "{}")
+    batch.commit()
+    mode = stat.S_IMODE((tmp_path / "a.json").stat().st_mode)
+    (tmp_path / "opened.json").write_text("{}")
+    assert mode == stat.S_IMODE((tmp_path / "opened.json").stat().st_mode)
+    assert mode == FILE_MODE
+
+
+def test_commit_replaces_existing_file(tmp_path: Path):
+    path = tmp_path / "a.json"
+    path.write_text("old")
+    batch = WriteBatch()
+    batch.write_text(path, "new")
+    assert path.read_text() == "old"
+    batch.commit()
+    assert path.read_text() == "new"
+
+
+def test_abort_keeps_moved_files(tmp_path: Path):
+    source = tmp_path / "spooled.mp3"
+    source.write_bytes(b"audio")
+    batch = WriteBatch()
+    batch.write_text(tmp_path / "a.json", "{}")
+    batch.move(source, tmp_path / "a.mp3")
+    batch.abort()
+    assert list(tmp_path.iterdir()) == [source]
+
+
+def test_hashes_of_files(tmp_path: Path):
+    for name in ("hashed.mp3", "unhashed.mp3"):
+        (tmp_path / name).write_bytes(b"audio")
+    batch = WriteBatch()
+    batch.write_text(tmp_path / "a.json", "{}")
+    batch.move(tmp_path / "hashed.mp3", tmp_path / "a.mp3", "known")
+    batch.move(tmp_path / "unhashed.mp3", tmp_path / "b.mp3")
+    assert batch.hashes == {
+        tmp_path / "a.json": hashlib.sha256(b"{}").hexdigest(),
+        tmp_path / "a.mp3": "known",
+    }
+
+
+def test_no_fsync_by_default(tmp_path: Path, fsyncs: list[int]):
+    batch = WriteBatch()
+    batch.write_text(tmp_path / "a.json", "{}")
+    batch.commit()
+    assert fsyncs == []
+
+
+def test_fsync_once_per_directory(tmp_path: Path, fsyncs: list[int]):
+    batch = WriteBatch(fsync=True)
+    for name in ["a", "b", "c"]:
+        batch.write_text(tmp_path / f"{name}.json", "{}")
+    batch.commit()
+    # Every file, then the directory once.
+    directories = 1 if hasattr(os, "O_DIRECTORY") else 0
+    assert len(fsyncs) == 3 + directories
+
+
+def test_single_batch_is_committed(tmp_path: Path):
+    with batch_or_single(None) as batch:
+        batch.write_text(tmp_path / "a.json", "{}")
+    assert (tmp_path / "a.json").exists()
+
+
+def test_single_batch_is_aborted_on_error(tmp_path: Path):
+    with pytest.raises(RuntimeError):
+        with batch_or_single(None) as batch:
+            batch.write_text(tmp_path / "a.json", "{}")
+            raise RuntimeError()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_given_batch_is_left_open(tmp_path: Path):
+    batch = WriteBatch()
+    with batch_or_single(batch) as same:
+        same.write_text(tmp_path / "a.json", "{}")
+    assert same is batch
+    assert not (tmp_path / "a.json").exists()
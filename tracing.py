@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from write_batch import batch_or_single
+
+# The script that the current task or thread works on, which spans are
+# labelled with. It is set by the task that handles a script, and inherited
+# by the tasks and threads that it hands work to.
+current_script: ContextVar[str | None] = ContextVar("current_script", default=None)
+
+
+class Tracer:
+    """
+    A timeline of the spans of a run, each on the lane of the asyncio task or
+    thread it ran on, written in the Chrome trace-event format that Perfetto
+    and chrome://tracing open. Tasks get lanes of their own, since the spans
+    of the tasks of a thread interleave rather than nest.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: list[dict] = []
+        self._lanes: dict[object, int] = {}
+        self._started = time.perf_counter()
+        self.pid = os.getpid()
+
+    def _now(self) -> float:
+        """
+        The time since the tracer was created, in microseconds.
+        """
+        return (time.perf_counter() - self._started) * 1_000_000
+
+    def _lane(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            key: object = task
+            name = task.get_name()
+        else:
+            key = threading.get_ident()
+            name = threading.current_thread().name
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = len(self._lanes) + 1
+                self._events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": self.pid,
+                        "tid": lane,
+                        "args": {"name": name},
+                    }
+                )
+            return lane
+
+    @contextmanager
+    def span(self, name: str, **args: object) -> Iterator[None]:
+        """
+        Record the enclosed block as a span, labelled with the current
+        script, if any, and `args`.
+        """
+        lane = self._lane()
+        script = current_script.get()
+        if script is not None:
+            args = {"script": script, **args}
+        started = self._now()
+        try:
+            yield
+        finally:
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": started,
+                "dur": self._now() - started,
+                "pid": self.pid,
+                "tid": lane,
+                "args": args,
+            }
+            with self._lock:
+                self._events.append(event)
+
+    def counter(self, name: str, **values: float) -> None:
+        """
+        Record the current values of a counter track, such as the lengths of
+        queues.
+        """
+        event = {
+            "name": name,
+            "ph": "C",
+            "ts": self._now(),
+            "pid": self.pid,
+            "args": values,
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def write(self, path: Path) -> None:
+        with self._lock:
+            trace = {"traceEvents": list(self._events), "displayTimeUnit": "ms"}
+        with batch_or_single(None) as batch:
+            batch.write_text(path, json.dumps(trace))
+
+
+@contextmanager
+def working_on(script: str) -> Iterator[None]:
+    """
+    Label the spans of the enclosed block, and of the tasks and threads that
+    it starts, with `script`.
+    """
+    token = current_script.set(script)
+    try:
+        yield
+    finally:
+        current_script.reset(token)
@@ -0,0 +1,173 @@
+from collections.abc import Callable
+from functools import cache
+
+from jsonschema import ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from json_schema import INPUT, OUTPUT
+
+Checker = Callable[[object], bool]
+
+_TYPES: dict[str, Checker] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "null": lambda value: value is None,
+    "boolean": lambda value: isinstance(value, bool),
+    "integer": lambda value: (
+        (isinstance(value, int) and not isinstance(value, bool))
+        or (isinstance(value, float) and value.is_integer())
+    ),
+    "number": lambda value: (
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+    ),
+}
+
+_KEYWORDS = {
+    "type",
+    "properties",
+    "required",
+    "additionalProperties",
+    "items",
+    "minItems",
+}
+
+
+def compile_checker(schema: dict) -> Checker:
+    """
+    Turn a schema into a function that tells whether a value is valid, without
+    saying why. Only the keywords that the schemas of this project use are
+    supported, with the same meaning as in `jsonschema`.
+
+    Raises:
+        ValueError: The schema uses a keyword that is not supported.
+    """
+    unsupported = set(schema) - _KEYWORDS
+    if unsupported or schema.get("additionalProperties", False) is not False:
+        raise ValueError(f"Cannot compile schema keywords: {sorted(unsupported)}")
+    checks: list[Checker] = []
+
+    if "type" in schema:
+        types = schema["type"]
+        names = [types] if isinstance(types, str) else types
+        if len(names) == 1:
+            checks.append(_TYPES[names[0]])
+        else:
+            type_checks = [_TYPES[name] for name in names]
+
+            def check_type(value: object) -> bool:
+                for check in type_checks:
+                    if check(value):
+                        return True
+                return False
+
+            checks.append(check_type)
+
+    if "properties" in schema or "required" in schema:
+        properties = {
+            name: compile_checker(subschema)
+            for name, subschema in schema.get("properties", {}).items()
+        }
+        required = schema.get("required", [])
+        closed = "additionalProperties" in schema
+
+        def check_object(value: object) -> bool:
+            if not isinstance(value, dict):
+                return True
+            for name in required:
+                if name not in value:
+                    return False
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is None:
+                    if closed:
+                        return False
+                elif not check(item):
+                    return False
+            return True
+
+        checks.append(check_object)
+
+    if "items" in schema or "minItems" in schema:
+        check_item = compile_checker(schema["items"]) if "items" in schema else None
+        min_items = schema.get("minItems", 0)
+
+        def check_array(value: object) -> bool:
+            if not isinstance(value, list):
+                return True
+            if len(value) < min_items:
+                return False
+            if check_item is not None:
+                for item in value:
+                    if not check_item(item):
+                        return False
+            return True
+
+        checks.append(check_array)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value: object) -> bool:
+        for check in checks:
+            if not check(value):
+                return False
+        return True
+
+    return check_all
+
+
+class SchemaValidator:
+    """
+    A validator for one schema that is checked and compiled only once.
+
+    Valid values, which are by far the most common, only go through a checker
+    compiled from the schema. Invalid values are passed on to `jsonschema`, so
+    that they raise exactly the error that `jsonschema.validate` would.
+    """
+
+    def __init__(self, schema: dict):
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        self.validator = cls(schema)
+        try:
+            self.is_valid = compile_checker(schema)
+        except ValueError:
+            self.is_valid = self.validator.is_valid
+
+    def validate(self, value: object) -> None:
+        """
+        Raises:
+            ValidationError: The value does not follow the schema.
+        """
+        if self.is_valid(value):
+            return
+        error: ValidationError | None = best_match(self.validator.iter_errors(value))
+        if error is not None:
+            raise error
+
+
+@cache
+def _validator(name: str) -> SchemaValidator:
+    return SchemaValidator({"INPUT": INPUT, "OUTPUT": OUTPUT}[name])
+
+
+def validate_input(script: object) -> None:
+    """
+    Validate a dialog script against `json_schema.INPUT`.
+
+    Raises:
+        ValidationError: The script does not follow the schema.
+    """
+    _validator("INPUT").validate(script)
+
+
+def validate_output(script: object) -> None:
+    """
+    Validate an output script against `json_schema.OUTPUT`.
+
+    Raises:
+        ValidationError: The script does not follow the schema.
+    """
+    _validator("OUTPUT").validate(script)
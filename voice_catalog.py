@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from write_batch import batch_or_single
+
+CATALOG_VERSION = 1
+
+# How long a catalog on disk is used before the voices are listed again.
+CATALOG_TTL = 24 * 60 * 60
+
+# The least time between two listings that are forced by an unknown voice,
+# once the voices were listed by this process, so that scripts with a voice
+# that really is unavailable cost at most one listing a minute rather than
+# one each.
+MIN_REFRESH_INTERVAL = 60
+
+
+def catalog_path(cache_dir: Path, base_url: str, api_key: str) -> Path:
+    """
+    The file that holds the voice catalog of an API key. Keys are hashed, so
+    that they are never written to disk, and so that each account gets a
+    catalog of its own.
+    """
+    account = f"{base_url}\0{api_key}".encode("utf-8")
+    return cache_dir / "voices" / f"{hashlib.sha256(account).hexdigest()}.json"
+
+
+class VoiceCatalog:
+    """
+    The IDs of the voices available to an API key, listed with `fetch` only
+    when they are first needed, and kept in the file at `path`, if given, for
+    `ttl` seconds, so that most runs never list them at all.
+
+    A script with a voice that is not in the catalog may use a voice that was
+    added since the catalog was listed, so an unknown voice makes the catalog
+    list the voices again before the voice is reported as unavailable.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], set[str]],
+        path: Path | None = None,
+        ttl: float = CATALOG_TTL,
+    ):
+        self.fetch = fetch
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._voices: frozenset[str] | None = None
+        self._fetched_at = 0.0
+        self._fetched = False
+
+    def _load(self) -> bool:
+        if self.path is None:
+            return False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != CATALOG_VERSION:
+            return False
+        if time.time() - data["fetched_at"] >= self.ttl:
+            return False
+        self._voices = frozenset(data["voices"])
+        self._fetched_at = data["fetched_at"]
+        return True
+
+    def _refresh(self) -> None:
+        self._voices = frozenset(self.fetch())
+        self._fetched_at = time.time()
+        self._fetched = True
+        if self.path is not None:
+            data = {
+                "version": CATALOG_VERSION,
+                "fetched_at": self._fetched_at,
+                "voices": sorted(self._voices),
+            }
+            try:
+                with batch_or_single(None) as batch:
+                    batch.write_text(self.path, json.dumps(data))
+            except OSError:
+                # The catalog is only kept to save a listing next time.
+                pass
+
+    def voices(self) -> frozenset[str]:
+        """
+        The IDs of the available voices.
+
+        Raises:
+            ElevenLabsClientError: The voices could not be listed.
+        """
+        with self._lock:
+            if self._voices is None and not self._load():
+                self._refresh()
+            assert self._voices is not None
+            return self._voices
+
+    def unavailable(self, voice_ids: Iterable[str]) -> set[str]:
+        """
+        The IDs among `voice_ids` of the voices that are not available.
+
+        Raises:
+            ElevenLabsClientError: The voices could not be listed.
+        """
+        unknown = set(voice_ids) - self.voices()
+        if not unknown:
+            return unknown
+        with self._lock:
+            recent = time.time() - self._fetched_at < MIN_REFRESH_INTERVAL
+            if not (self._fetched and recent):
+                self._refresh()
+            assert self._voices is not None
+            return unknown - self._voices
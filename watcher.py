@@ -0,0 +1,173 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+# Flags and events of inotify(7).
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+
+# The fixed part of `struct inotify_event`: wd, mask, cookie and len.
+_EVENT = struct.Struct("iIII")
+
+
+def _scripts_in(directory: Path) -> set[Path]:
+    with os.scandir(directory) as entries:
+        return {
+            directory / entry.name
+            for entry in entries
+            if entry.name.lower().endswith(".json") and entry.is_file()
+        }
+
+
+class _InotifySource:
+    """
+    Reports files that were written and closed, or moved into a directory, as
+    the kernel announces them through inotify.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.queue: asyncio.Queue[set[Path]] = asyncio.Queue()
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"Cannot watch directory: {directory}")
+
+    def start(self) -> None:
+        asyncio.get_running_loop().add_reader(self._fd, self._read)
+
+    def close(self) -> None:
+        asyncio.get_running_loop().remove_reader(self._fd)
+        os.close(self._fd)
+
+    def _read(self) -> None:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, so every script may have changed.
+                changed |= _scripts_in(self.directory)
+            elif name:
+                changed.add(self.directory / os.fsdecode(name))
+        if changed:
+            self.queue.put_nowait(changed)
+
+
+class _PollingSource:
+    """
+    Reports files whose size or modification time changed, by listing a
+    directory every `interval` seconds. Used where inotify is not available.
+    """
+
+    def __init__(self, directory: Path, interval: float):
+        self.directory = directory
+        self.interval = interval
+        self.queue: asyncio.Queue[set[Path]] = asyncio.Queue()
+        self._snapshot = self._scan()
+        self._task: asyncio.Task | None = None
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        with os.scandir(self.directory) as entries:
+            return {
+                entry.name: (stat.st_mtime_ns, stat.st_size)
+                for entry in entries
+                if entry.is_file() and (stat := entry.stat())
+            }
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            snapshot = await asyncio.to_thread(self._scan)
+            changed = {
+                self.directory / name
+                for name, signature in snapshot.items()
+                if self._snapshot.get(name) != signature
+            }
+            self._snapshot = snapshot
+            if changed:
+                self.queue.put_nowait(changed)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._poll())
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+def inotify_available() -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+    except OSError:
+        return False
+    return hasattr(libc, "inotify_init1")
+
+
+async def watch(
+    directory: Path,
+    debounce: float = 0.5,
+    poll_interval: float = 1.0,
+    use_inotify: bool | None = None,
+) -> AsyncIterator[list[Path]]:
+    """
+    Yield the JSON scripts in `directory` that were created or modified, in
+    batches, for as long as the caller keeps iterating.
+
+    Changes are collected until none has arrived for `debounce` seconds, so
+    that an editor that writes a file several times in a row, or a tool that
+    copies in many files at once, yields one batch rather than many. inotify
+    is used where it is available, and the directory is polled every
+    `poll_interval` seconds elsewhere.
+    """
+    if use_inotify is None:
+        use_inotify = inotify_available()
+    source: _InotifySource | _PollingSource
+    if use_inotify:
+        try:
+            source = _InotifySource(directory)
+        except OSError:
+            source = _PollingSource(directory, poll_interval)
+    else:
+        source = _PollingSource(directory, poll_interval)
+
+    source.start()
+    try:
+        while True:
+            changed = await source.queue.get()
+            while True:
+                try:
+                    changed |= await asyncio.wait_for(source.queue.get(), debounce)
+                except TimeoutError:
+                    break
+            scripts = sorted(
+                path
+                for path in changed
+                if path.suffix.lower() == ".json" and path.is_file()
+            )
+            if scripts:
+                yield scripts
+    finally:
+        source.close()
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+# The mode that `open` gives a new file: readable and writable by everyone,
+# less the umask. The umask can only be read by setting it, so it is read
+# once, on import.
+_umask = os.umask(0)
+os.umask(_umask)
+FILE_MODE = 0o666 & ~_umask
+
+
+def temp_file(directory: Path, prefix: str = "", suffix: str = "") -> tuple[int, Path]:
+    """
+    Create a temporary file in `directory` like `tempfile.mkstemp`, but with
+    the mode that `open` would give it rather than one that only its owner
+    can read, so that it can be renamed into place as an output.
+    """
+    fd, name = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=suffix)
+    try:
+        os.fchmod(fd, FILE_MODE)
+    except BaseException:
+        os.close(fd)
+        os.unlink(name)
+        raise
+    return fd, Path(name)
+
+
+class WriteBatch:
+    """
+    Files that are written under temporary names and renamed into place
+    together by `commit`, so that a crash never leaves a partial file behind,
+    only a complete old or new one.
+
+    With `fsync`, the data of every file is flushed to disk before it is
+    renamed, and each directory is flushed once after all of its files were
+    renamed, so that a batch of files costs one directory flush rather than
+    one per file.
+    """
+
+    def __init__(self, fsync: bool = False):
+        self.fsync = fsync
+        # Pairs of a complete file and the path it is to be renamed to.
+        self._pending: list[tuple[Path, Path]] = []
+        # Files that are moved into place rather than written by the batch.
+        self._moved: set[Path] = set()
+        # The number of bytes in the files of the batch.
+        self.size = 0
+        # The SHA-256 hashes of the files of the batch, by the paths they are
+        # renamed to, taken as they are written. Moved files only have one if
+        # it was given.
+        self.hashes: dict[Path, str] = {}
+
+    def _temp_file(self, path: Path) -> tuple[int, Path]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return temp_file(path.parent, prefix=f".{path.name}.")
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        fd, temp_path = self._temp_file(path)
+        self._pending.append((temp_path, path))
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        self.size += len(data)
+        self.hashes[path] = hashlib.sha256(data).hexdigest()
+
+    def write_text(self, path: Path, text: str) -> None:
+        self.write_bytes(path, text.encode("utf-8"))
+
+    def move(self, source: Path, path: Path, sha256: str | None = None) -> None:
+        """
+        Rename the complete file `source`, whose hash is `sha256` if known, to
+        `path` on commit. Both must be on the same file system.
+        """
+        size = source.stat().st_size
+        self._pending.append((source, path))
+        self._moved.add(source)
+        self.size += size
+        if sha256 is not None:
+            self.hashes[path] = sha256
+
+    def commit(self) -> None:
+        """
+        Rename every file of the batch into place, in the order they were
+        added.
+        """
+        if self.fsync:
+            for source, _ in self._pending:
+                _fsync(source, os.O_RDONLY)
+        directories = set()
+        for source, path in self._pending:
+            os.replace(source, path)
+            directories.add(path.parent)
+        self._pending.clear()
+        self._moved.clear()
+        # Directories cannot be opened, and need not be flushed, on Windows.
+        if self.fsync and hasattr(os, "O_DIRECTORY"):
+            for directory in directories:
+                _fsync(directory, os.O_RDONLY | os.O_DIRECTORY)
+
+    def abort(self) -> None:
+        """
+        Delete the temporary files of the batch. Moved files are left alone.
+        """
+        for source, _ in self._pending:
+            if source not in self._moved:
+                source.unlink(missing_ok=True)
+        self._pending.clear()
+        self._moved.clear()
+
+
+def _fsync(path: Path, flags: int) -> None:
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def batch_or_single(batch: WriteBatch | None) -> Iterator[WriteBatch]:
+    """
+    Use `batch` if one is given, or else a batch of its own that is
+    committed on exit, or aborted if the enclosed block raises.
+    """
+    if batch is not None:
+        yield batch
+        return
+    batch = WriteBatch()
+    try:
+        yield batch
+    except BaseException:
+        batch.abort()
+        raise
+    batch.commit()